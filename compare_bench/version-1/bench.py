@@ -0,0 +1,360 @@
+import os
+import sys
+import re
+import json
+import time
+import types
+import logging
+import argparse
+import tracemalloc
+import importlib.util
+from datetime import datetime
+
+import openpyxl
+
+
+# Repository root (compare_bench/version-1/bench.py -> repository root)
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+# Version ladders: tool folder, script name and the file name marker of the workbooks it compares
+LADDERS = {
+    'kinmu': ('kinmu_compare', 'kinmu.py', '勤務表'),
+    'shift': ('shift_compare', 'shifuto.py', 'シフト'),
+}
+
+# PatternFill(fgColor='FFFF00') as used by the engines (ARGB, alpha ignored)
+YELLOW = 'FFFF00'
+
+
+def setup_logging(debug_level):
+    """Configure console logging for the harness (the engines log through the root logger too)."""
+    logging.basicConfig(
+        level=getattr(logging, debug_level, logging.WARNING),
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[logging.StreamHandler(sys.stdout)]
+    )
+
+
+def version_key(version_dir):
+    """Sort key for folders like 'version-3', 'version-3.1', 'version-3.3-latest'."""
+    match = re.match(r'version-(\d+(?:\.\d+)*)', version_dir)
+    if not match:
+        return (float('inf'),)
+    return tuple(int(part) for part in match.group(1).split('.'))
+
+
+def find_ladder(ladder):
+    """
+    Find every version of a compare tool.
+
+    Returns:
+        list: (label, script_path) tuples ordered from oldest to newest
+    """
+    tool_dir, script_name, _ = LADDERS[ladder]
+    tool_path = os.path.join(REPO_ROOT, tool_dir)
+    engines = []
+    for version_dir in sorted(os.listdir(tool_path), key=version_key):
+        script_path = os.path.join(tool_path, version_dir, script_name)
+        if os.path.isfile(script_path):
+            engines.append((version_dir, script_path))
+    return engines
+
+
+def find_reference(engines):
+    """Return the label of the '-latest' version, or the newest one."""
+    for label, _ in engines:
+        if label.endswith('-latest'):
+            return label
+    return engines[-1][0]
+
+
+def ensure_optional_modules():
+    """
+    Older engines import win32com.client at module top without using it.
+    Register an empty placeholder when pywin32 is missing so they can still be loaded.
+    """
+    try:
+        import win32com.client  # noqa: F401
+    except ImportError:
+        win32com = types.ModuleType('win32com')
+        win32com.client = types.ModuleType('win32com.client')
+        sys.modules.setdefault('win32com', win32com)
+        sys.modules.setdefault('win32com.client', win32com.client)
+        logging.debug('pywin32 not available, registered placeholder win32com.client')
+
+
+def sibling_modules(script_dir):
+    """Names of the helper modules next to an engine script (rule_set, time_intervals, ...)."""
+    return {os.path.splitext(name)[0] for name in os.listdir(script_dir) if name.endswith('.py')}
+
+
+def load_engine(label, script_path):
+    """
+    Import a compare script from its path under a unique module name.
+
+    The helper modules next to the script are imported fresh for it: engines of several
+    versions share module names (rule_set, time_intervals, ...), and an engine that found
+    another engine's helpers in sys.modules would run with them. The names are taken out
+    of sys.modules for the import and put back afterwards; each engine keeps its own
+    helpers through its globals (no engine imports a helper at call time).
+    """
+    module_name = 'bench_' + re.sub(r'\W', '_', f'{os.path.basename(os.path.dirname(os.path.dirname(script_path)))}_{label}')
+    spec = importlib.util.spec_from_file_location(module_name, script_path)
+    module = importlib.util.module_from_spec(spec)
+    # Make sibling helper modules importable, like running the script from its own folder
+    script_dir = os.path.dirname(script_path)
+    siblings = sibling_modules(script_dir)
+    saved = {name: sys.modules.pop(name) for name in siblings if name in sys.modules}
+    sys.path.insert(0, script_dir)
+    try:
+        spec.loader.exec_module(module)
+    finally:
+        sys.path.remove(script_dir)
+        for name in siblings:
+            sys.modules.pop(name, None)
+        sys.modules.update(saved)
+
+    # Never block the harness on message boxes
+    def show_message(title, message):
+        logging.info(f'[{label}] {title}: {message}')
+    module.show_message = show_message
+    return module
+
+
+def find_pairs(corpus_root, name_marker=None):
+    """
+    Collect V1/V2 file pairs from a recompare folder (<school>/V1, <school>/V2).
+
+    Returns:
+        list: (school, file_name, v1_path, v2_path) tuples
+    """
+    pairs = []
+    for school in sorted(os.listdir(corpus_root)):
+        v1_path = os.path.join(corpus_root, school, 'V1')
+        v2_path = os.path.join(corpus_root, school, 'V2')
+        if not (os.path.isdir(v1_path) and os.path.isdir(v2_path)):
+            continue
+        files_v2 = {os.path.splitext(f)[0]: f for f in os.listdir(v2_path) if f.endswith(('.xlsx', '.xls'))}
+        for file_name in sorted(os.listdir(v1_path)):
+            if not file_name.endswith(('.xlsx', '.xls')):
+                continue
+            if name_marker and name_marker not in file_name:
+                continue
+            base_name = os.path.splitext(file_name)[0]
+            if base_name in files_v2:
+                pairs.append((school, file_name, os.path.join(v1_path, file_name), os.path.join(v2_path, files_v2[base_name])))
+    return pairs
+
+
+def yellow_cells(wb):
+    """Return the set of (sheet, row, col) cells filled yellow in a workbook."""
+    cells = set()
+    for sheet in wb.worksheets:
+        for row in sheet.iter_rows():
+            for cell in row:
+                fill = cell.fill
+                rgb = fill.fgColor.rgb if fill is not None and fill.fill_type == 'solid' else None
+                if isinstance(rgb, str) and rgb[-6:] == YELLOW:
+                    cells.add((sheet.title, cell.row, cell.column))
+    return cells
+
+
+def run_pair(module, v1_path, v2_path, baseline_fills, measure_memory):
+    """Run one engine on one pair and collect verdict, mismatch cells, wall time and memory peak."""
+    record = {'verdict': 'E', 'mismatches': [], 'seconds': None, 'peak_kb': None, 'error': None}
+    try:
+        start = time.perf_counter()
+        result, modified_wb = module.compare_excel_files(v1_path, v2_path)
+        record['seconds'] = time.perf_counter() - start
+        record['verdict'] = result
+        record['mismatches'] = sorted(yellow_cells(modified_wb) - baseline_fills)
+
+        if measure_memory:
+            tracemalloc.start()
+            module.compare_excel_files(v1_path, v2_path)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            record['peak_kb'] = peak // 1024
+    except Exception as e:
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        record['error'] = str(e)
+        logging.error(f'Engine failed on {v1_path}: {str(e)}')
+    return record
+
+
+def diff_against_reference(results, reference):
+    """
+    Compare every engine's verdicts and mismatch sets with the reference engine.
+
+    Returns:
+        dict: engine label -> list of differing pairs
+    """
+    diffs = {}
+    ref_records = results[reference]
+    for label, records in results.items():
+        if label == reference:
+            continue
+        engine_diffs = []
+        for pair_key, record in records.items():
+            ref = ref_records.get(pair_key)
+            if ref is None:
+                continue
+            mismatches = set(map(tuple, record['mismatches']))
+            ref_mismatches = set(map(tuple, ref['mismatches']))
+            if record['verdict'] != ref['verdict'] or mismatches != ref_mismatches:
+                engine_diffs.append({
+                    'pair': pair_key,
+                    'verdict': record['verdict'],
+                    'reference_verdict': ref['verdict'],
+                    'only_in_engine': sorted(mismatches - ref_mismatches),
+                    'only_in_reference': sorted(ref_mismatches - mismatches),
+                })
+        diffs[label] = engine_diffs
+    return diffs
+
+
+def summarize(results):
+    """Aggregate wall time, memory peak and verdict counts per engine."""
+    summary = {}
+    for label, records in results.items():
+        seconds = [r['seconds'] for r in records.values() if r['seconds'] is not None]
+        peaks = [r['peak_kb'] for r in records.values() if r['peak_kb'] is not None]
+        summary[label] = {
+            'pairs': len(records),
+            'total_seconds': sum(seconds),
+            'max_peak_kb': max(peaks) if peaks else None,
+            'X': sum(1 for r in records.values() if r['verdict'] == 'X'),
+            'O': sum(1 for r in records.values() if r['verdict'] == 'O'),
+            'errors': sum(1 for r in records.values() if r['verdict'] == 'E'),
+            'mismatch_cells': sum(len(r['mismatches']) for r in records.values()),
+        }
+    return summary
+
+
+def write_markdown(path, ladder, reference, summary, diffs):
+    """Write a readable markdown summary of a benchmark run."""
+    lines = [
+        f"# Compare Engine Benchmark ({ladder})",
+        f"**Generated on:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+        f"**Reference:** {reference}",
+        "",
+        "| Engine | Pairs | Total Time (s) | Peak Memory (KB) | O | X | Errors | Mismatch Cells | Differs From Reference |",
+        "|--------|-------|----------------|------------------|---|---|--------|----------------|------------------------|",
+    ]
+    for label, stats in summary.items():
+        differs = '-' if label == reference else str(len(diffs.get(label, [])))
+        peak = stats['max_peak_kb'] if stats['max_peak_kb'] is not None else '-'
+        lines.append(
+            f"| {label} | {stats['pairs']} | {stats['total_seconds']:.3f} | {peak} | {stats['O']} | "
+            f"{stats['X']} | {stats['errors']} | {stats['mismatch_cells']} | {differs} |"
+        )
+    lines.append("")
+
+    for label, engine_diffs in diffs.items():
+        if not engine_diffs:
+            continue
+        lines.append(f"## {label} vs {reference}")
+        lines.append("")
+        lines.append("| School | File | Verdict | Reference | Only In Engine | Only In Reference |")
+        lines.append("|--------|------|---------|-----------|----------------|-------------------|")
+        for d in engine_diffs:
+            school, file_name = d['pair'].split('/', 1)
+            lines.append(
+                f"| {school} | {file_name} | {d['verdict']} | {d['reference_verdict']} | "
+                f"{len(d['only_in_engine'])} | {len(d['only_in_reference'])} |"
+            )
+        lines.append("")
+
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines))
+
+
+def run_ladder(ladder, corpus_root, output_dir, engine_filter=None, candidates=None, measure_memory=True):
+    """
+    Run every version of a ladder (plus candidate engines) over the same corpus.
+
+    Returns:
+        bool: True when all candidate engines are result-equivalent to the reference
+    """
+    engines = find_ladder(ladder)
+    reference = find_reference(engines)
+    if engine_filter:
+        engines = [(label, path) for label, path in engines if label in engine_filter or label == reference]
+    for candidate in candidates or []:
+        engines.append((f'candidate-{os.path.basename(os.path.dirname(os.path.abspath(candidate)))}', os.path.abspath(candidate)))
+
+    pairs = find_pairs(corpus_root, LADDERS[ladder][2])
+    print(f'[{ladder}] {len(engines)} engines x {len(pairs)} pairs, reference={reference}')
+
+    baseline_fills = {}
+    for school, file_name, _, v2_path in pairs:
+        baseline_fills[f'{school}/{file_name}'] = yellow_cells(openpyxl.load_workbook(v2_path))
+
+    results = {}
+    for label, script_path in engines:
+        try:
+            module = load_engine(label, script_path)
+        except Exception as e:
+            logging.error(f'Could not load {label} ({script_path}): {str(e)}')
+            continue
+        records = {}
+        for school, file_name, v1_path, v2_path in pairs:
+            pair_key = f'{school}/{file_name}'
+            records[pair_key] = run_pair(module, v1_path, v2_path, baseline_fills[pair_key], measure_memory)
+        results[label] = records
+        print(f'[{ladder}] {label}: done')
+
+    if reference not in results:
+        logging.error(f'Reference engine {reference} could not be run')
+        return False
+
+    summary = summarize(results)
+    diffs = diff_against_reference(results, reference)
+
+    os.makedirs(output_dir, exist_ok=True)
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    json_path = os.path.join(output_dir, f'{timestamp}_{ladder}_bench.json')
+    md_path = os.path.join(output_dir, f'{timestamp}_{ladder}_bench.md')
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump({'ladder': ladder, 'reference': reference, 'summary': summary,
+                   'diffs': diffs, 'results': results}, f, ensure_ascii=False, indent=1)
+    write_markdown(md_path, ladder, reference, summary, diffs)
+    print(f'Benchmark written to: {md_path}')
+
+    candidate_labels = [label for label in results if label.startswith('candidate-')]
+    return all(not diffs.get(label) for label in candidate_labels)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Run every version of the compare engines over one corpus and diff their verdicts.')
+    parser.add_argument('corpus', help='recompare folder with <school>/V1 and <school>/V2 subfolders')
+    parser.add_argument('--ladder', choices=sorted(LADDERS) + ['all'], default='all',
+                        help='which version ladder to run (default: all)')
+    parser.add_argument('--engines', nargs='*', help='only run these versions (the reference always runs)')
+    parser.add_argument('--candidate', action='append', default=[],
+                        help='extra engine script to check against the reference (repeatable)')
+    parser.add_argument('--output', default='bench_results', help='output folder for the JSON and markdown results')
+    parser.add_argument('--no-memory', action='store_true', help='skip the tracemalloc memory pass')
+    parser.add_argument('--log-level', default='CRITICAL', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'],
+                        help='log level for the engines (default: CRITICAL, per-cell errors are noisy)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    setup_logging(args.log_level)
+    ensure_optional_modules()
+
+    ladders = sorted(LADDERS) if args.ladder == 'all' else [args.ladder]
+    equivalent = True
+    for ladder in ladders:
+        candidates = args.candidate if len(ladders) == 1 else [
+            c for c in args.candidate if os.path.basename(c) == LADDERS[ladder][1]]
+        equivalent &= run_ladder(ladder, args.corpus, args.output, args.engines, candidates, not args.no_memory)
+    return 0 if equivalent else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
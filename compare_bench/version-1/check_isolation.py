@@ -0,0 +1,81 @@
+import os
+import sys
+import shutil
+import argparse
+import tempfile
+
+from bench import LADDERS, ensure_optional_modules, find_ladder, find_reference, run_ladder, setup_logging
+
+
+# Self-check of bench.py: a --candidate engine must run with the helper modules next to
+# it, not with the reference engine's modules of the same names. Two copies of the
+# reference engine folder are run as candidates over a corpus:
+#
+#   unchanged copy                              must be reported equivalent
+#   copy whose rule_set.py ignores every        must be reported different
+#   string mismatch
+#
+# The corpus needs at least one string mismatch per ladder (the sample corpora have many).
+
+# The line of rule_set.py the broken copy returns after: RuleSet.is_ignored_mismatch()
+BROKEN_ANCHOR = '"""True when the pair (in either order) or one of the values is ignored."""'
+BROKEN_RETURN = '\n        return True'
+
+
+def copy_engine(script_path, target_dir, broken=False):
+    """Copy an engine folder (script, helper modules, rules.json); returns the copied script path."""
+    shutil.copytree(os.path.dirname(script_path), target_dir, ignore=shutil.ignore_patterns('__pycache__'))
+    if broken:
+        rule_set_path = os.path.join(target_dir, 'rule_set.py')
+        with open(rule_set_path, encoding='utf-8') as f:
+            source = f.read()
+        if BROKEN_ANCHOR not in source:
+            raise RuntimeError(f'{rule_set_path}: is_ignored_mismatch() not found, cannot break it')
+        with open(rule_set_path, 'w', encoding='utf-8') as f:
+            f.write(source.replace(BROKEN_ANCHOR, BROKEN_ANCHOR + BROKEN_RETURN, 1))
+    return os.path.join(target_dir, os.path.basename(script_path))
+
+
+def check_ladder(ladder, corpus, work_dir):
+    """True when the unchanged copy is equivalent and the broken copy is not."""
+    engines = find_ladder(ladder)
+    reference = find_reference(engines)
+    script_path = dict(engines)[reference]
+    ok = True
+    for broken, expected in ((False, True), (True, False)):
+        name = 'broken' if broken else 'unchanged'
+        candidate = copy_engine(script_path, os.path.join(work_dir, ladder, name), broken)
+        equivalent = run_ladder(ladder, corpus, os.path.join(work_dir, ladder, f'{name}_results'),
+                                [reference], [candidate], measure_memory=False)
+        passed = equivalent == expected
+        print(f'[{ladder}] {name} copy of {reference}: reported '
+              f'{"equivalent" if equivalent else "different"} -> {"ok" if passed else "FAILED"}')
+        ok &= passed
+    return ok
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Check that bench.py runs candidate engines with their own helper modules.')
+    parser.add_argument('corpus', help='recompare folder with <school>/V1 and <school>/V2 subfolders')
+    parser.add_argument('--ladder', choices=sorted(LADDERS) + ['all'], default='all',
+                        help='which version ladder to check (default: all)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    setup_logging('CRITICAL')
+    ensure_optional_modules()
+
+    ladders = sorted(LADDERS) if args.ladder == 'all' else [args.ladder]
+    work_dir = tempfile.mkdtemp(prefix='bench_isolation_')
+    try:
+        ok = all([check_ladder(ladder, args.corpus, work_dir) for ladder in ladders])
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,203 @@
+import re
+import logging
+from datetime import datetime, date
+from functools import lru_cache
+
+from fast_normalize import is_datetime_string, is_date_value, same_date, date_key
+from fast_normalize import clear_caches as clear_date_caches
+
+
+# Drop-in kernels for normalize_value, normalize_time_format, extract_date_part,
+# is_time_string and compare_vacation_strings of kinmu.py / report.py. The engines do
+# not use them: they are kept here with fuzz_normalizers.py, which checks that they
+# return exactly what the originals return (including raised exceptions) and times
+# both. fast_normalize.py of the engine folder is imported from there (the fuzzer puts
+# that folder on sys.path): its date functions are checked together with these.
+
+# Same patterns that datetime.strptime builds for %Y %m %d %H %M %S
+_Y = r'(\d\d\d\d)'
+_m = r'(1[0-2]|0[1-9]|[1-9])'
+_d = r'(3[0-1]|[1-2]\d|0[1-9]|[1-9]| [1-9])'
+_H = r'(2[0-3]|[0-1]\d|\d)'
+_M = r'([0-5]\d|\d)'
+_S = r'(6[0-1]|[0-5]\d|\d)'
+
+
+def _compile_strptime(fmt):
+    """Compile a strptime format into the equivalent regex (only the directives used here)."""
+    pattern = re.sub(r'\s+', r'\\s+', fmt)
+    for directive, regex in (('%Y', _Y), ('%m', _m), ('%d', _d), ('%H', _H), ('%M', _M), ('%S', _S)):
+        pattern = pattern.replace(directive, regex)
+    return re.compile(pattern, re.IGNORECASE)
+
+
+# normalize_value() datetime formats, keyed by the separator after the year
+_NORMALIZE_DATETIME = {
+    '-': [_compile_strptime('%Y-%m-%d %H:%M:%S'), _compile_strptime('%Y-%m-%d')],
+    '/': [_compile_strptime('%Y/%m/%d %H:%M:%S'), _compile_strptime('%Y/%m/%d')],
+}
+
+_SPACE_BEFORE_PAREN = re.compile(r'(\d{1,3}:\d{2})\s+\(')
+_VACATION_TIME_RANGE = re.compile(r'(\d{1,2}:\d{2}\s*[〜～~]\s*\d{1,2}:\d{2})')
+
+_NONE_PATTERNS = frozenset(["0", "0:00", "00:00:00", "12:00:00午前"])
+_FLOAT_START = frozenset('+-.iInN')
+
+
+def _parse_strptime(regex, value):
+    """Match like datetime.strptime: first regex match must consume the whole string."""
+    found = regex.match(value)
+    if found is None or found.end() != len(value):
+        return None
+    fields = [int(group) for group in found.groups()]
+    try:
+        return datetime(*fields)
+    except ValueError:
+        return None
+
+
+def _parse_datetime(value, formats):
+    """Try the formats for this separator in order, like the original strptime loops."""
+    if len(value) < 8 or not value[:4].isdecimal():
+        return None
+    regexes = formats.get(value[4])
+    if regexes is None:
+        return None
+    for regex in regexes:
+        dt = _parse_strptime(regex, value)
+        if dt is not None:
+            return dt
+    return None
+
+
+@lru_cache(maxsize=65536)
+def _normalize_string(value):
+    """normalize_value() for str input (pure, so cached per distinct string)."""
+    if "_x000D_" in value:
+        value = value.replace("_x000D_", "")
+    value = value.replace("\r", "").replace("\n", "").replace('"', '')
+    value = ' '.join(value.split())
+
+    if ' (' in value:
+        value = _SPACE_BEFORE_PAREN.sub(r'\1(', value)
+
+    if value == "" or value in _NONE_PATTERNS:
+        return None
+
+    dt = _parse_datetime(value, _NORMALIZE_DATETIME)
+    if dt is not None:
+        return dt
+
+    if value[0].isdecimal() or value[0] in _FLOAT_START:
+        try:
+            num = float(value)
+            if num.is_integer():
+                return str(int(num))
+        except ValueError:
+            pass
+    return value
+
+
+def normalize_value(value):
+    """Normalize values to handle numeric equivalence, time formats, blank/None equivalence, and remove special characters."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return _normalize_string(value)
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return _normalize_string(str(value))
+
+
+def normalize_time_format(time_str):
+    """
+    Normalize time string format by removing leading zeros and seconds.
+    Examples:
+        "08:00:00" -> "8:00"
+        "8:00" -> "8:00"
+    """
+    if time_str is None or not isinstance(time_str, str) or time_str.strip() == "":
+        logging.warning('Invalid input for normalize_time_format: %s (type: %s)', time_str, type(time_str))
+        return None
+
+    colons = time_str.count(':')
+    if colons == 0:
+        return time_str
+    try:
+        if colons == 2:
+            time_str = time_str[:time_str.rindex(':')]
+        elif colons > 2:
+            raise ValueError('too many values to unpack')
+        hours, _, minutes = time_str.partition(':')
+        return f"{int(hours)}:{minutes}"
+    except ValueError:
+        logging.warning('Invalid time format encountered: %s', time_str)
+        return None
+
+
+def extract_date_part(value):
+    """Extract just the date part from a datetime string or object."""
+    if not isinstance(value, (str, datetime)):
+        return value
+    # date_key() is the ordinal of the "YYYY/MM/DD" this returns, or that string itself
+    key = date_key(value)
+    if isinstance(key, int):
+        day = date.fromordinal(key)
+        return f"{day.year}/{day.month:02d}/{day.day:02d}"
+    return key
+
+
+def is_time_string(value):
+    """Check if a string represents a time value (e.g. 830, 1430, 8:30, 14:30)."""
+    if not isinstance(value, str):
+        return False
+
+    value = normalize_time_format(value)
+    # The original calls .replace() on the result, so invalid input raises the same way
+    value = value.replace(':', '').replace('：', '').strip()
+
+    length = len(value)
+    if (length == 3 or length == 4) and value.isdigit():
+        split = length - 2
+        hours = int(value[:split])
+        minutes = int(value[split:])
+        return hours <= 23 and minutes <= 59
+    return False
+
+
+def _normalize_vacation_range(time_range):
+    start, end = time_range.replace('〜', '~').replace('～', '~').replace('：', ':').strip().split('~')
+    start = normalize_time_format(start.strip())
+    end = normalize_time_format(end.strip())
+    return f"{start}~{end}" if start and end else None
+
+
+def compare_vacation_strings(str1, str2):
+    """
+    Compare two vacation time strings like '有給(時間休：14:30～16:30)' and '有給(時間休:14:30 〜 16:30)'.
+    Returns True if they are equivalent, False otherwise.
+    """
+    if not isinstance(str1, str) or not isinstance(str2, str):
+        return False
+    if str1 == str2:
+        return True
+
+    match1 = _VACATION_TIME_RANGE.search(str1)
+    match2 = _VACATION_TIME_RANGE.search(str2)
+    if not match1 or not match2:
+        return False
+
+    if _normalize_vacation_range(match1.group(1)) != _normalize_vacation_range(match2.group(1)):
+        return False
+
+    non_time_part1 = _VACATION_TIME_RANGE.sub('', str1).replace('：', ':').replace(' ', '')
+    non_time_part2 = _VACATION_TIME_RANGE.sub('', str2).replace('：', ':').replace(' ', '')
+    return non_time_part1 == non_time_part2
+
+
+def clear_caches():
+    """Drop memoized normalizer results (used by the benchmarks for cold timings)."""
+    _normalize_string.cache_clear()
+    clear_date_caches()
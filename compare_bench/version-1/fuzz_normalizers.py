@@ -0,0 +1,325 @@
+import os
+import re
+import sys
+import time
+import random
+import logging
+import argparse
+import importlib.util
+from datetime import datetime, date, time as dt_time
+
+from bench import REPO_ROOT, ensure_optional_modules, load_engine
+
+
+# Optimized normalizers: the drop-in kernels next to this script, on top of the date
+# functions of fast_normalize.py in each engine folder (the only ones the engines use)
+KERNELS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fast_kernels.py')
+
+FUNCTIONS = [
+    'normalize_value',
+    'normalize_time_format',
+    'extract_date_part',
+    'is_datetime_string',
+    'is_time_string',
+    'compare_vacation_strings',
+]
+
+# Fast functions without a legacy twin, checked against what the engines computed before
+DERIVED = {
+    'is_date_value': lambda legacy: lambda value: isinstance(value, datetime) or legacy.is_datetime_string(value),
+    'same_date': lambda legacy: lambda value1, value2: legacy.extract_date_part(value1) == legacy.extract_date_part(value2),
+}
+
+# The date functions of fast_normalize.py, the only fast functions the shift engines use
+# (their normalize_value() / is_time_string() differ from the kinmu ones in fast_kernels.py)
+DATE_FUNCTIONS = ['extract_date_part', 'is_datetime_string', 'is_date_value', 'same_date']
+
+# Engines whose normalizers the fast functions are checked against, and which functions
+TARGETS = [
+    ('kinmu_compare', 'version-3.3-latest', 'kinmu.py', FUNCTIONS + list(DERIVED)),
+    ('kinmu_report', 'version-2-latest', 'report.py', FUNCTIONS + list(DERIVED)),
+    ('shift_compare', 'version-3.1-latest', 'shifuto.py', DATE_FUNCTIONS),
+    ('shift_report', 'version-2-latest', 'report.py', DATE_FUNCTIONS),
+]
+
+FULL_WIDTH = str.maketrans('0123456789:', '０１２３４５６７８９：')
+
+NOISE = [
+    '0', '1', '5', '9', '12', '23', '59', '60', '99', '０', '１２', '٣', '²', '.', '-', '+', '_', 'e', 'inf', 'nan',
+    ':', '：', '/', '~', '〜', '～', ' ', '  ', '　', '\t', '\n', '\r', '_x000D_', '"', '(', ')', '（', '）',
+    '午前', '午後', '時間休', '有給', '【休暇', '休暇', '【長期休暇】', '休み', 'シフト時間コード-1', 'None', 'a', 'Z',
+]
+
+
+def random_time(rnd):
+    """Random clock time in one of the shapes seen in the sheets."""
+    hours = rnd.choice([rnd.randint(0, 23), rnd.randint(0, 99)])
+    minutes = rnd.choice([rnd.randint(0, 59), rnd.randint(0, 99)])
+    shape = rnd.randint(0, 5)
+    if shape == 0:
+        text = f"{hours}:{minutes:02d}"
+    elif shape == 1:
+        text = f"{hours:02d}:{minutes:02d}:00"
+    elif shape == 2:
+        text = f"{hours}{minutes:02d}"
+    elif shape == 3:
+        text = f"{hours}:{minutes}"
+    elif shape == 4:
+        text = f"{hours:02d}:{minutes:02d}:{rnd.randint(0, 61):02d}:{rnd.randint(0, 9)}"
+    else:
+        text = f" {hours}:{minutes:02d} "
+    if rnd.random() < 0.15:
+        text = text.translate(FULL_WIDTH)
+    return text
+
+
+def random_time_range(rnd):
+    separator = rnd.choice(['~', '〜', '～', ' ~ ', ' 〜 ', '~~'])
+    text = f"{random_time(rnd)}{separator}{random_time(rnd)}"
+    if rnd.random() < 0.3:
+        text = f"{rnd.choice(['有給(時間休：', '有給(時間休:', '時間休 ', '外出'])}{text}{rnd.choice([')', '）', ''])}"
+    if rnd.random() < 0.2:
+        text = f"{text} ({rnd.choice(['x', '時間休', '1'])})"
+    return text
+
+
+def random_date(rnd):
+    """Random date string, including invalid days and both separators."""
+    year = rnd.choice([2024, 2023, 1999, 999, 0, rnd.randint(1000, 9999)])
+    month = rnd.choice([rnd.randint(1, 12), 0, 13])
+    day = rnd.choice([rnd.randint(1, 28), 29, 30, 31, 0, 32])
+    separator = rnd.choice(['/', '-', '/', '.'])
+    month_text = f"{month:02d}" if rnd.random() < 0.5 else str(month)
+    day_text = f"{day:02d}" if rnd.random() < 0.5 else rnd.choice([str(day), f" {day}"])
+    text = f"{year:04d}{separator}{month_text}{separator}{day_text}"
+    if rnd.random() < 0.5:
+        text += rnd.choice([' ', '  ', 'T']) + random_time(rnd)
+    if rnd.random() < 0.25:
+        text += rnd.choice([' 午前', ' 午後', '午前', ' AM'])
+    if rnd.random() < 0.1:
+        text = text.translate(FULL_WIDTH)
+    if rnd.random() < 0.1:
+        text = rnd.choice(['期間:', 'x ', '']) + text + rnd.choice(['まで', ''])
+    return text
+
+
+def random_date_pair(rnd):
+    """Pairs of dates that are the same day in other shapes, nearly the same, or unrelated."""
+    first = random_date(rnd)
+    if rnd.random() < 0.2:
+        return first, random_value(rnd)
+    found = re.search(r'(\d{4})[-/.](\d{1,2})[-/.]\s?(\d{1,2})', first)
+    if not found:
+        return first, random_date(rnd)
+    year, month, day = (int(part) for part in found.groups())
+    day += rnd.choice([0, 0, 0, 1, -1])
+    if rnd.random() < 0.3 and 1 <= month <= 12 and 1 <= day <= 28 and year >= 1:
+        second = datetime(year, month, day, rnd.randint(0, 23), rnd.randint(0, 59))
+    else:
+        second = f"{year:04d}{rnd.choice(['/', '-'])}{month}{rnd.choice(['/', '-'])}{day:02d}"
+        if rnd.random() < 0.5:
+            second += rnd.choice([' 9:00', ' 09:00:00', ' 23:59:59 午後', ' 12:00 午前', ' 9:00:60'])
+    return rnd.sample([first, second], 2)
+
+
+def random_value(rnd):
+    """Generate one adversarial Excel-like cell value."""
+    kind = rnd.randint(0, 13)
+    if kind == 0:
+        return None
+    if kind == 1:
+        return rnd.choice(['', ' ', '　', '\n', '_x000D_', '""', '0', '0:00', '00:00:00', '12:00:00午前',
+                           '12:00:00 午前', '0.0', '-0', '1.0', '1e3', '1_000', 'nan', 'inf', 'True', 'None'])
+    if kind == 2:
+        return rnd.choice([rnd.randint(-5, 50), rnd.randint(0, 100000), True, False])
+    if kind == 3:
+        # Excel serials: whole days, fractional times, plain decimals
+        return rnd.choice([float(rnd.randint(0, 50000)), rnd.randint(40000, 50000) + rnd.random(),
+                           round(rnd.random(), 4), rnd.choice([0.5, 2.25, -1.0, 1e20, float('nan')])])
+    if kind == 4:
+        return datetime(rnd.randint(1900, 2100), rnd.randint(1, 12), rnd.randint(1, 28),
+                        rnd.randint(0, 23), rnd.randint(0, 59), rnd.randint(0, 59))
+    if kind == 5:
+        return rnd.choice([dt_time(rnd.randint(0, 23), rnd.randint(0, 59)),
+                           date(rnd.randint(1900, 2100), rnd.randint(1, 12), rnd.randint(1, 28))])
+    if kind in (6, 7):
+        return random_time(rnd)
+    if kind == 8:
+        return random_time_range(rnd)
+    if kind in (9, 10):
+        return random_date(rnd)
+    if kind == 11:
+        lines = [random_time_range(rnd) if rnd.random() < 0.5 else rnd.choice(NOISE) for _ in range(rnd.randint(2, 3))]
+        return rnd.choice(['\n', '\r\n', '_x000D_\n']).join(lines)
+    text = ''.join(rnd.choice(NOISE) for _ in range(rnd.randint(1, 6)))
+    if rnd.random() < 0.2:
+        text = f'"{text}"'
+    return text
+
+
+def random_vacation_pair(rnd):
+    """Pairs of 時間休 strings that are equal, nearly equal, or unrelated."""
+    first = random_value(rnd) if rnd.random() < 0.2 else random_time_range(rnd)
+    if rnd.random() < 0.3 or not isinstance(first, str):
+        return first, random_value(rnd)
+    second = first
+    for old, new in rnd.sample([('～', '〜'), ('〜', '~'), ('：', ':'), (':', '：'), (' ', ''), ('~', ' ~ '),
+                                ('08', '8'), ('0', '１'), (')', '）')], rnd.randint(0, 3)):
+        second = second.replace(old, new, 1)
+    return first, second
+
+
+def outcome(function, args):
+    """Call a function and describe its result or the exception it raised."""
+    try:
+        result = function(*args)
+    except Exception as e:
+        return ('raise', type(e).__name__)
+    return ('ok', type(result).__name__, result)
+
+
+def load_fast_module(script_path):
+    """Import fast_kernels.py with the fast_normalize.py of the engine's folder."""
+    script_dir = os.path.dirname(script_path)
+    name = 'fuzz_fast_' + os.path.basename(os.path.dirname(script_dir))
+    spec = importlib.util.spec_from_file_location(name, KERNELS_PATH)
+    module = importlib.util.module_from_spec(spec)
+    # The engine's own fast_normalize.py, not one imported for another engine before
+    saved = sys.modules.pop('fast_normalize', None)
+    sys.path.insert(0, script_dir)
+    try:
+        spec.loader.exec_module(module)
+    finally:
+        sys.path.remove(script_dir)
+        sys.modules.pop('fast_normalize', None)
+        if saved is not None:
+            sys.modules['fast_normalize'] = saved
+    return module
+
+
+def generate_cases(seed, iterations):
+    """Generate the argument tuples for every function from one seed."""
+    rnd = random.Random(seed)
+    values = [random_value(rnd) for _ in range(iterations)]
+    strings = [v for v in values if isinstance(v, str)]
+    cases = {
+        'normalize_value': [(v,) for v in values],
+        'normalize_time_format': [(v,) for v in values],
+        'extract_date_part': [(v,) for v in values] + [(v,) for v in values if isinstance(v, datetime)],
+        'is_datetime_string': [(v,) for v in values] + [(random_date(rnd),) for _ in range(iterations // 2)],
+        'is_date_value': [(v,) for v in values],
+        'same_date': [tuple(random_date_pair(rnd)) for _ in range(iterations)],
+        'is_time_string': [(v,) for v in values],
+        'compare_vacation_strings': [random_vacation_pair(rnd) for _ in range(iterations)],
+    }
+    # extract_date_part and is_time_string mostly see normalized values in the engines
+    cases['extract_date_part'] += [(v,) for v in strings[: iterations // 2]]
+    return cases
+
+
+def legacy_function(legacy, name):
+    """The engine's function of that name, or the legacy expression of a derived one."""
+    if name in DERIVED:
+        return DERIVED[name](legacy)
+    return getattr(legacy, name, None)
+
+
+def check_target(label, legacy, fast, functions, cases, max_failures):
+    """
+    Run every case through the legacy and fast version of functions and collect disagreements.
+
+    Returns:
+        dict: function name -> list of (args, legacy outcome, fast outcome)
+    """
+    failures = {}
+    for name in functions:
+        expected_function = legacy_function(legacy, name)
+        if expected_function is None:
+            continue
+        fast_function = getattr(fast, name)
+        function_failures = []
+        for args in cases[name]:
+            expected = outcome(expected_function, args)
+            actual = outcome(fast_function, args)
+            if expected != actual:
+                function_failures.append((args, expected, actual))
+                if len(function_failures) >= max_failures:
+                    break
+        failures[name] = function_failures
+        status = 'OK' if not function_failures else f'{len(function_failures)} MISMATCHES'
+        print(f'[{label}] {name}: {len(cases[name])} cases {status}')
+        for args, expected, actual in function_failures:
+            print(f'    args={args!r}\n      legacy={expected!r}\n      fast  ={actual!r}')
+    return failures
+
+
+def time_function(function, cases, repeat, before=None):
+    """Best-of-N wall time for calling a function over all cases."""
+    best = None
+    for _ in range(repeat):
+        if before:
+            before()
+        start = time.perf_counter()
+        for args in cases:
+            try:
+                function(*args)
+            except Exception:
+                pass
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def benchmark_target(label, legacy, fast, functions, cases, repeat):
+    """Print legacy vs fast timings per function (fast caches are cleared before every run)."""
+    print(f'\n[{label}] benchmark (best of {repeat}, caches cleared each run)')
+    print('| Function | Calls | Legacy (ms) | Fast (ms) | Speedup |')
+    print('|----------|-------|-------------|-----------|---------|')
+    for name in functions:
+        expected_function = legacy_function(legacy, name)
+        if expected_function is None:
+            continue
+        legacy_time = time_function(expected_function, cases[name], repeat)
+        fast_time = time_function(getattr(fast, name), cases[name], repeat, fast.clear_caches)
+        speedup = legacy_time / fast_time if fast_time else float('inf')
+        print(f'| {name} | {len(cases[name])} | {legacy_time * 1000:.1f} | {fast_time * 1000:.1f} | {speedup:.1f}x |')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Differential fuzzing of fast_kernels.py / fast_normalize.py against the original normalizers, '
+                    'with timings.')
+    parser.add_argument('--iterations', type=int, default=20000, help='generated values per function (default: 20000)')
+    parser.add_argument('--seed', type=int, default=None, help='random seed (default: time based, printed)')
+    parser.add_argument('--max-failures', type=int, default=10, help='counterexamples to print per function')
+    parser.add_argument('--repeat', type=int, default=3, help='benchmark repetitions (best is reported)')
+    parser.add_argument('--no-bench', action='store_true', help='only check equivalence')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    # The legacy functions log warnings for invalid input on every call
+    logging.disable(logging.CRITICAL)
+    ensure_optional_modules()
+
+    seed = args.seed if args.seed is not None else int(time.time())
+    print(f'Seed: {seed}')
+    cases = generate_cases(seed, args.iterations)
+
+    all_equal = True
+    for tool_dir, version_dir, script_name, functions in TARGETS:
+        script_path = os.path.join(REPO_ROOT, tool_dir, version_dir, script_name)
+        label = f'{tool_dir}/{version_dir}'
+        legacy = load_engine(version_dir, script_path)
+        fast = load_fast_module(script_path)
+        failures = check_target(label, legacy, fast, functions, cases, args.max_failures)
+        all_equal &= not any(failures.values())
+        if not args.no_bench:
+            benchmark_target(label, legacy, fast, functions, cases, args.repeat)
+
+    return 0 if all_equal else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,238 @@
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import threading
+import importlib.util
+from datetime import datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+# Local comparison service: keeps the compare engines imported, their caches warm and
+# the V1 baselines resident between jobs, so a scheduler can submit work without paying
+# Python/openpyxl start-up and V1 parsing on every run.
+#
+# Listens on 127.0.0.1 only. Requests and responses are JSON:
+#   GET  /status                                             loaded engines and baselines
+#   POST /compare        {"engine", "file1", "file2", "output"?}  compare one V1/V2 pair
+#   POST /compare_folder {"engine", "root", "baseline"?}          process_folder() on a recompare folder
+#   POST /baseline       {"engine", "root"}                       load (or reload) a V1 baseline
+#
+# "baseline" is a recompare folder whose V1 workbooks stay in memory; "root" then only
+# needs the <school>/V2 folders of the build. Jobs run one at a time.
+#
+# Example:
+#   python service.py --port 8765
+#   curl -X POST localhost:8765/compare_folder -d '{"engine": "kinmu", "root": "C:/recompare"}'
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ENGINES = {
+    'kinmu': os.path.join(REPO_ROOT, 'kinmu_compare', 'version-3.3-latest', 'kinmu.py'),
+    'shift': os.path.join(REPO_ROOT, 'shift_compare', 'version-3.1-latest', 'shifuto.py'),
+}
+
+
+def setup_logging(log_level):
+    log_dir = 'logs'
+    os.makedirs(log_dir, exist_ok=True)
+    log_file = os.path.join(log_dir, f'service_{datetime.now().strftime("%Y%m%d_%H%M%S")}.log')
+    logging.basicConfig(
+        level=getattr(logging, log_level),
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(log_file, encoding='utf-8'),
+            logging.StreamHandler(),
+        ],
+    )
+
+
+def sibling_modules(script_dir):
+    """Names of the helper modules next to an engine script (rule_set, snapshot, ...)."""
+    return {os.path.splitext(name)[0] for name in os.listdir(script_dir) if name.endswith('.py')}
+
+
+def load_engine(name):
+    """
+    Import an engine script once, with its sibling modules imported fresh for it.
+
+    The engines share helper module names (rule_set, snapshot, baseline, ...), so the
+    names are taken out of sys.modules while the script is imported and put back
+    afterwards, as compare_bench/version-1/bench.py does: each engine keeps its own
+    helpers through its globals (no engine imports a helper at call time).
+    """
+    script_path = ENGINES[name]
+    script_dir = os.path.dirname(script_path)
+    spec = importlib.util.spec_from_file_location(f'service_{name}', script_path)
+    module = importlib.util.module_from_spec(spec)
+    siblings = sibling_modules(script_dir)
+    saved = {sibling: sys.modules.pop(sibling) for sibling in siblings if sibling in sys.modules}
+    sys.path.insert(0, script_dir)
+    try:
+        spec.loader.exec_module(module)
+    finally:
+        sys.path.remove(script_dir)
+        for sibling in siblings:
+            sys.modules.pop(sibling, None)
+        sys.modules.update(saved)
+
+    # No dialogs in the service, messages go to the log
+    module.HEADLESS = True
+    return module
+
+
+class CompareService:
+    """Engines, baselines and a job lock shared by all request handlers."""
+
+    def __init__(self):
+        self.engines = {}
+        self.baselines = {}
+        self.lock = threading.Lock()
+        self.jobs = 0
+        self.started = datetime.now()
+
+    def engine(self, name):
+        if name not in ENGINES:
+            raise ValueError(f"Unknown engine: {name} (expected one of {', '.join(ENGINES)})")
+        if name not in self.engines:
+            start = time.perf_counter()
+            self.engines[name] = load_engine(name)
+            logging.info(f'Engine {name} loaded in {time.perf_counter() - start:.2f}s')
+        return self.engines[name]
+
+    def baseline(self, name, root, reload=False):
+        """Resident BaselineSet for a recompare folder, loaded on first use."""
+        key = (name, os.path.normpath(root))
+        if reload or key not in self.baselines:
+            module = self.engine(name)
+            baseline = module.BaselineSet(root, module.index_baseline_sheet)
+            baseline.load()
+            self.baselines[key] = baseline
+        return self.baselines[key]
+
+    def find_baseline(self, name, file1):
+        """BaselineWorkbook for a V1 file if one of the loaded baselines holds it."""
+        for (engine_name, _), baseline in self.baselines.items():
+            if engine_name == name:
+                entry = baseline.get(file1)
+                if entry is not None:
+                    return entry
+        return None
+
+    def compare(self, request):
+        name = request['engine']
+        module = self.engine(name)
+        file1 = request['file1']
+        file2 = request['file2']
+        result, modified_wb = module.compare_excel_files(file1, file2, self.find_baseline(name, file1))
+        output = request.get('output')
+        if output:
+            os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+            modified_wb.save(output)
+        return {'result': result, 'output': output}
+
+    def compare_folder(self, request):
+        name = request['engine']
+        module = self.engine(name)
+        baseline = self.baseline(name, request['baseline']) if request.get('baseline') else None
+        return {'success': module.process_folder(request['root'], baseline)}
+
+    def load_baseline(self, request):
+        baseline = self.baseline(request['engine'], request['root'], reload=True)
+        return {'workbooks': len(baseline.workbooks)}
+
+    def status(self):
+        return {
+            'started': self.started.isoformat(timespec='seconds'),
+            'jobs': self.jobs,
+            'engines': sorted(self.engines),
+            'baselines': [{'engine': name, 'root': root, 'workbooks': len(baseline.workbooks)}
+                          for (name, root), baseline in self.baselines.items()],
+        }
+
+    def run(self, action, request):
+        """Run one job under the lock and time it."""
+        with self.lock:
+            start = time.perf_counter()
+            response = action(request)
+            self.jobs += 1
+        response['elapsed_ms'] = round((time.perf_counter() - start) * 1000, 1)
+        return response
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    service = None
+
+    def send_json(self, status, body):
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == '/status':
+            self.send_json(200, self.service.status())
+        else:
+            self.send_json(404, {'error': f'Unknown path: {self.path}'})
+
+    def do_POST(self):
+        actions = {
+            '/compare': self.service.compare,
+            '/compare_folder': self.service.compare_folder,
+            '/baseline': self.service.load_baseline,
+        }
+        action = actions.get(self.path)
+        if action is None:
+            self.send_json(404, {'error': f'Unknown path: {self.path}'})
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError as e:
+            self.send_json(400, {'error': f'Invalid JSON: {str(e)}'})
+            return
+        try:
+            self.send_json(200, self.service.run(action, request))
+        except (KeyError, ValueError) as e:
+            self.send_json(400, {'error': f'Bad request: {str(e)}'})
+        except Exception as e:
+            logging.error(f'Error in {self.path}: {str(e)}', exc_info=True)
+            self.send_json(500, {'error': str(e)})
+
+    def log_message(self, format, *args):
+        logging.debug(f'{self.address_string()} - {format % args}')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Local comparison service with warm engines and baselines.')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--engines', nargs='*', default=list(ENGINES), help='engines to import at start-up')
+    parser.add_argument('--baseline', nargs=2, action='append', default=[], metavar=('ENGINE', 'ROOT'),
+                        help='V1 baseline to load at start-up (repeatable)')
+    parser.add_argument('--log-level', default='INFO', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'])
+    args = parser.parse_args(argv)
+
+    setup_logging(args.log_level)
+    service = CompareService()
+    for name in args.engines:
+        service.engine(name)
+    for name, root in args.baseline:
+        service.baseline(name, root)
+
+    RequestHandler.service = service
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), RequestHandler)
+    logging.info(f'Comparison service listening on http://127.0.0.1:{args.port}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logging.info('Service stopped')
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,27 @@
 import os
-import xlwings as xw
+import sys
 import logging
+import argparse
 from pathlib import Path
 import platform
 import subprocess
-import tkinter as tk
-from tkinter import filedialog, messagebox
 import shutil
 import time
 import calendar
 import re
 
+# xlwings and tkinter are imported where they are used, so the batch mode (run_cli)
+# starts without a display and only needs xlwings once a file is converted.
+
 class ConversionError(Exception):
     """Custom exception for conversion errors"""
     pass
 
-def setup_logging(output_dir):
+def setup_logging(output_dir, level=logging.INFO):
     """Configure logging to track conversion process and any errors"""
     log_file = os.path.join(output_dir, f'conversion_log_{time.strftime("%Y%m%d_%H%M%S")}.txt')
     logging.basicConfig(
-        level=logging.INFO,
+        level=level,
         format='%(asctime)s - %(levelname)s - %(message)s',
         handlers=[
             logging.FileHandler(log_file, encoding='utf-8'),
@@ -37,6 +39,7 @@ def select_folder(root, title="Select Folder"):
     Returns:
         str: Selected folder path or None if cancelled.
     """
+    from tkinter import filedialog
     try:
         folder_path = filedialog.askdirectory(title=title, parent=root)
         return folder_path if folder_path else None
@@ -46,6 +49,7 @@ def select_folder(root, title="Select Folder"):
         
 def create_root():
     """Create and configure the Tkinter root window."""
+    import tkinter as tk
     root = tk.Tk()
     root.withdraw()  # Hide the main Tkinter window
     root.attributes("-topmost", True)  # Bring the dialog to the front
@@ -75,6 +79,7 @@ def check_excel_installation():
             return False
     else:  # Windows
         try:
+            import xlwings as xw
             xw.apps.keys()
             return True
         except:
@@ -187,6 +192,7 @@ def convert_xls_to_xlsx(xls_file, output_dir):
         xlsx_file = check_output_file(xlsx_file)
         
         # Start Excel application in the background
+        import xlwings as xw
         app = xw.App(visible=False)
         
         # Open workbook
@@ -216,8 +222,50 @@ def convert_xls_to_xlsx(xls_file, output_dir):
             except:
                 pass
 
+def convert_source_folder(source_folder):
+    """
+    Convert the .xls files of every V1 folder under source_folder to .xlsx, in place.
+
+    Args:
+        source_folder (str): Folder containing <school>/V1 subfolders.
+
+    Returns:
+        tuple: (successful, failed) conversion counts, or None if no V1 folder was found.
+    """
+    # Find all V1 subfolders
+    v1_folders = [str(p) for p in Path(source_folder).rglob("*/V1") if p.is_dir()]
+
+    if not v1_folders:
+        logging.info("No V1 folders found in the source directory.")
+        return None
+
+    logging.info(f"Found {len(v1_folders)} V1 folders. Starting conversion...")
+
+    successful, failed = 0, 0
+
+    for v1_folder in v1_folders:
+        xls_files = get_xls_files(v1_folder)
+        if not xls_files:
+            logging.info(f"No .xls files found in {v1_folder}")
+            continue
+
+        for xls_file in xls_files:
+            try:
+                success = convert_xls_to_xlsx(xls_file, v1_folder)  # Save in the same location
+                if success:
+                    successful += 1
+                    xls_file.unlink()  # Delete the original .xls file
+                else:
+                    failed += 1
+            except Exception as e:
+                logging.error(f"Unexpected error processing {xls_file.name}: {str(e)}")
+                failed += 1
+
+    return successful, failed
+
 def main():
     """Main function to handle the conversion process."""
+    from tkinter import messagebox
     root = create_root()  # Create and configure the Tkinter root window
     try:
         # Select source folder
@@ -231,39 +279,15 @@ def main():
             )
             return
 
-        # Find all V1 subfolders
-        v1_folders = [str(p) for p in Path(source_folder).rglob("*/V1") if p.is_dir()]
-
-        if not v1_folders:
-            logging.info("No V1 folders found in the source directory.")
+        result = convert_source_folder(source_folder)
+        if result is None:
             messagebox.showinfo(
                 "No V1 Folders Found",
                 "No V1 folders found in the selected source directory.",
                 parent=root
             )
             return
-
-        logging.info(f"Found {len(v1_folders)} V1 folders. Starting conversion...")
-
-        successful, failed = 0, 0
-
-        for v1_folder in v1_folders:
-            xls_files = get_xls_files(v1_folder)
-            if not xls_files:
-                logging.info(f"No .xls files found in {v1_folder}")
-                continue
-
-            for xls_file in xls_files:
-                try:
-                    success = convert_xls_to_xlsx(xls_file, v1_folder)  # Save in the same location
-                    if success:
-                        successful += 1
-                        xls_file.unlink()  # Delete the original .xls file
-                    else:
-                        failed += 1
-                except Exception as e:
-                    logging.error(f"Unexpected error processing {xls_file.name}: {str(e)}")
-                    failed += 1
+        successful, failed = result
 
         summary = (f"\nConversion Summary:\n"
                    f"Total successfully converted: {successful}\n"
@@ -281,5 +305,23 @@ def main():
             root.quit()
             root.destroy()
 
+def run_cli(argv=None):
+    """Batch entry point: convert without dialogs. Returns the exit code."""
+    parser = argparse.ArgumentParser(description='Convert the .xls files of every V1 folder to .xlsx, in place.')
+    parser.add_argument('source_folder', help='folder containing <school>/V1 subfolders')
+    parser.add_argument('--log-level', choices=['DEBUG', 'INFO', 'WARNING'], default='INFO')
+    args = parser.parse_args(argv)
+
+    setup_logging(args.source_folder, getattr(logging, args.log_level))
+    result = convert_source_folder(args.source_folder)
+    if result is None:
+        return 1
+    successful, failed = result
+    logging.info(f"Conversion Summary: successfully converted {successful}, failed {failed}")
+    return 0 if failed == 0 else 1
+
 if __name__ == "__main__":
+    # Any command line arguments select the batch mode, without arguments the GUI starts
+    if len(sys.argv) > 1:
+        sys.exit(run_cli())
     main()
\ No newline at end of file
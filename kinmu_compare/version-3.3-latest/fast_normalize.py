@@ -0,0 +1,137 @@
+import re
+from datetime import datetime
+from functools import lru_cache
+
+
+# Date detection and comparison for compare_values() of the kinmu and shift engines: every
+# date shape of is_datetime_string() / extract_date_part() in one regex, and dates
+# compared as ordinals instead of formatted strings. The results must be exactly those
+# of the original functions, compare_bench/version-1/fuzz_normalizers.py checks this.
+
+# Same patterns that datetime.strptime builds for %Y %m %d %H %M %S
+_Y = r'(\d\d\d\d)'
+_m = r'(1[0-2]|0[1-9]|[1-9])'
+_d = r'(3[0-1]|[1-2]\d|0[1-9]|[1-9]| [1-9])'
+_H = r'(2[0-3]|[0-1]\d|\d)'
+_M = r'([0-5]\d|\d)'
+_S = r'(6[0-1]|[0-5]\d|\d)'
+
+# Every date shape of is_datetime_string() / extract_date_part() in one regex: date with
+# '/' or '-', optional time with optional seconds, optional 午前/午後 suffix. Same groups
+# as the strptime patterns, and those match their longest alternative first, so a full
+# match here is a match of one of the strptime formats (the shape is checked after).
+_DATE_SHAPE = re.compile(
+    _Y + r'([/-])' + _m + r'\2' + _d
+    + r'(?:\s+' + _H + ':' + _M + r'(?::' + _S + r')?(\s+(?:午前|午後))?)?',
+    re.IGNORECASE)
+
+# Days before each month in a common year (index 1 = January)
+_DAYS_BEFORE_MONTH = (0, 0, 31, 59, 90, 120, 151, 181, 212, 243, 273, 304, 334)
+_DAYS_IN_MONTH = (0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+_DATE_SEARCH = re.compile(r'(\d{4})[-/](\d{1,2})[-/](\d{1,2})')
+
+
+def _format_date(dt):
+    """Same as dt.strftime('%Y/%m/%d') (strftime is kept for years < 1000, which are platform dependent)."""
+    if dt.year < 1000:
+        return dt.strftime('%Y/%m/%d')
+    return f"{dt.year}/{dt.month:02d}/{dt.day:02d}"
+
+
+def _is_leap(year):
+    return year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+
+
+def _is_valid_date(year, month, day):
+    if year < 1 or not 1 <= month <= 12 or day < 1:
+        return False
+    return day <= _DAYS_IN_MONTH[month] + (month == 2 and _is_leap(year))
+
+
+def _ordinal(year, month, day):
+    """Proleptic Gregorian ordinal, same as date(year, month, day).toordinal()."""
+    before = year - 1
+    days = before * 365 + before // 4 - before // 100 + before // 400
+    days += _DAYS_BEFORE_MONTH[month] + (month > 2 and _is_leap(year))
+    return days + day
+
+
+def _date_shape(value):
+    """
+    (separator, year, month, day) of a string in one of the strptime date shapes, None otherwise.
+    Dates and seconds that datetime() rejects (Feb 30, :60) fail like strptime does.
+    """
+    if len(value) < 8 or not value[:4].isdecimal():
+        return None
+    found = _DATE_SHAPE.fullmatch(value)
+    if found is None:
+        return None
+    year, separator, month, day, hours, minutes, seconds, suffix = found.groups()
+    if separator == '-' and hours is not None and (seconds is None or suffix is not None):
+        # Only '%Y-%m-%d' and '%Y-%m-%d %H:%M:%S' for hyphens
+        return None
+    if seconds is not None and int(seconds) > 59:
+        return None
+    year = int(year)
+    month = int(month)
+    day = int(day)
+    if not _is_valid_date(year, month, day):
+        return None
+    return separator, year, month, day
+
+
+def is_datetime_string(value):
+    """Check if a string represents a datetime."""
+    if not isinstance(value, str):
+        return False
+    shape = _date_shape(value)
+    return shape is not None and shape[0] == '/'
+
+
+def is_date_value(value):
+    """A datetime or a datetime string, the date test of compare_values()."""
+    return isinstance(value, datetime) or is_datetime_string(value)
+
+
+@lru_cache(maxsize=65536)
+def _string_date_key(value):
+    shape = _date_shape(value)
+    if shape is not None:
+        _, year, month, day = shape
+        if year >= 1000:
+            return _ordinal(year, month, day)
+        return _format_date(datetime(year, month, day))
+
+    match = _DATE_SEARCH.search(value)
+    if match:
+        year, month, day = match.groups()
+        if year.isascii() and _is_valid_date(int(year), int(month), int(day)) and int(year) >= 1000:
+            return _ordinal(int(year), int(month), int(day))
+        return f"{year}/{int(month):02d}/{int(day):02d}"
+    return value
+
+
+def date_key(value):
+    """
+    Comparison key of extract_date_part() for a normalized value (datetime or str): the
+    ordinal of the date where extract_date_part() gives a valid "YYYY/MM/DD", else the
+    same string it gives. Equal keys mean equal extract_date_part() results.
+    """
+    if isinstance(value, datetime):
+        if value.year >= 1000:
+            return value.toordinal()
+        return _format_date(value)
+    if not isinstance(value, str):
+        return value
+    return _string_date_key(value)
+
+
+def same_date(value1, value2):
+    """extract_date_part(value1) == extract_date_part(value2), on ordinals instead of strings."""
+    return date_key(value1) == date_key(value2)
+
+
+def clear_caches():
+    """Drop memoized results (used by the benchmarks for cold timings)."""
+    _string_date_key.cache_clear()
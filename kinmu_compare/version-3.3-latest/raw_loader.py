@@ -0,0 +1,425 @@
+import logging
+import posixpath
+import zipfile
+from array import array
+from functools import partial
+from xml.etree.ElementTree import fromstring, iterparse
+
+import openpyxl
+from openpyxl.formula.translate import Translator
+from openpyxl.styles.numbers import builtin_format_code, is_date_format, is_timedelta_format
+from openpyxl.utils.cell import coordinate_to_tuple, range_boundaries
+from openpyxl.utils.datetime import CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900, from_excel, from_ISO8601
+
+from sheet_grid import ValueTable, GridSheet, GridWorkbook
+
+
+# Reads the cell values of an xlsx straight from the zip into a GridWorkbook, without
+# openpyxl's object model (a Cell with a style array per cell, every sheet, every part).
+# Only workbook.xml, its rels, styles.xml (number formats), the shared strings and the
+# wanted sheets are parsed, the sheets with iterparse. Shared strings are parsed lazily,
+# up to the highest index a decoded cell refers to: the table is written in order of
+# first use, so strings only used by hidden sheets or rows that are not decoded usually
+# come last and are never read.
+#
+# A terminator (first_row, column, matches) limits the decoded region of each sheet to
+# the rows up to the first row whose cell in that column matches (the '計' row of a
+# 勤務表). The rest of the sheet is only scanned for its size; its cells are read on the
+# first access below the terminator (RawSheet), so the values seen are the same.
+#
+# Numbers are kept as the raw int/float of the XML. A number is turned into a datetime /
+# time / timedelta only when its style has a date format, exactly like openpyxl does,
+# but once per distinct (serial, format kind) instead of once per cell: the same dates
+# and times repeat down every 勤務表 column.
+#
+# The result is the grid workbook_to_grid() makes of openpyxl's workbook: same values,
+# same max_row / max_column (styled empty cells and merged ranges count, as openpyxl
+# creates cells for them). Sheets with parts that would make openpyxl create or change
+# further cells (comments, hyperlinks, array and data table formulas) raise RawLoadError,
+# and open_workbook() loads those files with openpyxl instead.
+
+SHEET_MAIN_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+REL_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+PKG_REL_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+
+ROW_TAG = f'{{{SHEET_MAIN_NS}}}row'
+CELL_TAG = f'{{{SHEET_MAIN_NS}}}c'
+VALUE_TAG = f'{{{SHEET_MAIN_NS}}}v'
+FORMULA_TAG = f'{{{SHEET_MAIN_NS}}}f'
+INLINE_STRING_TAG = f'{{{SHEET_MAIN_NS}}}is'
+TEXT_TAG = f'{{{SHEET_MAIN_NS}}}t'
+RUN_TAG = f'{{{SHEET_MAIN_NS}}}r'
+STRING_ITEM_TAG = f'{{{SHEET_MAIN_NS}}}si'
+MERGE_CELL_TAG = f'{{{SHEET_MAIN_NS}}}mergeCell'
+HYPERLINKS_TAG = f'{{{SHEET_MAIN_NS}}}hyperlinks'
+
+OFFICE_DOCUMENT = f'{REL_NS}/officeDocument'
+WORKSHEET_REL = f'{REL_NS}/worksheet'
+STYLES_REL = f'{REL_NS}/styles'
+SHARED_STRINGS_REL = f'{REL_NS}/sharedStrings'
+COMMENTS_REL = f'{REL_NS}/comments'
+
+# openpyxl accepts these extensions only; other files are left to it (and its error)
+RAW_EXTENSIONS = ('.xlsx', '.xlsm', '.xltx', '.xltm')
+
+# Style kinds of a number cell
+NUMBER, DATE, TIMEDELTA = range(3)
+
+
+class RawLoadError(Exception):
+    """Raised when a workbook has parts the raw loader does not read like openpyxl."""
+    pass
+
+
+# Errors after which a file is loaded with openpyxl instead (ParseError is a SyntaxError)
+FALLBACK_ERRORS = (RawLoadError, zipfile.BadZipFile, KeyError, IndexError, ValueError, SyntaxError)
+
+
+def read_rels(archive, part):
+    """Relationships of a part as {Id: (Type, target part)}."""
+    folder, name = posixpath.split(part)
+    rels_path = posixpath.join(folder, '_rels', name + '.rels')
+    if rels_path not in archive.NameToInfo:
+        return {}
+    rels = {}
+    for rel in fromstring(archive.read(rels_path)):
+        target = rel.get('Target')
+        if rel.get('TargetMode') == 'External':
+            continue
+        if target.startswith('/'):
+            target = target[1:]
+        else:
+            target = posixpath.normpath(posixpath.join(folder, target))
+        rels[rel.get('Id')] = (rel.get('Type'), target)
+    return rels
+
+
+def text_content(node):
+    """Plain text of a shared or inline string (runs joined, phonetic text left out)."""
+    snippets = []
+    plain = None
+    for child in node:
+        if child.tag == TEXT_TAG:
+            plain = child.text
+        elif child.tag == RUN_TAG:
+            text = None
+            for run_child in child:
+                if run_child.tag == TEXT_TAG:
+                    text = run_child.text
+            if text is not None:
+                snippets.append(text)
+    if plain is not None:
+        snippets.insert(0, plain)
+    return ''.join(snippets)
+
+
+class SharedStrings:
+    """Shared string table of a workbook, parsed up to the highest index asked for so far."""
+
+    def __init__(self, archive, part):
+        self.archive = archive
+        self.part = part
+        self.strings = []
+        self.source = None
+        self.items = None
+
+    def __getitem__(self, index):
+        if index >= len(self.strings):
+            self.read_to(index)
+        return self.strings[index]
+
+    def read_to(self, index):
+        if self.items is None:
+            if self.part is None:
+                raise IndexError(f'Shared string {index} without a shared string table')
+            self.source = self.archive.open(self.part)
+            self.items = iterparse(self.source)
+        strings = self.strings
+        for _, node in self.items:
+            if node.tag == STRING_ITEM_TAG:
+                strings.append(text_content(node).replace('x005F_', ''))
+                node.clear()
+                if len(strings) > index:
+                    return
+        raise IndexError(f'Shared string {index} not in {self.part}')
+
+    def close(self):
+        if self.source is not None:
+            self.source.close()
+
+
+def read_style_kinds(archive, part):
+    """Kind (NUMBER, DATE, TIMEDELTA) of each cell style index, from the number formats of styles.xml."""
+    if part is None:
+        return []
+    root = fromstring(archive.read(part))
+    custom = {}
+    num_fmts = root.find(f'{{{SHEET_MAIN_NS}}}numFmts')
+    if num_fmts is not None:
+        for num_fmt in num_fmts:
+            custom[int(num_fmt.get('numFmtId'))] = num_fmt.get('formatCode')
+    kinds = []
+    cell_xfs = root.find(f'{{{SHEET_MAIN_NS}}}cellXfs')
+    for xf in (cell_xfs if cell_xfs is not None else []):
+        num_fmt_id = int(xf.get('numFmtId', 0))
+        fmt = custom[num_fmt_id] if num_fmt_id in custom else builtin_format_code(num_fmt_id)
+        if is_timedelta_format(fmt):
+            kinds.append(TIMEDELTA)
+        elif is_date_format(fmt):
+            kinds.append(DATE)
+        else:
+            kinds.append(NUMBER)
+    return kinds
+
+
+class SheetReader:
+    """Parses one worksheet part into value ids of a ValueTable."""
+
+    def __init__(self, archive, part, shared_strings, style_kinds, epoch, table, dates):
+        self.archive = archive
+        self.part = part
+        self.shared_strings = shared_strings
+        self.style_kinds = style_kinds
+        self.epoch = epoch
+        self.table = table
+        self.dates = dates
+        self.shared_formulae = {}
+
+    def number(self, text, style_id):
+        value = float(text) if ('.' in text or 'E' in text or 'e' in text) else int(text)
+        kind = self.style_kinds[style_id] if style_id < len(self.style_kinds) else NUMBER
+        if kind == NUMBER:
+            return value
+        key = (value.__class__, value, kind)
+        converted = self.dates.get(key)
+        if converted is None:
+            try:
+                converted = from_excel(value, self.epoch, timedelta=kind == TIMEDELTA)
+            except (OverflowError, ValueError):
+                logging.warning(f'Cell in {self.part} is marked as a date but the serial value {value} '
+                                f'is outside the limits for dates, read as #VALUE!')
+                converted = '#VALUE!'
+            self.dates[key] = converted
+        return converted
+
+    def formula(self, element, coordinate):
+        formula = element.find(FORMULA_TAG)
+        formula_type = formula.get('t')
+        value = '='
+        if formula.text is not None:
+            value += formula.text
+        if formula_type in ('array', 'dataTable'):
+            raise RawLoadError(f'{formula_type} formula in {self.part}')
+        if formula_type == 'shared':
+            index = formula.get('si')
+            if index in self.shared_formulae:
+                value = self.shared_formulae[index].translate_formula(coordinate)
+            elif formula.text is not None:
+                self.shared_formulae[index] = Translator(value, coordinate)
+        return value
+
+    def cell_value(self, element, coordinate):
+        data_type = element.get('t', 'n')
+        if element.find(FORMULA_TAG) is not None:
+            return self.formula(element, coordinate)
+        if data_type == 'inlineStr':
+            child = element.find(INLINE_STRING_TAG)
+            return text_content(child) if child is not None else None
+        value = element.findtext(VALUE_TAG, None) or None
+        if value is None:
+            return None
+        if data_type == 'n':
+            return self.number(value, int(element.get('s', 0)))
+        if data_type == 's':
+            return self.shared_strings[int(value)]
+        if data_type == 'b':
+            return bool(int(value))
+        if data_type == 'd':
+            return from_ISO8601(value)
+        return value
+
+    def read(self, title, sheet_state, terminator=None):
+        """GridSheet of the part, sized like openpyxl's worksheet (a RawSheet when rows were left out)."""
+        intern = self.table.intern
+        first_row, stop_column, matches = terminator if terminator is not None else (0, 0, None)
+        cells = {}
+        merged = []
+        row = 0
+        column = 0
+        # Rows after last_row are not decoded, only their size is kept
+        last_row = None
+        tail_rows = 0
+        tail_columns = 0
+        with self.archive.open(self.part) as source:
+            for event, element in iterparse(source, events=('start', 'end')):
+                tag = element.tag
+                if event == 'start':
+                    if tag == ROW_TAG:
+                        row = int(element.get('r')) if element.get('r') else row + 1
+                        column = 0
+                    continue
+                if tag == CELL_TAG:
+                    if last_row is not None and row > last_row:
+                        formula = element.find(FORMULA_TAG)
+                        if formula is not None and formula.get('t') in ('array', 'dataTable'):
+                            raise RawLoadError(f"{formula.get('t')} formula in {self.part}")
+                        continue
+                    coordinate = element.get('r')
+                    if coordinate:
+                        row, column = coordinate_to_tuple(coordinate)
+                    else:
+                        column += 1
+                    value = self.cell_value(element, coordinate)
+                    cells[(row, column)] = intern(value)
+                    if column == stop_column and row >= first_row and last_row is None and matches(value):
+                        last_row = row
+                elif tag == ROW_TAG:
+                    if last_row is not None and row > last_row and len(element):
+                        # Cells of a row are in column order, the last one ends the row
+                        coordinate = element[-1].get('r')
+                        tail_rows = max(tail_rows, row)
+                        tail_columns = max(tail_columns, coordinate_to_tuple(coordinate)[1]
+                                           if coordinate else len(element))
+                    element.clear()
+                elif tag == MERGE_CELL_TAG:
+                    merged.append(element.get('ref'))
+                elif tag == HYPERLINKS_TAG:
+                    raise RawLoadError(f'Hyperlinks in {self.part}')
+
+        # openpyxl replaces every cell of a merged range but the top left one with an empty MergedCell
+        for ref in merged:
+            min_col, min_row, max_col, max_row = range_boundaries(ref)
+            for merged_row in range(min_row, max_row + 1):
+                for merged_column in range(min_col, max_col + 1):
+                    if (merged_row, merged_column) != (min_row, min_col):
+                        cells[(merged_row, merged_column)] = 0
+
+        max_row = max(max((position[0] for position in cells), default=1), tail_rows)
+        max_column = max(max((position[1] for position in cells), default=1), tail_columns)
+        ids = array('I', bytes(4 * max_row * max_column))
+        for (cell_row, cell_column), value_id in cells.items():
+            if value_id and (last_row is None or cell_row <= last_row):
+                ids[(cell_row - 1) * max_column + cell_column - 1] = value_id
+        if last_row is not None and last_row < max_row:
+            return RawSheet(title, max_row, max_column, ids, self.table, sheet_state, last_row)
+        return GridSheet(title, max_row, max_column, ids, self.table, sheet_state)
+
+
+class RawSheet(GridSheet):
+    """
+    GridSheet decoded up to a terminator row. The first access to a later row reads
+    the sheet again in full (load_rest is set by load_raw_workbook).
+    """
+
+    def __init__(self, title, max_row, max_column, ids, table, sheet_state, loaded_rows):
+        GridSheet.__init__(self, title, max_row, max_column, ids, table, sheet_state)
+        self.loaded_rows = loaded_rows
+        self.load_rest = None
+
+    def read_rest(self):
+        sheet = self.load_rest()
+        self.load_rest = None
+        if sheet.rows != self.rows or sheet.columns != self.columns:
+            raise RawLoadError(f'Sheet {self.title} changed on disk while it was read')
+        start = self.loaded_rows * self.columns
+        self.ids[start:] = sheet.ids[start:]
+        self.loaded_rows = self.rows
+        logging.debug(f'Sheet {self.title} read in full ({self.rows} rows)')
+
+    def get_id(self, row, column):
+        if self.loaded_rows < row <= self.rows and self.load_rest is not None:
+            self.read_rest()
+        return GridSheet.get_id(self, row, column)
+
+    def set_value(self, row, column, value):
+        if self.loaded_rows < row <= self.rows and self.load_rest is not None:
+            self.read_rest()
+        GridSheet.set_value(self, row, column, value)
+
+    def copy(self):
+        if self.load_rest is not None:
+            self.read_rest()
+        return GridSheet.copy(self)
+
+
+class WorkbookParts:
+    """The parts of an open xlsx every sheet needs: worksheet list, date epoch, number formats, shared strings."""
+
+    def __init__(self, archive, file_path):
+        package_rels = read_rels(archive, '')
+        workbook_parts = [target for rel_type, target in package_rels.values() if rel_type == OFFICE_DOCUMENT]
+        if not workbook_parts:
+            raise RawLoadError(f'No workbook part in {file_path}')
+        workbook_part = workbook_parts[0]
+        workbook = fromstring(archive.read(workbook_part))
+        rels = read_rels(archive, workbook_part)
+
+        workbook_pr = workbook.find(f'{{{SHEET_MAIN_NS}}}workbookPr')
+        date1904 = workbook_pr is not None and workbook_pr.get('date1904', '').lower() in ('1', 'true')
+        self.archive = archive
+        self.epoch = CALENDAR_MAC_1904 if date1904 else CALENDAR_WINDOWS_1900
+
+        parts = {rel_type: target for rel_type, target in rels.values()}
+        self.shared_strings = SharedStrings(archive, parts.get(SHARED_STRINGS_REL))
+        self.style_kinds = read_style_kinds(archive, parts.get(STYLES_REL))
+        self.dates = {}
+
+        # (title, state, part) of each worksheet, in workbook order
+        self.sheets = []
+        sheets = workbook.find(f'{{{SHEET_MAIN_NS}}}sheets')
+        for sheet in (sheets if sheets is not None else []):
+            rel_type, part = rels.get(sheet.get(f'{{{REL_NS}}}id'), (None, None))
+            if rel_type == WORKSHEET_REL and part in archive.NameToInfo:
+                self.sheets.append((sheet.get('name'), sheet.get('state', 'visible'), part))
+
+    def read_sheet(self, title, sheet_state, part, table, terminator=None):
+        if any(rel_type == COMMENTS_REL for rel_type, _ in read_rels(self.archive, part).values()):
+            raise RawLoadError(f'Comments in {part}')
+        reader = SheetReader(self.archive, part, self.shared_strings, self.style_kinds, self.epoch, table, self.dates)
+        return reader.read(title, sheet_state, terminator)
+
+    def close(self):
+        self.shared_strings.close()
+
+
+def read_raw_sheet(file_path, title, sheet_state, part, table):
+    """One worksheet of an xlsx, read in full."""
+    with zipfile.ZipFile(file_path) as archive:
+        parts = WorkbookParts(archive, file_path)
+        try:
+            return parts.read_sheet(title, sheet_state, part, table)
+        finally:
+            parts.close()
+
+
+def load_raw_workbook(file_path, visible_only=True, table=None, terminator=None):
+    """Read the (visible) worksheets of an xlsx into a GridWorkbook, see the notes above."""
+    if not file_path.lower().endswith(RAW_EXTENSIONS):
+        raise RawLoadError(f'Not an xlsx file: {file_path}')
+    table = table if table is not None else ValueTable()
+    worksheets = []
+    with zipfile.ZipFile(file_path) as archive:
+        parts = WorkbookParts(archive, file_path)
+        try:
+            for title, sheet_state, part in parts.sheets:
+                if visible_only and sheet_state != 'visible':
+                    continue
+                sheet = parts.read_sheet(title, sheet_state, part, table, terminator)
+                if isinstance(sheet, RawSheet):
+                    sheet.load_rest = partial(read_raw_sheet, file_path, title, sheet_state, part, table)
+                worksheets.append(sheet)
+        finally:
+            parts.close()
+    return GridWorkbook(worksheets, table)
+
+
+def open_workbook(file_path, visible_only=True, table=None, terminator=None):
+    """
+    Workbook for reading cell values: the raw GridWorkbook, or openpyxl's workbook for
+    files the raw loader does not handle (which also reports unreadable files as before).
+    """
+    try:
+        return load_raw_workbook(file_path, visible_only, table, terminator)
+    except FALLBACK_ERRORS as e:
+        logging.debug(f'Loading {file_path} with openpyxl: {str(e)}')
+        return openpyxl.load_workbook(file_path)
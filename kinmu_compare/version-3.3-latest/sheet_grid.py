@@ -0,0 +1,196 @@
+from array import array
+
+from openpyxl.utils import get_column_letter
+
+
+# Lightweight, read/write stand-in for an openpyxl workbook.
+# Only the parts of the openpyxl API the compare engines use are implemented:
+# wb.worksheets, wb[title], ws.title, ws.sheet_state, ws.max_row, ws.max_column,
+# ws.cell(row, column).value (read and write), ws.iter_rows(...) and ws[row].
+# Cell values are stored as array('I') ids into a ValueTable, 0 meaning None.
+# Fills set on cells (the report engines mark V2 cells they never save) are kept
+# per sheet in a dict, no other styles are.
+
+
+class ValueTable:
+    """Interned cell values shared by the sheets of a workbook (id 0 is None)."""
+
+    def __init__(self, values=None):
+        self.values = [None]
+        self._ids = {}
+        for value in values or []:
+            self.intern(value)
+
+    def intern(self, value):
+        """Return the id of a value, adding it to the table if needed."""
+        if value is None:
+            return 0
+        # Keep 1, 1.0 and True apart, they hash the same
+        key = (value.__class__, value)
+        value_id = self._ids.get(key)
+        if value_id is None:
+            value_id = len(self.values)
+            self.values.append(value)
+            self._ids[key] = value_id
+        return value_id
+
+    def __len__(self):
+        return len(self.values)
+
+
+class GridCell:
+    """View on one grid position, like openpyxl's Cell for .value access."""
+
+    __slots__ = ('_sheet', 'row', 'column')
+
+    def __init__(self, sheet, row, column):
+        self._sheet = sheet
+        self.row = row
+        self.column = column
+
+    @property
+    def value(self):
+        return self._sheet.get_value(self.row, self.column)
+
+    @value.setter
+    def value(self, value):
+        self._sheet.set_value(self.row, self.column, value)
+
+    @property
+    def fill(self):
+        return self._sheet.fills.get((self.row, self.column))
+
+    @fill.setter
+    def fill(self, fill):
+        self._sheet.fills[(self.row, self.column)] = fill
+
+    @property
+    def column_letter(self):
+        return get_column_letter(self.column)
+
+    @property
+    def coordinate(self):
+        return f"{get_column_letter(self.column)}{self.row}"
+
+
+class GridSheet:
+    """Worksheet stored as a row-major array of value ids."""
+
+    def __init__(self, title, max_row, max_column, ids, table, sheet_state='visible'):
+        self.title = title
+        self.sheet_state = sheet_state
+        self.table = table
+        self.ids = ids
+        self.rows = max_row
+        self.columns = max_column
+        # openpyxl creates a cell on every access, which grows max_row/max_column.
+        # Cells outside the loaded rectangle are kept here to behave the same way.
+        self._extra = {}
+        self._max_row = max_row
+        self._max_column = max_column
+        self.fills = {}
+
+    @property
+    def max_row(self):
+        return self._max_row
+
+    @property
+    def max_column(self):
+        return self._max_column
+
+    def _touch(self, row, column):
+        if row < 1 or column < 1:
+            raise ValueError("Row or column values must be at least 1")
+        if row > self._max_row:
+            self._max_row = row
+        if column > self._max_column:
+            self._max_column = column
+
+    def get_id(self, row, column):
+        """Return the value id at (row, column)."""
+        if 0 < row <= self.rows and 0 < column <= self.columns:
+            return self.ids[(row - 1) * self.columns + column - 1]
+        self._touch(row, column)
+        return self._extra.get((row, column), 0)
+
+    def get_value(self, row, column):
+        return self.table.values[self.get_id(row, column)]
+
+    def set_value(self, row, column, value):
+        value_id = self.table.intern(value)
+        if 0 < row <= self.rows and 0 < column <= self.columns:
+            self.ids[(row - 1) * self.columns + column - 1] = value_id
+        else:
+            self._touch(row, column)
+            self._extra[(row, column)] = value_id
+
+    def cell(self, row, column):
+        self._touch(row, column)
+        return GridCell(self, row, column)
+
+    def iter_rows(self, min_row=None, max_row=None, min_col=None, max_col=None, values_only=False):
+        min_row = min_row or 1
+        min_col = min_col or 1
+        max_row = max_row or self._max_row
+        max_col = max_col or self._max_column
+        for row in range(min_row, max_row + 1):
+            self._touch(row, max_col)
+            if values_only:
+                yield tuple(self.get_value(row, column) for column in range(min_col, max_col + 1))
+            else:
+                yield tuple(GridCell(self, row, column) for column in range(min_col, max_col + 1))
+
+    def __getitem__(self, row):
+        if not isinstance(row, int):
+            raise TypeError("Grid sheets only support ws[row] indexing")
+        return next(self.iter_rows(min_row=row, max_row=row))
+
+    def copy(self):
+        """Independent copy (the engines write into V1 sheets while comparing)."""
+        sheet = GridSheet(self.title, self.rows, self.columns, array('I', self.ids), self.table, self.sheet_state)
+        sheet._extra = dict(self._extra)
+        sheet.fills = dict(self.fills)
+        sheet._max_row = self._max_row
+        sheet._max_column = self._max_column
+        return sheet
+
+
+class GridWorkbook:
+    """Collection of GridSheets, indexable by title like an openpyxl Workbook."""
+
+    def __init__(self, worksheets, table):
+        self.worksheets = worksheets
+        self.table = table
+
+    @property
+    def sheetnames(self):
+        return [sheet.title for sheet in self.worksheets]
+
+    def __getitem__(self, title):
+        for sheet in self.worksheets:
+            if sheet.title == title:
+                return sheet
+        raise KeyError(f"Worksheet {title} does not exist.")
+
+    def copy(self):
+        return GridWorkbook([sheet.copy() for sheet in self.worksheets], self.table)
+
+
+def sheet_to_grid(ws, table):
+    """Copy the values of an openpyxl worksheet into a GridSheet."""
+    max_row = ws.max_row
+    max_column = ws.max_column
+    ids = array('I', bytes(4 * max_row * max_column))
+    for (row, column), cell in ws._cells.items():
+        value = cell.value
+        if value is not None:
+            ids[(row - 1) * max_column + column - 1] = table.intern(value)
+    return GridSheet(ws.title, max_row, max_column, ids, table, ws.sheet_state)
+
+
+def workbook_to_grid(wb, visible_only=True, table=None):
+    """Convert an openpyxl workbook (visible sheets by default) into a GridWorkbook."""
+    table = table if table is not None else ValueTable()
+    worksheets = [sheet_to_grid(ws, table) for ws in wb.worksheets
+                  if not visible_only or ws.sheet_state == 'visible']
+    return GridWorkbook(worksheets, table)
@@ -0,0 +1,121 @@
+import logging
+from datetime import datetime
+
+
+# Column profiles: each column of a 勤務表 / シフト sheet holds one kind of data, so
+# instead of probing every cell with the strptime / time string checks, the V2 column
+# is sampled once per sheet and the dominant kind picks the comparator of the column.
+#
+#   date   datetime values                    compared by date part, no string probes
+#   time   times, time ranges, hour totals    no '/', so never a date string
+#   text   codes and names                    neither a date nor a time string
+#   mixed  no dominant kind                   every cell is detected on its own
+#
+# The column comparator only takes its fast path when both values are of its kind,
+# which is a cheap test (a type check and a few characters); any other value is an
+# outlier and goes through the full per-cell detection. The kind of a value follows
+# from the probes themselves: every date string format contains '/', and a string
+# with no ':' or '：' that is not all digits is never a time string.
+
+KIND_DATE = 'date'
+KIND_TIME = 'time'
+KIND_TEXT = 'text'
+KIND_MIXED = 'mixed'
+
+# Rows sampled per column (spread over the sheet) and share the dominant kind needs
+SAMPLE_ROWS = 40
+DOMINANT_SHARE = 0.8
+
+
+def value_kind(value):
+    """Kind of a normalized cell value as compared (datetime or stripped string), None if only the probes can tell."""
+    if isinstance(value, datetime):
+        return KIND_DATE
+    if '/' in value:
+        return None
+    if ':' in value or '：' in value or value.isdigit():
+        return KIND_TIME
+    return KIND_TEXT
+
+
+class ColumnProfile:
+    """Dominant kind of one column and the matching fast path."""
+
+    __slots__ = ('kind', 'sampled', 'share')
+
+    def __init__(self, kind, sampled=0, share=0.0):
+        self.kind = kind
+        self.sampled = sampled
+        self.share = share
+
+    def fast_kind(self, value1, value2):
+        """
+        The column kind when this pair can skip the per-cell detection, else None:
+          date  one value is a datetime (the pair is compared as dates whatever the other is)
+          time  neither value can be a date string
+          text  neither value can be a date or a time string
+        """
+        kind = self.kind
+        if kind == KIND_DATE:
+            if isinstance(value1, datetime) or isinstance(value2, datetime):
+                return KIND_DATE
+        elif kind == KIND_TEXT:
+            if value_kind(value1) == KIND_TEXT and value_kind(value2) == KIND_TEXT:
+                return KIND_TEXT
+        elif kind == KIND_TIME:
+            if (not isinstance(value1, datetime) and not isinstance(value2, datetime)
+                    and '/' not in value1 and '/' not in value2):
+                return KIND_TIME
+        return None
+
+
+def profile_column(values):
+    """Profile of a column from its sampled, normalized values (None values are skipped)."""
+    counts = {}
+    sampled = 0
+    for value in values:
+        if value is None:
+            continue
+        if not isinstance(value, datetime):
+            value = str(value).strip()
+        kind = value_kind(value)
+        counts[kind] = counts.get(kind, 0) + 1
+        sampled += 1
+    if not sampled:
+        return ColumnProfile(KIND_MIXED)
+    kind, count = max(counts.items(), key=lambda item: item[1])
+    share = count / sampled
+    if kind is None or share < DOMINANT_SHARE:
+        return ColumnProfile(KIND_MIXED, sampled, share)
+    return ColumnProfile(kind, sampled, share)
+
+
+def peek_value(sheet, row, col):
+    """Cell value without creating the cell (openpyxl's ws.cell() adds missing cells to the sheet)."""
+    cells = getattr(sheet, '_cells', None)
+    if cells is None:
+        return sheet.cell(row, col).value
+    cell = cells.get((row, col))
+    return cell.value if cell is not None else None
+
+
+class SheetProfiles:
+    """Column profiles of a V2 sheet, sampled on first use of each column."""
+
+    def __init__(self, sheet, normalize, first_row, last_row):
+        self.sheet = sheet
+        self.normalize = normalize
+        step = max(1, (last_row - first_row + 1) // SAMPLE_ROWS)
+        self.rows = range(first_row, last_row + 1, step)[:SAMPLE_ROWS]
+        self.profiles = {}
+
+    def __getitem__(self, col):
+        profile = self.profiles.get(col)
+        if profile is None:
+            sheet = self.sheet
+            normalize = self.normalize
+            profile = profile_column(normalize(peek_value(sheet, row, col)) for row in self.rows)
+            self.profiles[col] = profile
+            logging.debug(f'Column {col} profiled as {profile.kind} '
+                          f'({profile.sampled} values, {profile.share:.0%} dominant)')
+        return profile
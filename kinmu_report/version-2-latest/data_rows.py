@@ -0,0 +1,49 @@
+from column_profile import peek_value
+
+
+# Column C (日) of a 勤務表 sheet, read once per sheet. The engines align V1 and V2 rows
+# by it: from row 10 down every row is a data row until the '計' row that closes the
+# table, and when V1 has more data rows the first of rows 38-40 that is blank in V1
+# but not in V2 starts the shift of the V1 rows.
+#
+# Values are read without creating cells (peek_value) and normalized once. Rows after
+# the '計' row are only read when asked for, so a raw sheet decoded up to the '計' row
+# (raw_loader.py) is not read in full for them.
+
+FIRST_DATA_ROW = 10
+DATE_COLUMN = 3
+TOTAL_LABEL = '計'
+
+
+class DataRows:
+    """
+    Column C of one sheet:
+      data_rows  rows from row 10 before the '計' row (up to the last row without one)
+      last_row   the '計' row, else the last row of the sheet
+      is_blank   whether the cell of a row normalizes to None
+    """
+
+    def __init__(self, sheet, normalize, first_row=FIRST_DATA_ROW, column=DATE_COLUMN):
+        self.sheet = sheet
+        self.normalize = normalize
+        self.column = column
+        self.blank = {}
+        self.total_row = None
+        self.last_row = sheet.max_row
+        for row in range(first_row, sheet.max_row + 1):
+            value = normalize(peek_value(sheet, row, column))
+            if value == TOTAL_LABEL:
+                self.total_row = row
+                self.last_row = row
+                break
+            self.blank[row] = value is None
+        self.data_rows = len(self.blank)
+
+    def is_blank(self, row):
+        blank = self.blank.get(row)
+        if blank is None:
+            # Rows past the sheet are empty; reading them would grow a grid sheet
+            blank = row > self.sheet.max_row or self.normalize(peek_value(self.sheet, row, self.column)) is None
+            self.blank[row] = blank
+        return blank
+
@@ -0,0 +1,206 @@
+from array import array
+
+from openpyxl.utils import column_index_from_string
+
+
+# Compact storage for mismatches. While a sheet is compared each mismatch is a small
+# __slots__ record; mismatches kept beyond one sheet (worker results, whole runs) go
+# into a MismatchStore: parallel array columns plus an intern table for the values,
+# about 25 bytes per mismatch instead of a dict of six entries.
+#
+# A MismatchStore is also a report sink (start_school / start_workbook / write_sheet /
+# end_school / close), so it can stand in for a report writer and be replayed into
+# one later with write_to(sink).
+
+# Rule tags: which check of compare_excel_files() reported the mismatch
+RULES = (
+    'date',         # date part of datetimes differs
+    'time',         # time values differ
+    'time_range',   # start or end of a time range differs
+    'overlap',      # 有給(時間休) overlaps 外出 in V1
+    'out_time',     # V2勤務外時間 set while V1 is 00:00 with overtime
+    'value',        # plain value comparison
+)
+RULE_DATE, RULE_TIME, RULE_TIME_RANGE, RULE_OVERLAP, RULE_OUT_TIME, RULE_VALUE = range(len(RULES))
+
+
+class Mismatch:
+    """One mismatch. Readable as mismatch['row1'] too, like the dicts the reports used before."""
+
+    __slots__ = ('row1', 'col1', 'val1', 'row2', 'col2', 'val2', 'rule')
+
+    def __init__(self, row1, col1, val1, row2, col2, val2, rule=RULE_VALUE):
+        self.row1 = row1
+        self.col1 = col1
+        self.val1 = val1
+        self.row2 = row2
+        self.col2 = col2
+        self.val2 = val2
+        self.rule = rule
+
+    def __getitem__(self, key):
+        return getattr(self, key)
+
+    @property
+    def rule_name(self):
+        return RULES[self.rule]
+
+    def __repr__(self):
+        return (f"Mismatch(({self.row1}, {self.col1}) {self.val1!r} <-> "
+                f"({self.row2}, {self.col2}) {self.val2!r}, {self.rule_name})")
+
+
+class InternTable:
+    """Distinct values by id (id 0 is None). Unhashable values are stored without interning."""
+
+    def __init__(self):
+        self.values = [None]
+        self._ids = {}
+
+    def intern(self, value):
+        if value is None:
+            return 0
+        # Keep 1, 1.0 and True apart, they hash the same
+        key = (value.__class__, value)
+        try:
+            value_id = self._ids.get(key)
+        except TypeError:
+            self.values.append(value)
+            return len(self.values) - 1
+        if value_id is None:
+            value_id = len(self.values)
+            self.values.append(value)
+            self._ids[key] = value_id
+        return value_id
+
+    def __getstate__(self):
+        # The index is rebuilt on load, only the values are pickled (worker results)
+        return self.values
+
+    def __setstate__(self, values):
+        self.values = values
+        self._ids = {}
+        for value_id, value in enumerate(values[1:], start=1):
+            try:
+                self._ids.setdefault((value.__class__, value), value_id)
+            except TypeError:
+                pass
+
+
+class MismatchStore:
+    """Mismatches of one or more schools in array columns, in report order."""
+
+    def __init__(self):
+        self.values = InternTable()
+        # School IDs, (school index, workbook) and (workbook index, sheet_name, mismatch_count),
+        # in the order written. Schools and workbooks without mismatches are kept too, the
+        # report database lists every compared workbook.
+        self.schools = []
+        self.workbooks = []
+        self.sheets = []
+        # Columns, one entry per mismatch
+        self.sheet_ids = array('I')
+        self.row1 = array('I')
+        self.col1 = array('H')
+        self.val1 = array('I')
+        self.row2 = array('I')
+        self.col2 = array('H')
+        self.val2 = array('I')
+        self.rule = array('B')
+        self._school = None
+        self._workbook = None
+
+    def __len__(self):
+        return len(self.rule)
+
+    # Report sink interface
+    def start_school(self, school_id):
+        self._school = len(self.schools)
+        self.schools.append(school_id)
+
+    def start_workbook(self, workbook):
+        self._workbook = len(self.workbooks)
+        self.workbooks.append((self._school, workbook))
+
+    def write_sheet(self, sheet_name, mismatches, mismatch_count):
+        sheet_id = len(self.sheets)
+        self.sheets.append((self._workbook, sheet_name, mismatch_count))
+        intern = self.values.intern
+        for mismatch in mismatches:
+            self.sheet_ids.append(sheet_id)
+            self.row1.append(mismatch['row1'])
+            self.col1.append(mismatch['col1'])
+            self.val1.append(intern(mismatch['val1']))
+            self.row2.append(mismatch['row2'])
+            self.col2.append(mismatch['col2'])
+            self.val2.append(intern(mismatch['val2']))
+            self.rule.append(getattr(mismatch, 'rule', RULE_VALUE))
+
+    def end_school(self):
+        self._school = None
+        self._workbook = None
+
+    def close(self):
+        return self
+
+    # Reading
+    def record(self, index):
+        """Mismatch at a column index."""
+        values = self.values.values
+        return Mismatch(self.row1[index], self.col1[index], values[self.val1[index]],
+                        self.row2[index], self.col2[index], values[self.val2[index]], self.rule[index])
+
+    def write_to(self, sink):
+        """Replay the stored schools, workbooks and sheets into a report sink (one linear scan)."""
+        index = 0
+        sheet_id = 0
+        workbook_id = 0
+        for school, school_id in enumerate(self.schools):
+            sink.start_school(school_id)
+            while workbook_id < len(self.workbooks) and self.workbooks[workbook_id][0] == school:
+                sink.start_workbook(self.workbooks[workbook_id][1])
+                while sheet_id < len(self.sheets) and self.sheets[sheet_id][0] == workbook_id:
+                    _, sheet_name, mismatch_count = self.sheets[sheet_id]
+                    start = index
+                    while index < len(self.sheet_ids) and self.sheet_ids[index] == sheet_id:
+                        index += 1
+                    sink.write_sheet(sheet_name, [self.record(i) for i in range(start, index)], mismatch_count)
+                    sheet_id += 1
+                workbook_id += 1
+            sink.end_school()
+
+    def merge(self, other):
+        """Append the schools of another store (e.g. one returned by a worker process)."""
+        other.write_to(self)
+
+    def query(self, school=None, workbook=None, sheet=None, column=None, rule=None):
+        """
+        Mismatches matching all given filters, as (school_id, workbook, sheet_name, Mismatch).
+        column is the V2 column (number or letter), rule a RULE_* tag or its name.
+        """
+        workbook_ids = {workbook_id for workbook_id, (school_index, workbook_name) in enumerate(self.workbooks)
+                        if (school is None or self.schools[school_index] == school)
+                        and (workbook is None or workbook_name == workbook)}
+        sheet_ids = {sheet_id for sheet_id, (workbook_id, sheet_name, _) in enumerate(self.sheets)
+                     if workbook_id in workbook_ids and (sheet is None or sheet_name == sheet)}
+        if not sheet_ids:
+            return
+        if isinstance(column, str):
+            column = column_index_from_string(column)
+        if isinstance(rule, str):
+            rule = RULES.index(rule)
+
+        for index in range(len(self.sheet_ids)):
+            if self.sheet_ids[index] not in sheet_ids:
+                continue
+            if column is not None and self.col2[index] != column:
+                continue
+            if rule is not None and self.rule[index] != rule:
+                continue
+            workbook_id, sheet_name, _ = self.sheets[self.sheet_ids[index]]
+            school_index, workbook_name = self.workbooks[workbook_id]
+            yield self.schools[school_index], workbook_name, sheet_name, self.record(index)
+
+    def count(self, **filters):
+        """Number of mismatches matching the filters of query()."""
+        return sum(1 for _ in self.query(**filters))
@@ -1,1127 +1,1255 @@
-import os
-import openpyxl
-import sys
-import tkinter as tk
-import logging
-import re
-import win32com.client
-from datetime import datetime
-from openpyxl.styles import PatternFill
-from tkinter import messagebox, filedialog
-
-
-# Set up logging configuration
-def setup_logging(debug_level):
-    # Create logs directory if it doesn't exist
-    os.makedirs('logs', exist_ok=True)
-    
-    # Create a timestamp for the log file
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    log_file = f'logs/excel_comparison_{timestamp}.log'
-    
-    # Define the logging format
-    log_format = '%(asctime)s - %(levelname)s - %(message)s'
-    
-    # Set up logging level based on debug_level parameter
-    if debug_level == 'DEBUG':
-        logging_level = logging.DEBUG
-    elif debug_level == 'INFO':
-        logging_level = logging.INFO
-    else:
-        logging_level = logging.WARNING
-    
-    # Configure logging
-    logging.basicConfig(
-        level=logging_level,
-        format=log_format,
-        handlers=[
-            logging.FileHandler(log_file, encoding='utf-8'),
-            logging.StreamHandler(sys.stdout)
-        ]
-    )
-    
-    logging.info(f'Logging initialized at level: {debug_level}')
-
-
-def create_root():
-    root = tk.Tk()
-    root.withdraw()
-    return root
-
-def find_timeslot_column(sheet):
-    """Find the column containing '外出時間' and return its index."""
-    for row in sheet.iter_rows(min_row=1, max_row=1):
-        for cell in row:
-            if cell.value and isinstance(cell.value, str) and '外出時間' in cell.value:
-                logging.info(f"Found '外出時間' in column {cell.column_letter}")
-                return cell.column
-    return None
-
-
-def select_directory(root, prompt):
-    logging.debug(f'Showing directory selection dialog with prompt: {prompt}')
-    messagebox.showinfo('情報', prompt)
-    folder_selected = filedialog.askdirectory(title=prompt)
-    if folder_selected:
-        logging.info(f'Selected directory: {folder_selected}')
-    else:
-        logging.warning('No directory selected')
-    return folder_selected
-
-def show_message(title, message):
-    logging.debug(f'Showing message box - Title: {title}, Message: {message}')
-    messagebox.showinfo(title, message)
-def normalize_time_format(time_str):
-    """
-    Normalize time string format by removing leading zeros, seconds, and standardizing separators.
-    """
-    if time_str is None or not isinstance(time_str, str) or time_str.strip() == "":
-        return None
-
-    try:
-        if time_str.count(':') == 2:
-            time_str = ':'.join(time_str.split(':')[:2])
-        if ':' in time_str:
-            hours, minutes = time_str.split(':')
-            hours = str(int(hours))  # Remove leading zeros
-            return f"{hours}:{minutes}"
-    except ValueError:
-        logging.warning(f"Invalid time format encountered: {time_str}")
-        return None
-
-    return time_str
-
-def normalize_time_range_symbols(time_str):
-    """Normalize time range format by removing variations in symbols and ensuring consistent spacing."""
-    if not isinstance(time_str, str):
-        return None
-    return time_str.replace('〜', '~').replace('～', '~').replace('：', ':').strip()
-
-def format_time_range(time_str):
-    """Standardize time range format to ensure consistent comparison."""
-    if time_str is None or not isinstance(time_str, str) or time_str.strip() == "":
-        logging.warning(f"Invalid input for format_time_range: {time_str} (type: {type(time_str)})")
-        return None  # Return None for invalid inputs
-    
-    time_str = normalize_time_range_symbols(time_str)  # Use the renamed function
-    if not time_str:
-        return None # Return None if the normalized string is empty
-    parts = time_str.split('~')
-    if len(parts) == 2:
-        start_time = normalize_time_format(parts[0].strip())  # Use new normalization
-        end_time = normalize_time_format(parts[1].strip())    # Use new normalization
-        return f"{start_time}~{end_time}"
-    return time_str
-
-def compare_time_parts(time1, time2):
-    """Compare two time strings by removing leading zeros from hours."""
-    if ':' not in time1 or ':' not in time2:
-        return time1 == time2
-    
-    hour1, minute1 = time1.split(':')
-    hour2, minute2 = time2.split(':')
-    
-    # Remove leading zeros for comparison
-    hour1 = str(int(hour1))
-    hour2 = str(int(hour2))
-    
-    return hour1 == hour2 and minute1 == minute2
-
-def is_datetime_string(value):
-    """Check if a string represents a datetime."""
-    if not isinstance(value, str):
-        return False
-    
-    # Common datetime patterns in Excel
-    patterns = [
-        '%Y/%m/%d %H:%M:%S',
-        '%Y/%m/%d %H:%M:%S 午前',
-        '%Y/%m/%d %H:%M:%S 午後',
-        '%Y/%m/%d %H:%M',
-        '%Y/%m/%d %H:%M 午前',
-        '%Y/%m/%d %H:%M 午後',
-        '%Y/%m/%d'
-    ]
-    
-    for pattern in patterns:
-        try:
-            datetime.strptime(value, pattern)
-            return True
-        except ValueError:
-            continue
-    return False
-
-def extract_date_part(value):
-    """Extract just the date part from a datetime string or object."""
-    if isinstance(value, datetime):
-        return value.strftime('%Y/%m/%d')
-    
-    if not isinstance(value, str):
-        return value
-        
-    # Try to extract date from string
-    patterns = [
-        '%Y-%m-%d %H:%M:%S',  # Added hyphen format
-        '%Y/%m/%d %H:%M:%S',
-        '%Y/%m/%d %H:%M:%S 午前',
-        '%Y/%m/%d %H:%M:%S 午後',
-        '%Y/%m/%d %H:%M',
-        '%Y/%m/%d %H:%M 午前',
-        '%Y/%m/%d %H:%M 午後',
-        '%Y/%m/%d',
-        '%Y-%m-%d'  # Added hyphen format without time
-    ]
-    
-    for pattern in patterns:
-        try:
-            dt = datetime.strptime(value, pattern)
-            return dt.strftime('%Y/%m/%d')
-        except ValueError:
-            continue
-            
-    # If no pattern matches, try to extract date using regex
-    date_pattern = r'(\d{4})[-/](\d{1,2})[-/](\d{1,2})'
-    match = re.search(date_pattern, str(value))
-    if match:
-        year, month, day = match.groups()
-        try:
-            return f"{year}/{int(month):02d}/{int(day):02d}"
-        except ValueError:
-            pass
-            
-    return value
-
-def is_time_string(value):
-    """Check if a string represents a time value."""
-    if not isinstance(value, str):
-        return False
-    
-    # Normalize the value first
-    value = normalize_time_format(value)
-    
-    # Remove common time separators and spaces
-    value = value.replace(':', '').replace('：', '').strip()
-    
-    # Check if it's a 3 or 4 digit number (e.g., 830 or 1430)
-    if value.isdigit() and (len(value) == 3 or len(value) == 4):
-        # Extract hours and minutes
-        if len(value) == 3:
-            hours = int(value[0])
-            minutes = int(value[1:])
-        else:
-            hours = int(value[:2])
-            minutes = int(value[2:])
-        
-        # Validate hours and minutes
-        return 0 <= hours <= 23 and 0 <= minutes <= 59
-    
-    return False
-    
-def get_comparison_columns(col, sheet_name, row):
-    """
-    Get the corresponding column numbers for comparison between sheets.
-    
-    Args:
-        col (int): Original column number
-        sheet_name (str): Name of the sheet
-    
-    Returns:
-        tuple: (col1, col2) where col1 is for sheet1 and col2 is for sheet2
-        None if the column should be skipped
-    """
-    logging.debug(f'get_comparison_columns called with col={col}, sheet_name={sheet_name}, row={row}')
-    
-    # For sheets containing "勤務表" in their names
-    if "勤務表" in sheet_name:
-        if col < 13:
-            logging.debug(f'Column {col} is less than 13, returning ({col}, {col})')
-            return (col, col)
-        
-        # For column 13, skip comparison
-        elif col == 13:
-            logging.debug(f'Column {col} is 13, skipping comparison')
-            return None  
-        
-        # For columns 14-32, subtract 1 from sheet1 column to account for skipped column 13 in sheet2
-        elif 14 <= col <= 33:
-            
-            if col > 26:
-                if col == 30:
-                    logging.debug(f'Column {col} is 30, returning ({col - 4}, {col})')
-                    return (col - 4, col)
-                if col > 30:
-                    logging.debug(f'Column {col} is greater than 30, returning ({col - 1}, {col})')
-                    return (col - 1, col)
-                logging.debug(f'Column {col} is greater than 26 but not 30, returning ({col}, {col})')
-                return (col, col)
-            logging.debug(f'Column {col} is between 14 and 26, returning ({col - 1}, {col})')
-            return (col - 1, col)
-        
-        # For column 27 and above, skip comparison
-        else:
-            logging.debug(f'Column {col} is 27 or above, skipping comparison')
-            return None
-    
-    logging.debug(f'Sheet name does not contain "勤務表", returning ({col}, {col})')
-    return (col, col)
-        
-def get_mapped_column(original_col, is_sheet1=True):
-    """
-    Map column numbers according to the specified rules.
-    
-    Args:
-        original_col (int): Original column number
-        is_sheet1 (bool): True if mapping for sheet1, False for sheet2
-    
-    Returns:
-        int: Mapped column number
-    """
-    if is_sheet1:
-        # Sheet1: Use original column numbers
-        return original_col
-    else:
-        # Sheet2:
-        # If column < 13: Use same column number
-        # If column >= 13: Add 1 to column number
-        if original_col < 13:
-            return original_col
-        else:
-            return original_col + 1
-
-
-def extract_sheet_name_string(sheet_name):
-    """
-    Extract meaningful part of the sheet name by removing leading digits and symbols
-    (like dot or underscore) but retaining the rest of the original name structure.
-    """
-    # Remove leading numbers and symbols (e.g., '1.', '2_', etc.)
-    cleaned_name = re.sub(r'^[\d._\-]+', '', sheet_name)
-    # Return the remaining name as it is (does not strip anything further)
-    return cleaned_name
-
-def compare_time_values(time1, time2):
-    """
-    Compare two time values accounting for different formats.
-    Handles cases like "08:00:00" vs "8:00" as equal.
-    """
-    # Convert both values to strings and normalize
-    time1 = normalize_time_format(str(time1).strip())
-    time2 = normalize_time_format(str(time2).strip())
-    
-    # If either isn't a valid time string, they're not equal
-    if not (is_time_string(time1) and is_time_string(time2)):
-        return False
-    
-    # Compare the normalized strings
-    return time1 == time2
-
-
-def compare_excel_files(file1_path, file2_path):
-    """Compare two Excel files and return comparison result and modified workbook."""
-    logging.info(f'Starting comparison of files:\n  File 1: {file1_path}\n  File 2: {file2_path}')
-    """ actual file name should be passed to the function """
-    file_name = file1_path.split('/')[-1]
-    
-    reports = []
-
-    try:
-        # Load the Excel files
-        logging.debug('Loading workbooks')
-        wb1 = openpyxl.load_workbook(file1_path)
-        wb2 = openpyxl.load_workbook(file2_path)
-        
-       
-        fill_pattern_yellow = PatternFill(patternType="solid", fgColor='FFFF00')
-        
-        # Get visible sheets and their string-only names
-        visible_sheets1 = [(sheet.title, extract_sheet_name_string(sheet.title)) 
-                          for sheet in wb1.worksheets 
-                          if sheet.sheet_state == 'visible']
-        
-        visible_sheets2 = [(sheet.title, extract_sheet_name_string(sheet.title)) 
-                          for sheet in wb2.worksheets 
-                          if sheet.sheet_state == 'visible']
-        
-        # Log visible sheets from both workbooks
-        logging.info("Visible sheets in V1:")
-        for original, string_only in visible_sheets1:
-            logging.info(f"  - Original: {original} -> String only: {string_only}")
-            
-        logging.info("Visible sheets in V2:")
-        for original, string_only in visible_sheets2:
-            logging.info(f"  - Original: {original} -> String only: {string_only}")
-        
-        # Create dictionaries to map string-only names to original names
-        sheets1_dict = {string: orig for orig, string in visible_sheets1}
-        sheets2_dict = {string: orig for orig, string in visible_sheets2}
-        
-        # Find matching string-only names
-        common_string_names = set(sheets1_dict.keys()) & set(sheets2_dict.keys())
-        
-        if not common_string_names:
-            logging.warning('No matching sheet names found between the workbooks')
-            show_message("警告", "両方のExcelファイルに同じ名前のシートが見つかりません。")
-            return 'X', wb2
-            
-        # Compare each matching sheet
-        for string_name in common_string_names:
-          
-            sheet_report = []
-            
-            mismatch_found = 0
-            
-            sheet_name1 = sheets1_dict[string_name]
-            sheet_name2 = sheets2_dict[string_name]
-            
-            logging.info(f'\nComparing sheets: {sheet_name1} <-> {sheet_name2}')
-            
-            sheet1 = wb1[sheet_name1] 
-            sheet2 = wb2[sheet_name2] 
-            
-            # Get maximum dimensions for comparison
-            row_max = max(sheet1.max_row, sheet2.max_row)
-            col_max = max(sheet1.max_column, sheet2.max_column)
-            logging.debug(f'Sheet dimensions: {row_max} rows x {col_max} columns')
-            
-            # Find timeslot column if it exists
-            timeslot_col = find_timeslot_column(sheet1)
-            
-            # Count data rows until '計' in column 3
-            sheet1_data_rows = 0
-            for row in range(10, sheet1.max_row + 1):
-                value = normalize_value(sheet1.cell(row, 3).value)
-                if value == '計':  
-                    break
-                sheet1_data_rows += 1
-                
-            sheet1_spec_row = row
-                
-            sheet2_data_rows = 0
-            for row in range(10, sheet2.max_row + 1):
-                value = normalize_value(sheet2.cell(row, 3).value)  # Fixed typo: sheet1 -> sheet2
-                if value == '計':
-                    break
-                sheet2_data_rows += 1
-                
-            sheet2_spec_row = row
-            logging.debug(f"sheet 2 specific row {sheet2_spec_row}")
-            
-            sheet_max_row = max(sheet1_spec_row,sheet2_spec_row)
-            
-            # Determine skip offset
-            skipped_row = sheet1_data_rows - sheet2_data_rows if sheet1_data_rows > sheet2_data_rows else 0
-            logging.debug(f'Data rows: File1={sheet1_data_rows}, File2={sheet2_data_rows}, Skip={skipped_row}')
-            
-            is_start_skip = False
-
-            # Compare cells
-            for row in range(10,sheet_max_row + 1 ):
-                
-                # Default row mapping
-                row1 = row
-                row2 = row
-                
-                # Adjust rows if there's a skip and we're in the critical range
-                if not is_start_skip and skipped_row > 0 and 37 < row < 41:
-                    value1 = normalize_value(sheet1.cell(row, 3).value)
-                    value2 = normalize_value(sheet2.cell(row, 3).value)
-                    
-                    if value1 is None and value2 is not None:
-                        row1 = row + skipped_row  # Shift File1 forward
-                        row2 = row
-                        is_start_skip = True
-                    # elif value1 is not None and value2 is None:
-                    #     row1 = row
-                    #     row2 = row + skipped_row  # Shift File2 forward (unlikely case)
-                elif is_start_skip:
-                    row1 = row + skipped_row
-                     
-                    
-                
-                # Ensure rows stay within bounds
-                if row1 > sheet1.max_row or row2 > sheet2.max_row:
-                    continue
-                
-                # Check the specific condition to skip comparison
-                g_col_value = sheet1.cell(row1, 7).value  # G列 (column 7)
-                if g_col_value and isinstance(g_col_value, str) and g_col_value.count("時間休") >= 2:
-                    logging.debug(
-                        f"Skipping comparison for row {row1} due to '時間休' appearing 2 or more times in column G: {g_col_value}"
-                    )
-                    continue  # Skip this row
-                
-                
-                v2_out_time = normalize_time_format(sheet2.cell(row2, 17).value)  # Q列 (column 17)
-                v1_out_time = normalize_time_format(sheet1.cell(row1, 17).value)  # Q列 (column 17)
-                overtime_hours = sheet2.cell(row2, 19).value  # S列 (column 19)
-
-                if (
-                    v2_out_time != "00:00" and
-                    v1_out_time == "00:00" and
-                    isinstance(overtime_hours, (int, float)) and overtime_hours > 0
-                ):
-                    logging.debug(
-                        f"Skipping comparison for row {row2} due to specified conditions: "
-                        f"V2勤務外時間={v2_out_time}, V1勤務外時間={v1_out_time}, 時間外勤務.勤務時間={overtime_hours}"
-                    )
-                    continue  # Skip this row
-                
-                # Check for overlapping times in columns G (有給(時間休)) and M (外出) in V1
-                leave_time = sheet1.cell(row1, 7).value  # G列 (column 7)
-                outing_time = sheet1.cell(row1, 13).value  # M列 (column 13)
-
-                if leave_time and outing_time:
-                    leave_time = format_time_range(leave_time)
-                    outing_time = format_time_range(outing_time)
-
-                    if times_overlap(leave_time, outing_time):
-                        # If times overlap, copy them to columns N and O
-                        sheet1.cell(row1, 14).value = leave_time  # N列 (column 14)
-                        sheet1.cell(row1, 15).value = outing_time  # O列 (column 15)
-                        logging.debug(
-                            f"Times overlap at row {row1}: 有給(時間休)={leave_time}, 外出={outing_time}. "
-                            f"Copied to columns N and O."
-                        )
-                
-                for col in range(1, col_max + 1):
-                    try:
-                        # Get comparison columns
-                        comparison_cols = get_comparison_columns(col, file_name, row)
-                        if comparison_cols is None:
-                            continue  # Skip this column
-                        
-                        
-                         
-                            
-                        col1, col2 = comparison_cols
-                        logging.debug(f'Comparing columns: {col1} (sheet1) vs {col2} (sheet2)')
-                        
-                        if row2 == sheet2_spec_row and col2 == 16:
-                            continue
-                        
-                        
-                        if col2 >= 21 and row >= 8 :
-                            if sheet2.cell(8,21).value == "申請書":
-                                if col2 > 21 and col2 < 25:
-                                    logging.debug(f'Skipping comparison for column {col1} to { col1 + 5 } due to "申請書" in column 21')
-                                    col1 = col1 + 6
-                                elif col2 == 25:
-                                    col1 = 26
-                                elif col2 >= 27:
-                                    col1 = col1 + 4
-                                else:
-                                    logging.debug(f'Skipping comparison for column {col1} to { col1 + 5 } due to "申請書" in column 21')
-                                    col1 = col1 + 5
-                                
-                            
-                        value1 = sheet1.cell(row1, col1).value
-                        value2 = sheet2.cell(row2, col2).value
-
-                        logging.debug(f'Comparing cell ({row1}, {col1}) with ({row2}, {col2})')
-                        logging.debug(f'Value1: {value1}, Value2: {value2}')
-                        
-                        # Special case for two or more lines
-                        if isinstance(value1, str) and value1.count("\n") >= 1 and isinstance(value2, str) and value2.count("\n") >= 1:
-                            value1_arr = value1.strip().split("\n")
-                            value2_arr = value2.strip().split("\n")
-
-                            if len(value1_arr) == len(value2_arr):
-                                # Normalize and sort values
-                                value1 = sorted([normalize_value(v) for v in value1_arr])
-                                value2 = sorted([normalize_value(v) for v in value2_arr])
-
-                                # Handle None values
-                                if all(v is None for v in value1) and all(v is None for v in value2):
-                                    continue
-
-                                # Check if values are equal after normalization and sorting
-                                if all(v1 == v2 for v1, v2 in zip(value1, value2)):
-                                    logging.debug(f'Values are equal (order-insensitive) at ({row2}, {col2}): {value1} vs {value2}')
-                                    continue
-
-                        # Normalize values
-                        value1 = normalize_value(value1)
-                        value2 = normalize_value(value2)
-                        
-                        # Handle None values
-                        if value1 is None and value2 is None:
-                            continue
-                        
-                        # Handle special case for "その他(一日)" and None
-                        if value1 == "None" or value1 is None:
-                            if value2 == "その他(一日)":
-                                logging.debug(f'Value case at ({row2}, {col2}): {value1} vs {value2}')
-                                if sheet1.cell(row1, col1-1).value == "休み" and sheet2.cell(row2, col2-1).value == "休み":
-                                    continue
-                        
-                        # Convert to string and strip whitespace if not datetime object
-                        if not isinstance(value1, datetime):
-                            value1 = str(value1).strip()
-                        if not isinstance(value2, datetime):
-                            value2 = str(value2).strip()
-
-                        # Check if either value is a datetime
-                        is_datetime1 = isinstance(value1, datetime) or is_datetime_string(value1)
-                        is_datetime2 = isinstance(value2, datetime) or is_datetime_string(value2)
-
-                        if is_datetime1 or is_datetime2:
-                            date1 = extract_date_part(value1)
-                            date2 = extract_date_part(value2)
-                            
-                            if date1 != date2:
-                                sheet_report.append({
-                                    "row1" : row1,
-                                    "col1" : col1,
-                                    "val1" : value1,
-                                    "row2" : row2,
-                                    "col2" : col2,
-                                    "val2" : value2
-                                })
-                                sheet2.cell(row2, col2).fill = fill_pattern_yellow
-                                mismatch_found += 1
-                                logging.debug(f'Date mismatch at ({row2}, {col2}): {date1} vs {date2}')
-                            continue
-
-                        # Check if either value is a time string
-                        is_time1 = is_time_string(str(value1))
-                        is_time2 = is_time_string(str(value2))
-
-                        if is_time1 or is_time2:
-                            if not compare_time_values(value1, value2):
-                                sheet_report.append({
-                                    "row1" : row1,
-                                    "col1" : col1,
-                                    "val1" : value1,
-                                    "row2" : row2,
-                                    "col2" : col2,
-                                    "val2" : value2
-                                })
-                                # sheet2.cell(row2, col2).fill = fill_pattern_yellow
-                                mismatch_found += 1
-                                logging.debug(f'Time mismatch at ({row2}, {col2}): {value1} vs {value2}')
-                            continue
-                        
-                        # Check if values are vacation-equivalent
-                        if is_vacation_equivalent(value1, value2):
-                            logging.debug(f'Vacation-equivalent match at ({row2}, {col2}): {value1} vs {value2}')
-                            continue
-
-                        # Handle time range comparison
-                        if any(separator in str(value1) or separator in str(value2) 
-                              for separator in ['〜', '～', '~']):
-                            time1_parts = format_time_range(str(value1)).split('~')
-                            time2_parts = format_time_range(str(value2)).split('~')
-                            
-                            if len(time1_parts) == 2 and len(time2_parts) == 2:
-                                start_match = compare_time_parts(time1_parts[0], time2_parts[0])
-                                end_match = compare_time_parts(time1_parts[1], time2_parts[1])
-                                
-                                if not (start_match and end_match):
-                                    sheet_report.append({
-                                        "row1" : row1,
-                                        "col1" : col1,
-                                        "val1" : value1,
-                                        "row2" : row2,
-                                        "col2" : col2,
-                                        "val2" : value2
-                                    })
-                                    # sheet2.cell(row, col2).fill = fill_pattern_yellow
-                                    mismatch_found += 1
-                                    logging.debug(f'Time range mismatch at ({row2}, {col2}): {value1} vs {value2}')
-                                continue
-                            
-                        # Check for overlapping times between 有給(時間休) and 外出
-                        if col == 5:  # Assuming column 5 contains 有給(時間休) time ranges
-                            leave_time = sheet1.cell(row1, 5).value  # 有給(時間休)
-                            outing_time = sheet1.cell(row1, 6).value  # Assuming column 6 contains 外出 time ranges
-
-                            if leave_time and outing_time:
-                                leave_time = format_time_range(leave_time)
-                                outing_time = format_time_range(outing_time)
-
-                                if times_overlap(leave_time, outing_time):
-                                    sheet_report.append({
-                                        "row1" : row1,
-                                        "col1" : col1,
-                                        "val1" : value1,
-                                        "row2" : row2,
-                                        "col2" : col2,
-                                        "val2" : value2
-                                    })
-                                    # sheet2.cell(row2, col).fill = fill_pattern_yellow
-                                    mismatch_found += 1
-                                    logging.debug(
-                                        f"Time overlap detected at row {row1}: "
-                                        f"有給(時間休)={leave_time}, 外出={outing_time}"
-                                    )
-                                    continue
-
-                        # Check the specific condition for V2勤務外時間 (Q列), V1勤務外時間 (Q列), and 時間外勤務.勤務時間 (S列)
-                        if col == 17:  # Q列 (column 17)
-                            v2_out_time = normalize_time_format(sheet2.cell(row2, 17).value)
-                            v1_out_time = normalize_time_format(sheet1.cell(row1, 17).value)
-                            overtime_hours = sheet2.cell(row2, 19).value  # S列 (column 19)
-
-                            if (
-                                v2_out_time != "00:00" and
-                                v1_out_time == "00:00" and
-                                isinstance(overtime_hours, (int, float)) and overtime_hours > 0
-                            ):
-                                sheet_report.append({
-                                    "row1" : row1,
-                                    "col1" : col1,
-                                    "val1" : value1,
-                                    "row2" : row2,
-                                    "col2" : col2,
-                                    "val2" : value2
-                                })
-                                # sheet2.cell(row2, 17).fill = fill_pattern_yellow
-                                mismatch_found += 1
-                                logging.debug(
-                                    f"Condition met at row {row2}: V2勤務外時間={v2_out_time}, "
-                                    f"V1勤務外時間={v1_out_time}, 時間外勤務.勤務時間={overtime_hours}"
-                                )
-                                continue
-
-                        # Handle the specific case for column D (D列)
-                        if col == 4:  # D列 (column 4)
-                            v2_data = sheet2.cell(row2, 4).value
-                            v1_data = sheet1.cell(row1, 4).value
-
-                            if v1_data is None or str(v1_data).strip() == "":
-                                if v2_data is not None and str(v2_data).strip() != "":
-                                    # Copy the entire row from V2 to V1
-                                    for c in range(1, col_max + 1):
-                                        sheet1.cell(row1, c).value = sheet2.cell(row2, c).value
-                                    logging.debug(
-                                        f"Row {row1} in V1 made the same as V2 because column D was empty."
-                                    )
-                                break
-                            
-                        if compare_vacation_strings(value1,value2):
-                            continue
-                               
-
-                        # For all other values, compare as strings
-                        if str(value1) != str(value2):
-                            if not is_ignored_mismatch(value1, value2):
-                                
-                                # Check special case 
-                                if re.sub(r'[：【】()（）]', '', value1) != re.sub(r'[：【】()（）]', '', value2):
-                                    sheet_report.append({
-                                        "row1" : row1,
-                                        "col1" : col1,
-                                        "val1" : value1,
-                                        "row2" : row2,
-                                        "col2" : col2,
-                                        "val2" : value2
-                                    })
-                                    # sheet2.cell(row2, col2).fill = fill_pattern_yellow
-                                    mismatch_found += 1
-                                    logging.debug(f'Value mismatch at ({row2}, {col2}): {value1} vs {value2}')
-                            
-                    except Exception as e:
-                        # sheet_report.append({
-                        #     "row1" : row1,
-                        #     "col1" : col1,
-                        #     "val1" : value1,
-                        #     "row2" : row2,
-                        #     "col2" : col2,
-                        #     "val2" : value2
-                        # })
-                        logging.error(f'Error comparing cell ({row2}, {col2}): {str(e)}')
-                        # mismatch_found += 1
-                        continue
-            if sheet_report:
-                reports.append({
-                    "sheet_name" : string_name,
-                    "sheet_report" : sheet_report,
-                    "mismatch_found" : mismatch_found
-                })
-        
-        # Determine final result
-        # result = 'X' if mismatch_found > 0 else 'O'
-        # logging.info(f'Comparison completed. Result: {result} (mismatches: {mismatch_found})')
-        return  reports
-        
-    except Exception as e:
-        logging.error(f'Error during comparison: {str(e)}', exc_info=True)
-        raise
-
-def normalize_value(value):
-    """Normalize values to handle numeric equivalence, time formats, blank/None equivalence, and remove special characters."""
-    # Handle None values and empty strings
-    if value is None or (isinstance(value, str) and value.strip() == ""):
-        return None
-    
-    # If it's already a datetime object, return it
-    if isinstance(value, datetime):
-        return value
-    
-    # Convert to string and strip whitespace and quotation marks
-    if not isinstance(value, str):
-        # Handle float values - convert to int if it's a whole number
-        if isinstance(value, float) and value.is_integer():
-            value = int(value)
-    
-    # Convert to string and normalize
-    value = str(value)
-    
-    # Remove special characters and normalize whitespace
-    value = value.replace("_x000D_", "")  # Remove Excel carriage return
-    value = value.replace("\r", "")       # Remove carriage return
-    value = value.replace("\n", "")       # Remove line feed
-    value = value.replace('"', '')        # Remove double quotes
-    value = value.replace('"', '')        # Remove smart quotes (opening)
-    value = value.replace('"', '')        # Remove smart quotes (closing)
-    
-    value = ' '.join(value.split())       # Normalize whitespace
-    value = value.strip()                 # Remove leading/trailing whitespace
-    
-    value = re.sub(r'(\d{1,3}:\d{2})\s+\(', r'\1(', value)  # Remove space before opening parenthesis
-    
-    # If after cleaning the string is empty, return None
-    if value == "":
-        return None
-    
-    # List of patterns to be normalized to None
-    normalize_patterns = [None, "0", "0:00", "00:00:00", "12:00:00午前"]
-    
-    if value in normalize_patterns:
-        return None
-        
-    # Try parsing as datetime with multiple formats
-    datetime_patterns = [
-        '%Y-%m-%d %H:%M:%S',
-        '%Y/%m/%d %H:%M:%S',
-        '%Y-%m-%d',
-        '%Y/%m/%d'
-    ]
-    
-    for pattern in datetime_patterns:
-        try:
-            return datetime.strptime(value, pattern)
-        except ValueError:
-            continue
-    
-    # If it's a numeric string (like "1.0" or "1")
-    try:
-        num = float(value)
-        if num.is_integer():
-            return str(int(num))
-    except ValueError:
-        pass
-        
-    return value
-
-def compare_datetime_values(value1, value2):
-    """Compare two datetime values, handling various formats."""
-    try:
-        # First normalize both values
-        norm1 = normalize_value(value1)
-        norm2 = normalize_value(value2)
-        
-        # If both are datetime objects, compare them directly
-        if isinstance(norm1, datetime) and isinstance(norm2, datetime):
-            return norm1.date() == norm2.date()
-        
-        # If they're strings, compare the date parts
-        date1 = extract_date_part(norm1)
-        date2 = extract_date_part(norm2)
-        
-        return date1 == date2
-    except Exception as e:
-        logging.error(f"Error comparing datetime values: {value1} vs {value2} - {str(e)}")
-        return False
-
-def times_overlap(time_range1, time_range2):
-    """
-    Check if two time ranges overlap.
-    Args:
-        time_range1 (str): Time range in the format "HH:MM~HH:MM".
-        time_range2 (str): Time range in the format "HH:MM~HH:MM".
-    Returns:
-        bool: True if the time ranges overlap, False otherwise.
-    """
-    try:
-        start1, end1 = [datetime.strptime(t, "%H:%M") for t in time_range1.split("~")]
-        start2, end2 = [datetime.strptime(t, "%H:%M") for t in time_range2.split("~")]
-        return max(start1, start2) < min(end1, end2)
-    except Exception as e:
-        logging.error(f"Error checking time overlap: {e}")
-        return False
-
-def is_ignored_mismatch(value1, value2):
-    """Check if the mismatch between value1 and value2 should be ignored."""
-    ignored_pairs = [
-        ("休み", "シフト時間コード-1"),
-        ( "None" , "シフト時間コード-1"),
-        ("フリー", "シフト時間コード2147483647"),
-        ("退職", "【退職後】"),
-        ("退職", "退職後"),
-        ("フリー", "シフト時間コード2147483647"),
-        ("ステム未使用期間", "【採用前】"),
-        ("ステム未使用期間", "採用前"),
-        ("システム未使用期間", "【採用前】"),
-        ("システム未使用期間", "採用前"),
-        ("長期休暇：傷病", "【長期休暇】傷病"),
-        ("長期休暇：", "【長期休暇】"),
-        ("【長期休暇】育児", "長期休暇：育児" ),
-        ("採用前" , "【採用前】"),
-        ("【長期休暇】産後","長期休暇：産後"),    
-        ("【長期休暇】産前", "長期休暇：産前"),
-        ("システム未使用期間",""),
-        ("システム未使用期間","None"),
-        ("システム未使用期間",None),
-        # Add other ignored pairs if needed
-    ]
-    
-    
-    
-    return (value1, value2) in ignored_pairs or (value2, value1) in ignored_pairs
-
-def is_vacation_equivalent(value1, value2):
-    """
-    Check if two values starting with "【休暇" can be considered equivalent.
-    """
-    if isinstance(value1, str) and isinstance(value2, str):
-        return (value1.startswith("【休暇") and value2.startswith("【休暇") ) or ( value1.startswith("休暇") and value2.startswith("休暇") )
-    return False
-
-def compare_vacation_strings(str1, str2):
-    """
-    Compare two vacation time strings like '有給(時間休：14:30～16:30)' and '有給(時間休:14:30 〜 16:30)'.
-    Returns True if they are equivalent, False otherwise.
-    """
-    if not isinstance(str1, str) or not isinstance(str2, str):
-        return False
-
-    # Regular expression to extract the time range part (e.g., '14:30～16:30' or '14:30 〜 16:30')
-    time_range_pattern = r'(\d{1,2}:\d{2}\s*[〜～~]\s*\d{1,2}:\d{2})'
-
-    # Extract time ranges from both strings
-    match1 = re.search(time_range_pattern, str1)
-    match2 = re.search(time_range_pattern, str2)
-
-    if not match1 or not match2:
-        return str1 == str2  # If no time range found, compare strings directly
-
-    time_range1 = match1.group(1)
-    time_range2 = match2.group(1)
-
-    # Normalize time ranges
-    normalized_time1 = normalize_time_range_symbols(time_range1)
-    normalized_time2 = normalize_time_range_symbols(time_range2)
-
-    # Split and normalize individual times
-    start1, end1 = normalized_time1.split('~')
-    start2, end2 = normalized_time2.split('~')
-
-    start1 = normalize_time_format(start1.strip())
-    end1 = normalize_time_format(end1.strip())
-    start2 = normalize_time_format(start2.strip())
-    end2 = normalize_time_format(end2.strip())
-
-    # Reconstruct normalized time ranges
-    normalized_range1 = f"{start1}~{end1}" if start1 and end1 else None
-    normalized_range2 = f"{start2}~{end2}" if start2 and end2 else None
-
-    if normalized_range1 != normalized_range2:
-        return False
-
-    # Compare non-time parts by removing the time range and normalizing
-    non_time_part1 = re.sub(time_range_pattern, '', str1).replace('：', ':').replace(' ', '')
-    non_time_part2 = re.sub(time_range_pattern, '', str2).replace('：', ':').replace(' ', '')
-
-    return non_time_part1 == non_time_part2
-  
-def generate_report(all_reports):
-    """Generate a markdown report of comparison results organized by school ID and workbook."""
-    
-    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    
-    report_lines = [
-        "# Excel Comparison Report",
-        f"**Generated on:** {timestamp}",
-        ""
-    ]
-    
-    if not all_reports:
-        report_lines.append("## No mismatches found")
-        report_lines.append("No differences were detected during the comparison.")
-        report_path = save_report(report_lines)
-        print(f"Report generated at: {report_path}")
-        return report_path
-    
-    for school_report in all_reports:
-        for school_id, file_reports in school_report.items():
-            report_lines.append(f"## School ID: {school_id}")
-            report_lines.append("")
-            
-            for file_report in file_reports:
-                workbook_name = list(file_report.keys())[0]
-                report_lines.append(f"### Workbook: {workbook_name}")
-                report_lines.append("")
-                report_lines.append("| Sheet Name | Count | V1 Row | V1 Col | V1 Value | V2 Row | V2 Col | V2 Value |")
-                report_lines.append("|------------|-------|--------|--------|----------|--------|--------|----------|")
-                
-                sheets = file_report[workbook_name]
-                current_sheet = None
-                
-                for sheet_report in sheets:
-                    sheet_name = sheet_report["sheet_name"]
-                    mismatches = sheet_report["sheet_report"]
-                    mismatch_count = sheet_report["mismatch_found"]
-                    
-                    if mismatch_count == 0:
-                        report_lines.append(f"| {sheet_name} | {mismatch_count} | - | - | No mismatches | - | - | - |")
-                        continue
-                        
-                    for mismatch in mismatches:
-                        if sheet_name != current_sheet:
-                            if current_sheet is not None:
-                                report_lines.append("| | | | | | | | |")
-                            current_sheet = sheet_name
-                            report_lines.append(
-                                f"| {sheet_name} | {mismatch_count} | {mismatch['row1']} | {mismatch['col1']} | "
-                                f"{mismatch['val1']} | {mismatch['row2']} | {mismatch['col2']} | "
-                                f"{mismatch['val2']} |"
-                            )
-                        else:
-                            report_lines.append(
-                                f"| | | {mismatch['row1']} | {mismatch['col1']} | "
-                                f"{mismatch['val1']} | {mismatch['row2']} | {mismatch['col2']} | "
-                                f"{mismatch['val2']} |"
-                            )
-                
-                report_lines.append("")  # Extra newline between workbooks
-    
-    save_report(report_lines)
-
-def save_report(report_lines):
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    report_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), f"{timestamp}_comparison_report.md")
-    with open(report_path, 'w', encoding='utf-8') as f:
-        f.write('\n'.join(report_lines))
-    return report_path
-
-def process_folder(recompare_folder):
-    """Process all subfolders in recompare directory"""
-    try:
-        all_reports = []
-        # Get all subfolders in recompare directory
-        subfolders = [f for f in os.listdir(recompare_folder) 
-                     if os.path.isdir(os.path.join(recompare_folder, f))]
-        
-        logging.info(f'Found {len(subfolders)} subfolders to process')
-        
-        for subfolder in subfolders:
-            subfolder_path = os.path.join(recompare_folder, subfolder)
-            v1_path = os.path.join(subfolder_path, 'V1')
-            v2_path = os.path.join(subfolder_path, 'V2')
-            result_path = os.path.join(subfolder_path, 'result')
-            
-            # Check if required folders exist
-            if not all(os.path.exists(p) for p in [v1_path, v2_path]):
-                logging.warning(f'Skipping {subfolder}: V1 or V2 folder missing')
-                continue
-                
-            # Create result folder if it doesn't exist
-            os.makedirs(result_path, exist_ok=True)
-            logging.info(f'Processing subfolder: {subfolder}')
-            
-            # Get file lists
-            files_vb1 = [f for f in os.listdir(v1_path) if f.endswith(('.xlsx', '.xls'))]
-            files_vb2 = [f for f in os.listdir(v2_path) if f.endswith(('.xlsx', '.xls'))]
-            
-            logging.info(f'Found {len(files_vb1)} Excel files in first folder')
-            logging.info(f'Found {len(files_vb2)} Excel files in second folder')
-
-            school_reports = []
-            
-            for file_name in files_vb1:
-                base_name = os.path.splitext(file_name)[0]
-                matching_files = [f for f in files_vb2 if os.path.splitext(f)[0] == base_name]
-                
-                if matching_files:
-                    file2_name = matching_files[0]
-                    logging.info(f'\nProcessing files:\n{file_name}\n{file2_name}')
-                    
-                    file1 = os.path.join(v1_path, file_name)
-                    file2 = os.path.join(v2_path, file2_name)
-                    
-                    try:
-                        # Get comparison result and modified workbook
-                        reports = compare_excel_files(file1, file2)
-                        
-                        # Create output filename with result prefix
-                        # output_path = os.path.join(result_path, f"{result}_{base_name}.xlsx")
-                        
-                        # Save the compared file
-                        # logging.info(f'Saving comparison result to: {output_path}')
-                        # modified_wb.save(output_path)
-                        
-                        if reports:
-                            school_reports.append({
-                                file2_name : reports
-                            })
-                        
-                    except Exception as e:
-                        logging.error(f'Error processing file {file_name}: {str(e)}')
-                        show_message("Error", f"Error processing file {file_name}: {str(e)}")
-                        continue
-        all_reports.append({
-            subfolder : school_reports
-        })
-            
-        if all_reports:
-            generate_report(all_reports)
-        else : 
-                logging.debug("No mismatches fount to report")
-                    
-        return True
-        
-    except Exception as e:
-        logging.error(f'Error in process_folder: {str(e)}', exc_info=True)
-        return False
- 
-
-def main():
-    # Initialize logging
-    setup_logging('DEBUG')  # Can be set to 'DEBUG', 'INFO', or 'WARNING'
-    
-    logging.info('Starting Excel comparison program')
-    
-    try:
-        # Create root window
-        root = create_root()
-        
-        # Select recompare folder
-        recompare_folder = select_directory(root, "recompareフォルダーを選択してください")
-        if not recompare_folder:
-            logging.warning('Folder selection cancelled')
-            show_message("フォルダー選択", "フォルダーが選択されていません。終了します...")
-            return
-            
-        logging.info(f'Selected recompare folder: {recompare_folder}')
-        show_message("比較を開始します", "比較プロセスを開始しています....")
-        
-        # Process all subfolders
-        success = process_folder(recompare_folder)
-        
-        if success:
-            logging.info('Comparison process completed successfully')
-            show_message("比較が完了しました", "比較プロセスが完了しました.")
-        else:
-            show_message("エラー", "処理中にエラーが発生しました。ログを確認してください。")
-            
-    except Exception as e:
-        logging.error(f'Unexpected error: {str(e)}', exc_info=True)
-        messagebox.showerror("エラーが発生しました", f"予期しないエラーが発生しました: {str(e)}")
-    finally:
-        logging.info('Program finished')
-        if root:
-            root.destroy()
-
-if __name__ == "__main__":
+import os
+import openpyxl
+import sys
+import logging
+import re
+import argparse
+from datetime import datetime
+from functools import lru_cache
+from openpyxl.styles import PatternFill
+
+from report_sink import MarkdownSink, MultiSink, open_report_sink, write_school, SINKS
+from report_db import SqliteSink
+from report_delta import write_db_delta
+from report_patterns import PatternSink
+from rule_set import load_rules
+from raw_loader import open_workbook
+from sheet_grid import ValueTable, GridWorkbook
+from column_profile import SheetProfiles, peek_value, KIND_DATE, KIND_TEXT
+from data_rows import DataRows
+from fast_normalize import is_date_value, same_date
+from time_intervals import parse_ranges, parse_intervals, overlap_spans, ranges_in_spans, format_spans
+from verdict_cache import VerdictCache, file_signature, MISSING, UNDECIDED
+from worker_pool import iter_jobs, folder_job, add_worker_arguments, worker_limits
+from mismatch_store import (Mismatch, MismatchStore, RULES as RULE_NAMES, RULE_DATE, RULE_TIME, RULE_TIME_RANGE,
+                            RULE_OVERLAP, RULE_OUT_TIME, RULE_VALUE)
+
+# tkinter is imported only on the GUI path, so the batch mode (run_cli) also runs
+# where no display is available. HEADLESS sends show_message() to the log instead.
+HEADLESS = False
+
+# Ignored pairs, equivalence prefixes and skip markers, compiled from rules.json next to this script
+RULES = load_rules(__file__)
+
+# Verdicts of the value rules per value pair, shared by all sheets and files of the process
+# (signed with the files the verdicts are computed by: this script, rules.json and the
+# modules compare_values() and compare_text() call into)
+VERDICTS = VerdictCache(file_signature(__file__, RULES.path, *(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), name)
+    for name in ('rule_set.py', 'column_profile.py', 'fast_normalize.py'))))
+
+# Loop columns whose checks read neighbouring cells, compared without the verdict cache
+NEIGHBOR_COLUMNS = (4, 5, 17)
+
+# Multiline cell fingerprints are sums of line hashes, kept to 64 bits
+FINGERPRINT_MASK = (1 << 64) - 1
+
+
+def is_total_label(value):
+    """True for the '計' cell in column 3 that ends the data rows."""
+    return normalize_value(value) == '計'
+
+
+# Decoded region of a sheet for raw_loader.py (first row, column, match): rows after the
+# '計' row are only compared when the other file has more data rows, read on first use
+TOTAL_ROW = (10, 3, is_total_label)
+
+
+# Memory budget and recycling of the worker processes (iter_jobs() keyword arguments,
+# set from the command line)
+WORKER_LIMITS = {}
+
+
+# Set up logging configuration
+def setup_logging(debug_level, log_file=None):
+    # Create logs directory if it doesn't exist
+    os.makedirs('logs', exist_ok=True)
+    
+    # Create a timestamp for the log file (worker processes pass the main process log file)
+    if log_file is None:
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        log_file = f'logs/excel_comparison_{timestamp}.log'
+    
+    # Define the logging format
+    log_format = '%(asctime)s - %(levelname)s - %(message)s'
+    
+    # Set up logging level based on debug_level parameter
+    if debug_level == 'DEBUG':
+        logging_level = logging.DEBUG
+    elif debug_level == 'INFO':
+        logging_level = logging.INFO
+    else:
+        logging_level = logging.WARNING
+    
+    # Configure logging
+    logging.basicConfig(
+        level=logging_level,
+        format=log_format,
+        handlers=[
+            logging.FileHandler(log_file, encoding='utf-8'),
+            logging.StreamHandler(sys.stdout)
+        ]
+    )
+    
+    logging.info(f'Logging initialized at level: {debug_level}')
+
+
+def create_root():
+    import tkinter as tk
+    root = tk.Tk()
+    root.withdraw()
+    return root
+
+def find_timeslot_column(sheet):
+    """Find the column containing '外出時間' and return its index."""
+    for row in sheet.iter_rows(min_row=1, max_row=1):
+        for cell in row:
+            if cell.value and isinstance(cell.value, str) and '外出時間' in cell.value:
+                logging.info(f"Found '外出時間' in column {cell.column_letter}")
+                return cell.column
+    return None
+
+
+def out_time_value(value):
+    """normalize_time_format() of a 勤務外時間 (Q列) cell, without its warning for empty cells."""
+    if isinstance(value, str) and value.strip():
+        return normalize_time_format(value)
+    return None
+
+
+def index_row_conditions(sheet, first_row=1, last_row=None):
+    """
+    Row checks of the comparison loop that only read V1, evaluated once per sheet:
+      skip_rows  G列 repeats a row skip marker (時間休)
+      zero_out   V1勤務外時間 (Q列) is 00:00
+      overlaps   row -> (有給(時間休), 外出, spans) when the time ranges in G列 and M列 overlap,
+                 with the ranges of each cell that fall in the overlap spans (overlap_label())
+    """
+    max_row = sheet.max_row
+    skip_rows = bytearray(max_row + 1)
+    zero_out = bytearray(max_row + 1)
+    overlaps = {}
+    for row in range(first_row, min(last_row or max_row, max_row) + 1):
+        leave_time = peek_value(sheet, row, 7)  # G列 (column 7)
+        if leave_time and RULES.is_skip_row(leave_time):
+            skip_rows[row] = 1
+        if out_time_value(peek_value(sheet, row, 17)) == "00:00":  # Q列 (column 17)
+            zero_out[row] = 1
+        outing_time = peek_value(sheet, row, 13)  # M列 (column 13)
+        if leave_time and outing_time:
+            spans = overlap_spans(parse_intervals(leave_time), parse_intervals(outing_time))
+            if spans:
+                overlaps[row] = (overlap_label(leave_time, spans), overlap_label(outing_time, spans), spans)
+    return {'skip_rows': skip_rows, 'zero_out': zero_out, 'overlaps': overlaps}
+
+
+def overlap_label(value, spans):
+    """
+    The time ranges of a G列/M列 cell that fall in the overlap spans, each as format_time_range()
+    writes it, joined by '、'. A cell that is a single range gives format_time_range() of the cell;
+    labels and the ranges outside the overlap are left out.
+    """
+    return '、'.join(format_time_range(text) for text in ranges_in_spans(parse_ranges(value), spans))
+
+
+def index_overtime_rows(sheet, first_row=1, last_row=None):
+    """Rows of a V2 sheet with V2勤務外時間 (Q列) other than 00:00 and 時間外勤務.勤務時間 (S列) > 0."""
+    overtime_rows = bytearray(sheet.max_row + 1)
+    for row in range(first_row, min(last_row or sheet.max_row, sheet.max_row) + 1):
+        overtime_hours = peek_value(sheet, row, 19)  # S列 (column 19)
+        if (isinstance(overtime_hours, (int, float)) and overtime_hours > 0
+                and out_time_value(peek_value(sheet, row, 17)) != "00:00"):
+            overtime_rows[row] = 1
+    return overtime_rows
+
+
+def select_directory(root, prompt):
+    from tkinter import messagebox, filedialog
+    logging.debug(f'Showing directory selection dialog with prompt: {prompt}')
+    messagebox.showinfo('情報', prompt)
+    folder_selected = filedialog.askdirectory(title=prompt)
+    if folder_selected:
+        logging.info(f'Selected directory: {folder_selected}')
+    else:
+        logging.warning('No directory selected')
+    return folder_selected
+
+def show_message(title, message):
+    if HEADLESS:
+        logging.info(f'{title}: {message}')
+        return
+    from tkinter import messagebox
+    logging.debug(f'Showing message box - Title: {title}, Message: {message}')
+    messagebox.showinfo(title, message)
+def normalize_time_format(time_str):
+    """
+    Normalize time string format by removing leading zeros, seconds, and standardizing separators.
+    """
+    if time_str is None or not isinstance(time_str, str) or time_str.strip() == "":
+        return None
+
+    try:
+        if time_str.count(':') == 2:
+            time_str = ':'.join(time_str.split(':')[:2])
+        if ':' in time_str:
+            hours, minutes = time_str.split(':')
+            hours = str(int(hours))  # Remove leading zeros
+            return f"{hours}:{minutes}"
+    except ValueError:
+        logging.warning(f"Invalid time format encountered: {time_str}")
+        return None
+
+    return time_str
+
+def normalize_time_range_symbols(time_str):
+    """Normalize time range format by removing variations in symbols and ensuring consistent spacing."""
+    if not isinstance(time_str, str):
+        return None
+    return time_str.replace('〜', '~').replace('～', '~').replace('：', ':').strip()
+
+def format_time_range(time_str):
+    """Standardize time range format to ensure consistent comparison."""
+    if time_str is None or not isinstance(time_str, str) or time_str.strip() == "":
+        logging.warning(f"Invalid input for format_time_range: {time_str} (type: {type(time_str)})")
+        return None  # Return None for invalid inputs
+    
+    time_str = normalize_time_range_symbols(time_str)  # Use the renamed function
+    if not time_str:
+        return None # Return None if the normalized string is empty
+    parts = time_str.split('~')
+    if len(parts) == 2:
+        start_time = normalize_time_format(parts[0].strip())  # Use new normalization
+        end_time = normalize_time_format(parts[1].strip())    # Use new normalization
+        return f"{start_time}~{end_time}"
+    return time_str
+
+def compare_time_parts(time1, time2):
+    """Compare two time strings by removing leading zeros from hours."""
+    if ':' not in time1 or ':' not in time2:
+        return time1 == time2
+    
+    hour1, minute1 = time1.split(':')
+    hour2, minute2 = time2.split(':')
+    
+    # Remove leading zeros for comparison
+    hour1 = str(int(hour1))
+    hour2 = str(int(hour2))
+    
+    return hour1 == hour2 and minute1 == minute2
+
+def is_datetime_string(value):
+    """Check if a string represents a datetime."""
+    if not isinstance(value, str):
+        return False
+    
+    # Common datetime patterns in Excel
+    patterns = [
+        '%Y/%m/%d %H:%M:%S',
+        '%Y/%m/%d %H:%M:%S 午前',
+        '%Y/%m/%d %H:%M:%S 午後',
+        '%Y/%m/%d %H:%M',
+        '%Y/%m/%d %H:%M 午前',
+        '%Y/%m/%d %H:%M 午後',
+        '%Y/%m/%d'
+    ]
+    
+    for pattern in patterns:
+        try:
+            datetime.strptime(value, pattern)
+            return True
+        except ValueError:
+            continue
+    return False
+
+def extract_date_part(value):
+    """Extract just the date part from a datetime string or object."""
+    if isinstance(value, datetime):
+        return value.strftime('%Y/%m/%d')
+    
+    if not isinstance(value, str):
+        return value
+        
+    # Try to extract date from string
+    patterns = [
+        '%Y-%m-%d %H:%M:%S',  # Added hyphen format
+        '%Y/%m/%d %H:%M:%S',
+        '%Y/%m/%d %H:%M:%S 午前',
+        '%Y/%m/%d %H:%M:%S 午後',
+        '%Y/%m/%d %H:%M',
+        '%Y/%m/%d %H:%M 午前',
+        '%Y/%m/%d %H:%M 午後',
+        '%Y/%m/%d',
+        '%Y-%m-%d'  # Added hyphen format without time
+    ]
+    
+    for pattern in patterns:
+        try:
+            dt = datetime.strptime(value, pattern)
+            return dt.strftime('%Y/%m/%d')
+        except ValueError:
+            continue
+            
+    # If no pattern matches, try to extract date using regex
+    date_pattern = r'(\d{4})[-/](\d{1,2})[-/](\d{1,2})'
+    match = re.search(date_pattern, str(value))
+    if match:
+        year, month, day = match.groups()
+        try:
+            return f"{year}/{int(month):02d}/{int(day):02d}"
+        except ValueError:
+            pass
+            
+    return value
+
+def is_time_string(value):
+    """Check if a string represents a time value."""
+    if not isinstance(value, str):
+        return False
+    
+    # Normalize the value first
+    value = normalize_time_format(value)
+    
+    # Remove common time separators and spaces
+    value = value.replace(':', '').replace('：', '').strip()
+    
+    # Check if it's a 3 or 4 digit number (e.g., 830 or 1430)
+    if value.isdigit() and (len(value) == 3 or len(value) == 4):
+        # Extract hours and minutes
+        if len(value) == 3:
+            hours = int(value[0])
+            minutes = int(value[1:])
+        else:
+            hours = int(value[:2])
+            minutes = int(value[2:])
+        
+        # Validate hours and minutes
+        return 0 <= hours <= 23 and 0 <= minutes <= 59
+    
+    return False
+    
+def get_comparison_columns(col, sheet_name, row):
+    """
+    Get the corresponding column numbers for comparison between sheets.
+    
+    Args:
+        col (int): Original column number
+        sheet_name (str): Name of the sheet
+    
+    Returns:
+        tuple: (col1, col2) where col1 is for sheet1 and col2 is for sheet2
+        None if the column should be skipped
+    """
+    logging.debug(f'get_comparison_columns called with col={col}, sheet_name={sheet_name}, row={row}')
+    
+    # For sheets containing "勤務表" in their names
+    if "勤務表" in sheet_name:
+        if col < 13:
+            logging.debug(f'Column {col} is less than 13, returning ({col}, {col})')
+            return (col, col)
+        
+        # For column 13, skip comparison
+        elif col == 13:
+            logging.debug(f'Column {col} is 13, skipping comparison')
+            return None  
+        
+        # For columns 14-32, subtract 1 from sheet1 column to account for skipped column 13 in sheet2
+        elif 14 <= col <= 33:
+            
+            if col > 26:
+                if col == 30:
+                    logging.debug(f'Column {col} is 30, returning ({col - 4}, {col})')
+                    return (col - 4, col)
+                if col > 30:
+                    logging.debug(f'Column {col} is greater than 30, returning ({col - 1}, {col})')
+                    return (col - 1, col)
+                logging.debug(f'Column {col} is greater than 26 but not 30, returning ({col}, {col})')
+                return (col, col)
+            logging.debug(f'Column {col} is between 14 and 26, returning ({col - 1}, {col})')
+            return (col - 1, col)
+        
+        # For column 27 and above, skip comparison
+        else:
+            logging.debug(f'Column {col} is 27 or above, skipping comparison')
+            return None
+    
+    logging.debug(f'Sheet name does not contain "勤務表", returning ({col}, {col})')
+    return (col, col)
+        
+def get_mapped_column(original_col, is_sheet1=True):
+    """
+    Map column numbers according to the specified rules.
+    
+    Args:
+        original_col (int): Original column number
+        is_sheet1 (bool): True if mapping for sheet1, False for sheet2
+    
+    Returns:
+        int: Mapped column number
+    """
+    if is_sheet1:
+        # Sheet1: Use original column numbers
+        return original_col
+    else:
+        # Sheet2:
+        # If column < 13: Use same column number
+        # If column >= 13: Add 1 to column number
+        if original_col < 13:
+            return original_col
+        else:
+            return original_col + 1
+
+
+def extract_sheet_name_string(sheet_name):
+    """
+    Extract meaningful part of the sheet name by removing leading digits and symbols
+    (like dot or underscore) but retaining the rest of the original name structure.
+    """
+    # Remove leading numbers and symbols (e.g., '1.', '2_', etc.)
+    cleaned_name = re.sub(r'^[\d._\-]+', '', sheet_name)
+    # Return the remaining name as it is (does not strip anything further)
+    return cleaned_name
+
+def compare_time_values(time1, time2):
+    """
+    Compare two time values accounting for different formats.
+    Handles cases like "08:00:00" vs "8:00" as equal.
+    """
+    # Convert both values to strings and normalize
+    time1 = normalize_time_format(str(time1).strip())
+    time2 = normalize_time_format(str(time2).strip())
+    
+    # If either isn't a valid time string, they're not equal
+    if not (is_time_string(time1) and is_time_string(time2)):
+        return False
+    
+    # Compare the normalized strings
+    return time1 == time2
+
+
+def compare_excel_files(file1_path, file2_path, on_sheet=None):
+    """
+    Compare two Excel files and return the sheet reports.
+    With on_sheet, each sheet with mismatches is passed to on_sheet(sheet_name, mismatches, count)
+    as soon as it is compared instead of being collected.
+    """
+    logging.info(f'Starting comparison of files:\n  File 1: {file1_path}\n  File 2: {file2_path}')
+    """ actual file name should be passed to the function """
+    file_name = file1_path.split('/')[-1]
+    
+    reports = []
+
+    try:
+        # Load the Excel files
+        logging.debug('Loading workbooks')
+        table = ValueTable()
+        wb1 = open_workbook(file1_path, table=table, terminator=TOTAL_ROW)
+        wb2 = open_workbook(file2_path, table=table, terminator=TOTAL_ROW)
+
+        # V1 and V2 values share one table, so cells holding the same value have the same id.
+        # Ids whose value was found equal to itself by the rules below (None to start with)
+        # are compared by id only; openpyxl workbooks (loader fallback) have no ids
+        equal_ids = {0} if isinstance(wb1, GridWorkbook) and isinstance(wb2, GridWorkbook) else None
+        
+       
+        fill_pattern_yellow = PatternFill(patternType="solid", fgColor='FFFF00')
+        
+        # Get visible sheets and their string-only names
+        visible_sheets1 = [(sheet.title, extract_sheet_name_string(sheet.title)) 
+                          for sheet in wb1.worksheets 
+                          if sheet.sheet_state == 'visible']
+        
+        visible_sheets2 = [(sheet.title, extract_sheet_name_string(sheet.title)) 
+                          for sheet in wb2.worksheets 
+                          if sheet.sheet_state == 'visible']
+        
+        # Log visible sheets from both workbooks
+        logging.info("Visible sheets in V1:")
+        for original, string_only in visible_sheets1:
+            logging.info(f"  - Original: {original} -> String only: {string_only}")
+            
+        logging.info("Visible sheets in V2:")
+        for original, string_only in visible_sheets2:
+            logging.info(f"  - Original: {original} -> String only: {string_only}")
+        
+        # Create dictionaries to map string-only names to original names
+        sheets1_dict = {string: orig for orig, string in visible_sheets1}
+        sheets2_dict = {string: orig for orig, string in visible_sheets2}
+        
+        # Find matching string-only names
+        common_string_names = set(sheets1_dict.keys()) & set(sheets2_dict.keys())
+        
+        if not common_string_names:
+            logging.warning('No matching sheet names found between the workbooks')
+            show_message("警告", "両方のExcelファイルに同じ名前のシートが見つかりません。")
+            return 'X', wb2
+            
+        # Compare each matching sheet
+        for string_name in common_string_names:
+          
+            sheet_report = []
+            
+            mismatch_found = 0
+            
+            sheet_name1 = sheets1_dict[string_name]
+            sheet_name2 = sheets2_dict[string_name]
+            
+            logging.info(f'\nComparing sheets: {sheet_name1} <-> {sheet_name2}')
+            
+            sheet1 = wb1[sheet_name1] 
+            sheet2 = wb2[sheet_name2] 
+            
+            # Get maximum dimensions for comparison
+            row_max = max(sheet1.max_row, sheet2.max_row)
+            col_max = max(sheet1.max_column, sheet2.max_column)
+            logging.debug(f'Sheet dimensions: {row_max} rows x {col_max} columns')
+            
+            # Find timeslot column if it exists
+            timeslot_col = find_timeslot_column(sheet1)
+            
+            # Column C of both sheets: data rows until '計', blank cells (see data_rows.py)
+            rows1 = DataRows(sheet1, normalize_value)
+            rows2 = DataRows(sheet2, normalize_value)
+            sheet1_data_rows = rows1.data_rows
+            sheet1_spec_row = rows1.last_row
+            sheet2_data_rows = rows2.data_rows
+            sheet2_spec_row = rows2.last_row
+            logging.debug(f"sheet 2 specific row {sheet2_spec_row}")
+            
+            sheet_max_row = max(sheet1_spec_row,sheet2_spec_row)
+
+            # Kind of data in each V2 column, sampled on first use (see column_profile.py)
+            profiles = SheetProfiles(sheet2, normalize_value, 1, min(sheet_max_row, sheet2.max_row))
+            
+            # Determine skip offset
+            skipped_row = sheet1_data_rows - sheet2_data_rows if sheet1_data_rows > sheet2_data_rows else 0
+            logging.debug(f'Data rows: File1={sheet1_data_rows}, File2={sheet2_data_rows}, Skip={skipped_row}')
+
+            # Row checks of the loop, evaluated for the compared rows at once (V1 rows run
+            # skipped_row ahead after the shift). V2 overtime only matters where V1勤務外時間
+            # is 00:00, so V2 is not scanned without such rows
+            row_conditions = index_row_conditions(sheet1, 10, sheet_max_row + skipped_row)
+            skip_rows = row_conditions['skip_rows']
+            zero_out = row_conditions['zero_out']
+            overlaps = row_conditions['overlaps']
+            overtime_rows = index_overtime_rows(sheet2, 10, sheet_max_row) if any(zero_out) else zero_out
+            
+            is_start_skip = False
+
+            # Compare cells
+            for row in range(10,sheet_max_row + 1 ):
+                
+                # Default row mapping
+                row1 = row
+                row2 = row
+                
+                # Adjust rows if there's a skip and we're in the critical range
+                if not is_start_skip and skipped_row > 0 and 37 < row < 41:
+                    # Column C comes from the indexes. The cells are still created as the
+                    # reads they replace did, the bounds check below sees the same max_row
+                    sheet1.cell(row, 3)
+                    sheet2.cell(row, 3)
+                    
+                    if rows1.is_blank(row) and not rows2.is_blank(row):
+                        row1 = row + skipped_row  # Shift File1 forward
+                        row2 = row
+                        is_start_skip = True
+                    # elif value1 is not None and value2 is None:
+                    #     row1 = row
+                    #     row2 = row + skipped_row  # Shift File2 forward (unlikely case)
+                elif is_start_skip:
+                    row1 = row + skipped_row
+                     
+                    
+                
+                # Ensure rows stay within bounds
+                if row1 > sheet1.max_row or row2 > sheet2.max_row:
+                    continue
+                
+                # Check the specific condition to skip comparison
+                if skip_rows[row1]:
+                    logging.debug(
+                        f"Skipping comparison for row {row1} due to '時間休' appearing 2 or more times in column G: {sheet1.cell(row1, 7).value}"
+                    )
+                    continue  # Skip this row
+                
+                
+                if zero_out[row1] and overtime_rows[row2]:
+                    logging.debug(
+                        f"Skipping comparison for row {row2} due to specified conditions: "
+                        f"V2勤務外時間={out_time_value(sheet2.cell(row2, 17).value)}, V1勤務外時間=00:00, "
+                        f"時間外勤務.勤務時間={sheet2.cell(row2, 19).value}"
+                    )
+                    continue  # Skip this row
+                
+                # Check for overlapping times in columns G (有給(時間休)) and M (外出) in V1
+                if row1 in overlaps:
+                    leave_time, outing_time, spans = overlaps[row1]
+                    # If times overlap, copy them to columns N and O
+                    sheet1.cell(row1, 14).value = leave_time  # N列 (column 14)
+                    sheet1.cell(row1, 15).value = outing_time  # O列 (column 15)
+                    logging.debug(
+                        f"Times overlap at row {row1}: 有給(時間休)={leave_time}, 外出={outing_time} "
+                        f"({format_spans(spans)}). Copied to columns N and O."
+                    )
+                
+                for col in range(1, col_max + 1):
+                    try:
+                        # Get comparison columns
+                        comparison_cols = get_comparison_columns(col, file_name, row)
+                        if comparison_cols is None:
+                            continue  # Skip this column
+                        
+                        
+                         
+                            
+                        col1, col2 = comparison_cols
+                        logging.debug(f'Comparing columns: {col1} (sheet1) vs {col2} (sheet2)')
+                        
+                        if row2 == sheet2_spec_row and col2 == 16:
+                            continue
+                        
+                        
+                        if col2 >= 21 and row >= 8 :
+                            if sheet2.cell(8,21).value == "申請書":
+                                if col2 > 21 and col2 < 25:
+                                    logging.debug(f'Skipping comparison for column {col1} to { col1 + 5 } due to "申請書" in column 21')
+                                    col1 = col1 + 6
+                                elif col2 == 25:
+                                    col1 = 26
+                                elif col2 >= 27:
+                                    col1 = col1 + 4
+                                else:
+                                    logging.debug(f'Skipping comparison for column {col1} to { col1 + 5 } due to "申請書" in column 21')
+                                    col1 = col1 + 5
+                                
+                            
+                        cacheable = col not in NEIGHBOR_COLUMNS
+                        if equal_ids is not None and cacheable:
+                            value_id1 = sheet1.get_id(row1, col1)
+                            value_id2 = sheet2.get_id(row2, col2)
+                            if value_id1 == value_id2 and value_id1 in equal_ids:
+                                continue
+
+                        value1 = sheet1.cell(row1, col1).value
+                        value2 = sheet2.cell(row2, col2).value
+
+                        logging.debug(f'Comparing cell ({row1}, {col1}) with ({row2}, {col2})')
+                        logging.debug(f'Value1: {value1}, Value2: {value2}')
+                        
+                        # Special case for two or more lines
+                        if isinstance(value1, str) and value1.count("\n") >= 1 and isinstance(value2, str) and value2.count("\n") >= 1:
+                            # Same lines in any order; lines the sort below fails on keep that path
+                            fingerprint = multiline_fingerprint(value1)
+                            if fingerprint is not None and fingerprint == multiline_fingerprint(value2):
+                                logging.debug(f'Values are equal (order-insensitive) at ({row2}, {col2}): {value1!r} vs {value2!r}')
+                                continue
+
+                            value1_arr = value1.strip().split("\n")
+                            value2_arr = value2.strip().split("\n")
+
+                            if len(value1_arr) == len(value2_arr):
+                                # Lines differ: normalize and sort values for the comparison below (raises
+                                # when the lines cannot be ordered, see multiline_fingerprint())
+                                value1 = sorted([normalize_value(v) for v in value1_arr])
+                                value2 = sorted([normalize_value(v) for v in value2_arr])
+
+                        # Normalize values
+                        value1 = normalize_value(value1)
+                        value2 = normalize_value(value2)
+                        
+                        # Handle None values
+                        if value1 is None and value2 is None:
+                            continue
+                        
+                        # Handle special case for "その他(一日)" and None
+                        if value1 == "None" or value1 is None:
+                            if value2 == "その他(一日)":
+                                logging.debug(f'Value case at ({row2}, {col2}): {value1} vs {value2}')
+                                if sheet1.cell(row1, col1-1).value == "休み" and sheet2.cell(row2, col2-1).value == "休み":
+                                    continue
+                        
+                        # Convert to string and strip whitespace if not datetime object
+                        if not isinstance(value1, datetime):
+                            value1 = str(value1).strip()
+                        if not isinstance(value2, datetime):
+                            value2 = str(value2).strip()
+
+                        # Verdict of the value rules, cached per value pair. Columns 4, 5 and 17
+                        # also depend on neighbouring cells and always go through the checks below.
+                        verdict = VERDICTS.get(value1, value2) if cacheable else MISSING
+                        if verdict is MISSING:
+                            verdict = compare_values(value1, value2, profiles[col2])
+
+                            if verdict is UNDECIDED:
+                                # Check for overlapping times between 有給(時間休) and 外出
+                                if col == 5:  # Assuming column 5 contains 有給(時間休) time ranges
+                                    leave_time = sheet1.cell(row1, 5).value  # 有給(時間休)
+                                    outing_time = sheet1.cell(row1, 6).value  # Assuming column 6 contains 外出 time ranges
+
+                                    if leave_time and outing_time:
+                                        spans = overlap_spans(parse_intervals(leave_time), parse_intervals(outing_time))
+
+                                        if spans:
+                                            sheet_report.append(Mismatch(row1, col1, value1, row2, col2, value2, RULE_OVERLAP))
+                                            # sheet2.cell(row2, col).fill = fill_pattern_yellow
+                                            mismatch_found += 1
+                                            logging.debug(
+                                                f"Time overlap detected at row {row1}: "
+                                                f"有給(時間休)={leave_time}, 外出={outing_time} ({format_spans(spans)})"
+                                            )
+                                            continue
+
+                                # Check the specific condition for V2勤務外時間 (Q列), V1勤務外時間 (Q列), and 時間外勤務.勤務時間 (S列)
+                                if col == 17:  # Q列 (column 17)
+                                    v2_out_time = normalize_time_format(sheet2.cell(row2, 17).value)
+                                    v1_out_time = normalize_time_format(sheet1.cell(row1, 17).value)
+                                    overtime_hours = sheet2.cell(row2, 19).value  # S列 (column 19)
+
+                                    if (
+                                        v2_out_time != "00:00" and
+                                        v1_out_time == "00:00" and
+                                        isinstance(overtime_hours, (int, float)) and overtime_hours > 0
+                                    ):
+                                        sheet_report.append(Mismatch(row1, col1, value1, row2, col2, value2, RULE_OUT_TIME))
+                                        # sheet2.cell(row2, 17).fill = fill_pattern_yellow
+                                        mismatch_found += 1
+                                        logging.debug(
+                                            f"Condition met at row {row2}: V2勤務外時間={v2_out_time}, "
+                                            f"V1勤務外時間={v1_out_time}, 時間外勤務.勤務時間={overtime_hours}"
+                                        )
+                                        continue
+
+                                # Handle the specific case for column D (D列)
+                                if col == 4:  # D列 (column 4)
+                                    v2_data = sheet2.cell(row2, 4).value
+                                    v1_data = sheet1.cell(row1, 4).value
+
+                                    if v1_data is None or str(v1_data).strip() == "":
+                                        if v2_data is not None and str(v2_data).strip() != "":
+                                            # Copy the entire row from V2 to V1
+                                            for c in range(1, col_max + 1):
+                                                sheet1.cell(row1, c).value = sheet2.cell(row2, c).value
+                                            logging.debug(
+                                                f"Row {row1} in V1 made the same as V2 because column D was empty."
+                                            )
+                                        break
+
+                                # For all other values, compare as strings
+                                verdict = compare_text(value1, value2)
+
+                            if cacheable:
+                                VERDICTS.put(value1, value2, verdict)
+
+                        if verdict is None and equal_ids is not None and cacheable and value_id1 == value_id2:
+                            equal_ids.add(value_id1)
+
+                        if verdict is not None:
+                            sheet_report.append(Mismatch(row1, col1, value1, row2, col2, value2, verdict))
+                            if verdict == RULE_DATE:
+                                sheet2.cell(row2, col2).fill = fill_pattern_yellow
+                            mismatch_found += 1
+                            logging.debug(f'Mismatch ({RULE_NAMES[verdict]}) at ({row2}, {col2}): {value1} vs {value2}')
+                            
+                    except Exception as e:
+                        # sheet_report.append({
+                        #     "row1" : row1,
+                        #     "col1" : col1,
+                        #     "val1" : value1,
+                        #     "row2" : row2,
+                        #     "col2" : col2,
+                        #     "val2" : value2
+                        # })
+                        logging.error(f'Error comparing cell ({row2}, {col2}): {str(e)}')
+                        # mismatch_found += 1
+                        continue
+            if sheet_report:
+                if on_sheet is not None:
+                    on_sheet(string_name, sheet_report, mismatch_found)
+                    continue
+                reports.append({
+                    "sheet_name" : string_name,
+                    "sheet_report" : sheet_report,
+                    "mismatch_found" : mismatch_found
+                })
+        
+        # Determine final result
+        # result = 'X' if mismatch_found > 0 else 'O'
+        # logging.info(f'Comparison completed. Result: {result} (mismatches: {mismatch_found})')
+        return  reports
+        
+    except Exception as e:
+        logging.error(f'Error during comparison: {str(e)}', exc_info=True)
+        raise
+
+def normalize_value(value):
+    """Normalize values to handle numeric equivalence, time formats, blank/None equivalence, and remove special characters."""
+    # Handle None values and empty strings
+    if value is None or (isinstance(value, str) and value.strip() == ""):
+        return None
+    
+    # If it's already a datetime object, return it
+    if isinstance(value, datetime):
+        return value
+    
+    # Convert to string and strip whitespace and quotation marks
+    if not isinstance(value, str):
+        # Handle float values - convert to int if it's a whole number
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+    
+    # Convert to string and normalize
+    value = str(value)
+    
+    # Remove special characters and normalize whitespace
+    value = value.replace("_x000D_", "")  # Remove Excel carriage return
+    value = value.replace("\r", "")       # Remove carriage return
+    value = value.replace("\n", "")       # Remove line feed
+    value = value.replace('"', '')        # Remove double quotes
+    value = value.replace('"', '')        # Remove smart quotes (opening)
+    value = value.replace('"', '')        # Remove smart quotes (closing)
+    
+    value = ' '.join(value.split())       # Normalize whitespace
+    value = value.strip()                 # Remove leading/trailing whitespace
+    
+    value = re.sub(r'(\d{1,3}:\d{2})\s+\(', r'\1(', value)  # Remove space before opening parenthesis
+    
+    # If after cleaning the string is empty, return None
+    if value == "":
+        return None
+    
+    # List of patterns to be normalized to None
+    normalize_patterns = [None, "0", "0:00", "00:00:00", "12:00:00午前"]
+    
+    if value in normalize_patterns:
+        return None
+        
+    # Try parsing as datetime with multiple formats
+    datetime_patterns = [
+        '%Y-%m-%d %H:%M:%S',
+        '%Y/%m/%d %H:%M:%S',
+        '%Y-%m-%d',
+        '%Y/%m/%d'
+    ]
+    
+    for pattern in datetime_patterns:
+        try:
+            return datetime.strptime(value, pattern)
+        except ValueError:
+            continue
+    
+    # If it's a numeric string (like "1.0" or "1")
+    try:
+        num = float(value)
+        if num.is_integer():
+            return str(int(num))
+    except ValueError:
+        pass
+        
+    return value
+
+@lru_cache(maxsize=4096)
+def multiline_fingerprint(value):
+    """
+    Order-independent fingerprint of a multiline cell: the line count and the sum of the
+    hashes of its normalized lines. Cells with the same lines in any order have the same
+    fingerprint, so equal cells are found without sorting their lines.
+
+    None when sorted() cannot order the normalized lines: several lines with an empty one
+    among them, or dates next to text. The sorted comparison raises on those cells and
+    counts them as errors, which the fingerprint must not turn into equal cells.
+    """
+    lines = [normalize_value(line) for line in value.strip().split("\n")]
+    if len(lines) > 1 and not (all(isinstance(line, str) for line in lines)
+                               or all(isinstance(line, datetime) for line in lines)):
+        return None
+    return len(lines), sum(hash(line) for line in lines) & FINGERPRINT_MASK
+
+def compare_datetime_values(value1, value2):
+    """Compare two datetime values, handling various formats."""
+    try:
+        # First normalize both values
+        norm1 = normalize_value(value1)
+        norm2 = normalize_value(value2)
+        
+        # If both are datetime objects, compare them directly
+        if isinstance(norm1, datetime) and isinstance(norm2, datetime):
+            return norm1.date() == norm2.date()
+        
+        # If they're strings, compare the date parts
+        date1 = extract_date_part(norm1)
+        date2 = extract_date_part(norm2)
+        
+        return date1 == date2
+    except Exception as e:
+        logging.error(f"Error comparing datetime values: {value1} vs {value2} - {str(e)}")
+        return False
+
+def is_ignored_mismatch(value1, value2):
+    """Check if the mismatch between value1 and value2 should be ignored (ignored_pairs in rules.json)."""
+    return RULES.is_ignored_mismatch(value1, value2)
+
+def is_vacation_equivalent(value1, value2):
+    """
+    Check if two values starting with "【休暇" can be considered equivalent (equivalent_prefixes in rules.json).
+    """
+    return RULES.is_equivalent(value1, value2)
+
+def compare_vacation_strings(str1, str2):
+    """
+    Compare two vacation time strings like '有給(時間休：14:30～16:30)' and '有給(時間休:14:30 〜 16:30)'.
+    Returns True if they are equivalent, False otherwise.
+    """
+    if not isinstance(str1, str) or not isinstance(str2, str):
+        return False
+
+    # Regular expression to extract the time range part (e.g., '14:30～16:30' or '14:30 〜 16:30')
+    time_range_pattern = r'(\d{1,2}:\d{2}\s*[〜～~]\s*\d{1,2}:\d{2})'
+
+    # Extract time ranges from both strings
+    match1 = re.search(time_range_pattern, str1)
+    match2 = re.search(time_range_pattern, str2)
+
+    if not match1 or not match2:
+        return str1 == str2  # If no time range found, compare strings directly
+
+    time_range1 = match1.group(1)
+    time_range2 = match2.group(1)
+
+    # Normalize time ranges
+    normalized_time1 = normalize_time_range_symbols(time_range1)
+    normalized_time2 = normalize_time_range_symbols(time_range2)
+
+    # Split and normalize individual times
+    start1, end1 = normalized_time1.split('~')
+    start2, end2 = normalized_time2.split('~')
+
+    start1 = normalize_time_format(start1.strip())
+    end1 = normalize_time_format(end1.strip())
+    start2 = normalize_time_format(start2.strip())
+    end2 = normalize_time_format(end2.strip())
+
+    # Reconstruct normalized time ranges
+    normalized_range1 = f"{start1}~{end1}" if start1 and end1 else None
+    normalized_range2 = f"{start2}~{end2}" if start2 and end2 else None
+
+    if normalized_range1 != normalized_range2:
+        return False
+
+    # Compare non-time parts by removing the time range and normalizing
+    non_time_part1 = re.sub(time_range_pattern, '', str1).replace('：', ':').replace(' ', '')
+    non_time_part2 = re.sub(time_range_pattern, '', str2).replace('：', ':').replace(' ', '')
+
+    return non_time_part1 == non_time_part2
+  
+def generate_report(all_reports, output_folder=None):
+    """Generate a markdown report of comparison results organized by school ID and workbook."""
+    sink = MarkdownSink(output_folder or os.path.dirname(os.path.abspath(__file__)))
+    for school_report in all_reports:
+        for school_id, file_reports in school_report.items():
+            write_school(sink, school_id, file_reports)
+    report_path = sink.close()
+    print(f"Report generated at: {report_path}")
+    return report_path
+
+def compare_values(value1, value2, profile):
+    """
+    Verdict of the value rules for a normalized pair (datetime or stripped string):
+    None when the values are equal, the rule of the mismatch (RULE_DATE, RULE_TIME,
+    RULE_TIME_RANGE), or UNDECIDED when only the column checks and compare_text() can tell.
+    The result only depends on the two values (profile only picks the fast path).
+    """
+    # Column comparator: values of the column's kind skip the detection below
+    fast_kind = profile.fast_kind(value1, value2)
+
+    # Check if either value is a datetime (date shapes and ordinals from fast_normalize.py)
+    if fast_kind is None:
+        is_datetime1 = is_date_value(value1)
+        is_datetime2 = is_date_value(value2)
+    else:
+        is_datetime1 = is_datetime2 = fast_kind == KIND_DATE
+
+    if is_datetime1 or is_datetime2:
+        if not same_date(value1, value2):
+            logging.debug(f'Date mismatch: {extract_date_part(value1)} vs {extract_date_part(value2)}')
+            return RULE_DATE
+        return None
+
+    # Check if either value is a time string
+    if fast_kind == KIND_TEXT:
+        is_time1 = is_time2 = False
+    else:
+        is_time1 = is_time_string(str(value1))
+        is_time2 = is_time_string(str(value2))
+
+    if is_time1 or is_time2:
+        if not compare_time_values(value1, value2):
+            return RULE_TIME
+        return None
+
+    # Check if values are vacation-equivalent
+    if is_vacation_equivalent(value1, value2):
+        logging.debug(f'Vacation-equivalent match: {value1} vs {value2}')
+        return None
+
+    # Handle time range comparison
+    if RULES.has_range_separator(str(value1)) or RULES.has_range_separator(str(value2)):
+        time1_parts = format_time_range(str(value1)).split('~')
+        time2_parts = format_time_range(str(value2)).split('~')
+
+        if len(time1_parts) == 2 and len(time2_parts) == 2:
+            start_match = compare_time_parts(time1_parts[0], time2_parts[0])
+            end_match = compare_time_parts(time1_parts[1], time2_parts[1])
+
+            if not (start_match and end_match):
+                return RULE_TIME_RANGE
+            return None
+
+    return UNDECIDED
+
+def compare_text(value1, value2):
+    """Verdict of the vacation string and plain string comparisons: None when equal or ignored, else RULE_VALUE."""
+    if compare_vacation_strings(value1, value2):
+        return None
+
+    if str(value1) != str(value2):
+        if not is_ignored_mismatch(value1, value2):
+
+            # Check special case
+            if re.sub(r'[：【】()（）]', '', value1) != re.sub(r'[：【】()（）]', '', value2):
+                return RULE_VALUE
+    return None
+
+def process_subfolder(recompare_folder, subfolder, sink=None):
+    """
+    Compare the V1/V2 workbooks of one school subfolder. Returns (store, failures):
+    with a sink each sheet is written to the report as it finishes and store is None,
+    otherwise (worker processes) the mismatches are collected and returned in a
+    MismatchStore. failures is the number of workbooks that could not be compared.
+    """
+    subfolder_path = os.path.join(recompare_folder, subfolder)
+    v1_path = os.path.join(subfolder_path, 'V1')
+    v2_path = os.path.join(subfolder_path, 'V2')
+    result_path = os.path.join(subfolder_path, 'result')
+    
+    # Check if required folders exist
+    if not all(os.path.exists(p) for p in [v1_path, v2_path]):
+        logging.warning(f'Skipping {subfolder}: V1 or V2 folder missing')
+        return None, 0
+        
+    # Create result folder if it doesn't exist
+    os.makedirs(result_path, exist_ok=True)
+    logging.info(f'Processing subfolder: {subfolder}')
+    failures = 0
+    
+    # Get file lists
+    files_vb1 = [f for f in os.listdir(v1_path) if f.endswith(('.xlsx', '.xls'))]
+    files_vb2 = [f for f in os.listdir(v2_path) if f.endswith(('.xlsx', '.xls'))]
+    
+    logging.info(f'Found {len(files_vb1)} Excel files in first folder')
+    logging.info(f'Found {len(files_vb2)} Excel files in second folder')
+
+    store = None
+    if sink is None:
+        store = sink = MismatchStore()
+    sink.start_school(subfolder)
+    
+    for file_name in files_vb1:
+        base_name = os.path.splitext(file_name)[0]
+        matching_files = [f for f in files_vb2 if os.path.splitext(f)[0] == base_name]
+        
+        if matching_files:
+            file2_name = matching_files[0]
+            logging.info(f'\nProcessing files:\n{file_name}\n{file2_name}')
+            
+            file1 = os.path.join(v1_path, file_name)
+            file2 = os.path.join(v2_path, file2_name)
+            
+            try:
+                # Each sheet goes to the sink as soon as it is compared
+                sink.start_workbook(file2_name)
+                compare_excel_files(file1, file2, sink.write_sheet)
+                
+                # Create output filename with result prefix
+                # output_path = os.path.join(result_path, f"{result}_{base_name}.xlsx")
+                
+                # Save the compared file
+                # logging.info(f'Saving comparison result to: {output_path}')
+                # modified_wb.save(output_path)
+                
+            except Exception as e:
+                logging.error(f'Error processing file {file_name}: {str(e)}')
+                show_message("Error", f"Error processing file {file_name}: {str(e)}")
+                failures += 1
+
+    sink.end_school()
+    return store, failures
+
+
+def process_folder(recompare_folder, output_folder=None, workers=1, formats=('md',), per_school=False, db_path=None,
+                   patterns=None):
+    """
+    Process all subfolders in recompare directory.
+    The report is written to output_folder (default: next to this script) while the
+    schools are compared, in each of formats ('md', 'csv', 'jsonl'); per_school writes
+    one file per school and an index into a <timestamp>_comparison_report folder.
+    With db_path the run is also stored in that SQLite database (see report_db.py), with
+    patterns the top N systemic mismatch patterns are written too (see report_patterns.py).
+    """
+    try:
+        # Get all subfolders in recompare directory
+        subfolders = [f for f in os.listdir(recompare_folder) 
+                     if os.path.isdir(os.path.join(recompare_folder, f))]
+        
+        logging.info(f'Found {len(subfolders)} subfolders to process')
+
+        report_folder = output_folder or os.path.dirname(os.path.abspath(__file__))
+        sinks = [open_report_sink(report_folder, formats, per_school)]
+        if db_path:
+            sinks.append(SqliteSink(db_path, 'kinmu_report', os.path.abspath(recompare_folder)))
+        if patterns:
+            sinks.append(PatternSink(report_folder, patterns))
+        sink = sinks[0] if len(sinks) == 1 else MultiSink(sinks)
+        success = False
+        try:
+            if workers > 1:
+                # Each school is written as soon as it and the schools before it are done
+                school_results = run_in_workers([(recompare_folder, subfolder) for subfolder in subfolders], workers)
+                failures = 0
+                for school_store, school_failures in school_results:
+                    failures += school_failures
+                    if school_store is not None:
+                        school_store.write_to(sink)
+            else:
+                failures = sum(process_subfolder(recompare_folder, subfolder, sink)[1] for subfolder in subfolders)
+                VERDICTS.log_stats()
+            success = failures == 0
+        finally:
+            # A run that died or left workbooks out is not stored as finished (see report_db.py)
+            report_path = sink.close(success)
+        logging.info(f'Report written to: {report_path}')
+
+        # Failed workbooks are logged and left out of the report so the others still get compared
+        if failures:
+            logging.error(f'{failures} workbooks could not be compared, the report leaves them out')
+        return success
+        
+    except Exception as e:
+        logging.error(f'Error in process_folder: {str(e)}', exc_info=True)
+        return False
+ 
+
+def init_worker(log_level, log_file, verdict_cache=None):
+    """Worker process set-up: same log file, no dialogs and the saved verdicts."""
+    global HEADLESS
+    HEADLESS = True
+    setup_logging(log_level, log_file)
+    if verdict_cache:
+        # Read only: workers do not write the cache file back
+        VERDICTS.load(verdict_cache)
+
+
+def run_in_workers(tasks, workers):
+    """
+    Run (recompare_folder, subfolder) tasks in worker processes (worker_pool.py). Yields the
+    results in task order, each one as soon as its task and every task before it are done.
+    """
+    root_logger = logging.getLogger()
+    log_files = [h.baseFilename for h in root_logger.handlers if isinstance(h, logging.FileHandler)]
+    initargs = (logging.getLevelName(root_logger.level), log_files[0] if log_files else None, VERDICTS.path)
+    logging.info(f'Running {len(tasks)} subfolders in {workers} worker processes')
+    jobs = [folder_job(task, os.path.join(*task, 'V1'), os.path.join(*task, 'V2')) for task in tasks]
+    return iter_jobs(process_subfolder, jobs, workers, init_worker, initargs, **WORKER_LIMITS)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Write the comparison report of a recompare folder without the GUI.')
+    parser.add_argument('recompare_folder', help='folder with <school>/V1 and <school>/V2 subfolders')
+    parser.add_argument('--output', help='folder for the report (default: next to this script)')
+    parser.add_argument('--workers', type=int, default=1, help='worker processes (default: 1)')
+    parser.add_argument('--format', dest='formats', action='append', choices=sorted(SINKS),
+                        help='report format, repeatable (default: md)')
+    parser.add_argument('--per-school', action='store_true',
+                        help='one report file per school plus an index')
+    parser.add_argument('--db', help='also store the run in this SQLite database')
+    parser.add_argument('--delta', action='store_true',
+                        help='with --db: also write a delta report against the previous run')
+    parser.add_argument('--patterns', type=int, metavar='N',
+                        help='also write the top N mismatch patterns across schools')
+    parser.add_argument('--verdict-cache', help='file keeping the verdicts of value pairs between runs '
+                                                '(only updated by runs without --workers)')
+    parser.add_argument('--log-level', choices=['DEBUG', 'INFO', 'WARNING'], default='INFO')
+    add_worker_arguments(parser)
+    args = parser.parse_args(argv)
+    if args.delta and not args.db:
+        parser.error('--delta needs --db')
+    return args
+
+
+def run_cli(argv=None):
+    """Batch entry point: no Tk root and no dialogs. Returns the exit code."""
+    global HEADLESS, WORKER_LIMITS
+    args = parse_args(argv)
+    HEADLESS = True
+    WORKER_LIMITS = worker_limits(args)
+    setup_logging(args.log_level)
+    logging.info('Starting Excel comparison program (batch mode)')
+
+    if args.output:
+        os.makedirs(args.output, exist_ok=True)
+    if args.verdict_cache:
+        VERDICTS.load(args.verdict_cache)
+    success = process_folder(args.recompare_folder, args.output, args.workers,
+                             args.formats or ['md'], args.per_school, args.db, args.patterns)
+    if args.verdict_cache and args.workers <= 1:
+        VERDICTS.save()
+    if success and args.delta:
+        write_db_delta(args.db, args.output or os.path.dirname(os.path.abspath(__file__)), 'kinmu_report')
+
+    logging.info('Program finished')
+    return 0 if success else 1
+
+
+def main():
+    from tkinter import messagebox
+
+    # Initialize logging
+    setup_logging('DEBUG')  # Can be set to 'DEBUG', 'INFO', or 'WARNING'
+    
+    logging.info('Starting Excel comparison program')
+    
+    try:
+        # Create root window
+        root = create_root()
+        
+        # Select recompare folder
+        recompare_folder = select_directory(root, "recompareフォルダーを選択してください")
+        if not recompare_folder:
+            logging.warning('Folder selection cancelled')
+            show_message("フォルダー選択", "フォルダーが選択されていません。終了します...")
+            return
+            
+        logging.info(f'Selected recompare folder: {recompare_folder}')
+        show_message("比較を開始します", "比較プロセスを開始しています....")
+        
+        # Process all subfolders
+        success = process_folder(recompare_folder)
+        
+        if success:
+            logging.info('Comparison process completed successfully')
+            show_message("比較が完了しました", "比較プロセスが完了しました.")
+        else:
+            show_message("エラー", "処理中にエラーが発生しました。ログを確認してください。")
+            
+    except Exception as e:
+        logging.error(f'Unexpected error: {str(e)}', exc_info=True)
+        messagebox.showerror("エラーが発生しました", f"予期しないエラーが発生しました: {str(e)}")
+    finally:
+        logging.info('Program finished')
+        if root:
+            root.destroy()
+
+if __name__ == "__main__":
+    # Any command line arguments select the batch mode, without arguments the GUI starts
+    if len(sys.argv) > 1:
+        sys.exit(run_cli())
     main()
\ No newline at end of file
@@ -0,0 +1,264 @@
+import os
+import sys
+import sqlite3
+import logging
+import argparse
+from datetime import datetime, timedelta
+
+
+# SQLite history of comparison runs. SqliteSink is a report sink (see report_sink.py)
+# that inserts each run, file pair, sheet and mismatch as the comparison goes, so
+# results of successive runs can be queried and compared instead of grepping the
+# timestamped markdown reports.
+#
+#   runs         one row per process_folder() call, finished is only set once it has
+#                compared every workbook (runs that failed or died keep it empty)
+#   file_pairs   school and (V2) workbook compared in a run
+#   sheets       sheets with mismatches and their count
+#   mismatches   one row per mismatch (values as text)
+#
+# Queries from the command line:
+#   python report_db.py results.db runs
+#   python report_db.py results.db failed-since --since "2024-05-01 00:00"
+#   python report_db.py results.db top-columns --limit 10
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    tool TEXT NOT NULL,
+    source TEXT,
+    started TEXT NOT NULL,
+    finished TEXT
+);
+CREATE TABLE IF NOT EXISTS file_pairs (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    school_id TEXT NOT NULL,
+    workbook TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sheets (
+    id INTEGER PRIMARY KEY,
+    pair_id INTEGER NOT NULL REFERENCES file_pairs(id),
+    sheet_name TEXT NOT NULL,
+    mismatch_count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS mismatches (
+    sheet_id INTEGER NOT NULL REFERENCES sheets(id),
+    row1 INTEGER,
+    col1 INTEGER,
+    val1 TEXT,
+    row2 INTEGER,
+    col2 INTEGER,
+    val2 TEXT,
+    rule TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_file_pairs_run_school ON file_pairs(run_id, school_id);
+CREATE INDEX IF NOT EXISTS idx_file_pairs_school ON file_pairs(school_id);
+CREATE INDEX IF NOT EXISTS idx_sheets_pair ON sheets(pair_id);
+CREATE INDEX IF NOT EXISTS idx_sheets_name ON sheets(sheet_name);
+CREATE INDEX IF NOT EXISTS idx_mismatches_sheet ON mismatches(sheet_id);
+CREATE INDEX IF NOT EXISTS idx_mismatches_col ON mismatches(col2);
+"""
+
+# Mismatch rows are inserted in one transaction per school, or earlier once this many are pending
+BATCH_SIZE = 20000
+
+
+def connect(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def text(value):
+    return None if value is None else str(value)
+
+
+class SqliteSink:
+    """Report sink writing one run into a SQLite database."""
+
+    def __init__(self, db_path, tool, source=None):
+        self.db_path = db_path
+        self.conn = connect(db_path)
+        cursor = self.conn.execute(
+            'INSERT INTO runs (tool, source, started) VALUES (?, ?, ?)',
+            (tool, source, datetime.now().isoformat(sep=' ', timespec='seconds')))
+        self.run_id = cursor.lastrowid
+        self.conn.commit()
+        self.school_id = None
+        self.pair_id = None
+        self.pending = []
+
+    def start_school(self, school_id):
+        self.school_id = school_id
+
+    def start_workbook(self, workbook):
+        cursor = self.conn.execute('INSERT INTO file_pairs (run_id, school_id, workbook) VALUES (?, ?, ?)',
+                                   (self.run_id, str(self.school_id), workbook))
+        self.pair_id = cursor.lastrowid
+
+    def write_sheet(self, sheet_name, mismatches, mismatch_count):
+        cursor = self.conn.execute('INSERT INTO sheets (pair_id, sheet_name, mismatch_count) VALUES (?, ?, ?)',
+                                   (self.pair_id, sheet_name, mismatch_count))
+        sheet_id = cursor.lastrowid
+        for mismatch in mismatches:
+            self.pending.append((sheet_id, mismatch['row1'], mismatch['col1'], text(mismatch['val1']),
+                                 mismatch['row2'], mismatch['col2'], text(mismatch['val2']),
+                                 getattr(mismatch, 'rule_name', None)))
+        if len(self.pending) >= BATCH_SIZE:
+            self.flush()
+
+    def end_school(self):
+        self.flush()
+        self.school_id = None
+        self.pair_id = None
+
+    def flush(self):
+        self.conn.executemany('INSERT INTO mismatches VALUES (?, ?, ?, ?, ?, ?, ?, ?)', self.pending)
+        self.conn.commit()
+        self.pending = []
+
+    def close(self, success=True):
+        """Store the pending rows; only a successful run is marked finished and used by the queries."""
+        self.flush()
+        if success:
+            self.conn.execute('UPDATE runs SET finished = ? WHERE id = ?',
+                              (datetime.now().isoformat(sep=' ', timespec='seconds'), self.run_id))
+            self.conn.commit()
+            logging.info(f'Run {self.run_id} stored in {self.db_path}')
+        else:
+            logging.warning(f'Run {self.run_id} stored in {self.db_path} as unfinished, '
+                            f'--delta and the queries skip it')
+        self.conn.close()
+        return self.db_path
+
+
+def latest_run(conn, tool=None, before=None):
+    """Id of the latest finished run (of a tool, started before a time), or None."""
+    query = 'SELECT id FROM runs WHERE finished IS NOT NULL'
+    params = []
+    if tool:
+        query += ' AND tool = ?'
+        params.append(tool)
+    if before:
+        query += ' AND started < ?'
+        params.append(before)
+    row = conn.execute(query + ' ORDER BY started DESC, id DESC LIMIT 1', params).fetchone()
+    return row[0] if row else None
+
+
+def school_counts(conn, run_id):
+    """{school_id: mismatches} of the schools compared in a run."""
+    rows = conn.execute("""
+        SELECT p.school_id, COALESCE(SUM(s.mismatch_count), 0)
+        FROM file_pairs p LEFT JOIN sheets s ON s.pair_id = p.id
+        WHERE p.run_id = ?
+        GROUP BY p.school_id""", (run_id,))
+    return dict(rows.fetchall())
+
+
+def newly_failed(conn, since, tool=None):
+    """
+    Schools with mismatches in the latest run that had none in the last run before since.
+    Returns (latest run id, reference run id, [(school_id, mismatches)]).
+    """
+    latest = latest_run(conn, tool)
+    reference = latest_run(conn, tool, since)
+    if latest is None:
+        return None, reference, []
+    current = school_counts(conn, latest)
+    previous = school_counts(conn, reference) if reference is not None else {}
+    failed = [(school_id, count) for school_id, count in sorted(current.items())
+              if count > 0 and previous.get(school_id, 0) == 0]
+    return latest, reference, failed
+
+
+def top_columns(conn, run_id, limit=10, school=None):
+    """Columns (V2) with the most mismatches in a run: [(sheet_name, col2, mismatches, schools)]."""
+    query = """
+        SELECT s.sheet_name, m.col2, COUNT(*), COUNT(DISTINCT p.school_id)
+        FROM mismatches m
+        JOIN sheets s ON s.id = m.sheet_id
+        JOIN file_pairs p ON p.id = s.pair_id
+        WHERE p.run_id = ?"""
+    params = [run_id]
+    if school:
+        query += ' AND p.school_id = ?'
+        params.append(school)
+    query += ' GROUP BY s.sheet_name, m.col2 ORDER BY COUNT(*) DESC LIMIT ?'
+    params.append(limit)
+    return conn.execute(query, params).fetchall()
+
+
+def print_table(header, rows):
+    rows = [[str(value) for value in row] for row in rows]
+    widths = [max([len(str(h))] + [len(row[i]) for row in rows]) for i, h in enumerate(header)]
+    print('  '.join(str(h).ljust(w) for h, w in zip(header, widths)))
+    for row in rows:
+        print('  '.join(value.ljust(w) for value, w in zip(row, widths)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Query the comparison history database.')
+    parser.add_argument('db', help='SQLite database written with --db')
+    parser.add_argument('--tool', help='only runs of this tool (e.g. kinmu_report)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    runs_parser = commands.add_parser('runs', help='list the latest runs')
+    runs_parser.add_argument('--limit', type=int, default=20)
+
+    failed_parser = commands.add_parser('failed-since', help='schools that newly have mismatches')
+    failed_parser.add_argument('--since', help='reference time, "YYYY-MM-DD[ HH:MM]" (default: 24 hours ago)')
+
+    columns_parser = commands.add_parser('top-columns', help='columns with the most mismatches')
+    columns_parser.add_argument('--run', type=int, help='run id (default: latest run)')
+    columns_parser.add_argument('--school', help='only this school')
+    columns_parser.add_argument('--limit', type=int, default=10)
+
+    args = parser.parse_args(argv)
+    if not os.path.exists(args.db):
+        print(f'Database not found: {args.db}')
+        return 1
+    conn = connect(args.db)
+
+    if args.command == 'runs':
+        query = """
+            SELECT r.id, r.tool, r.started, r.finished, COUNT(DISTINCT p.school_id),
+                   (SELECT COALESCE(SUM(s.mismatch_count), 0) FROM sheets s
+                    JOIN file_pairs q ON q.id = s.pair_id WHERE q.run_id = r.id)
+            FROM runs r LEFT JOIN file_pairs p ON p.run_id = r.id"""
+        params = []
+        if args.tool:
+            query += ' WHERE r.tool = ?'
+            params.append(args.tool)
+        query += ' GROUP BY r.id ORDER BY r.started DESC, r.id DESC LIMIT ?'
+        params.append(args.limit)
+        print_table(['run', 'tool', 'started', 'finished', 'schools', 'mismatches'],
+                    conn.execute(query, params).fetchall())
+
+    elif args.command == 'failed-since':
+        since = args.since or (datetime.now() - timedelta(days=1)).isoformat(sep=' ', timespec='seconds')
+        latest, reference, failed = newly_failed(conn, since, args.tool)
+        if latest is None:
+            print('No finished runs')
+            return 0
+        print(f'Run {latest} compared with run {reference if reference is not None else "-"} (last run before {since})')
+        print_table(['school', 'mismatches'], failed)
+
+    elif args.command == 'top-columns':
+        run_id = args.run or latest_run(conn, args.tool)
+        if run_id is None:
+            print('No finished runs')
+            return 0
+        print(f'Run {run_id}')
+        print_table(['sheet', 'column', 'mismatches', 'schools'],
+                    top_columns(conn, run_id, args.limit, args.school))
+
+    conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
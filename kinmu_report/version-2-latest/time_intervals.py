@@ -0,0 +1,112 @@
+import re
+from bisect import bisect_right
+from functools import lru_cache
+
+
+# Time ranges of 有給(時間休) / 外出 cells as integer minute intervals. A cell can list
+# several ranges ("9:00~10:00、14:00〜15:30", one per line, after a label, ...): every
+# "H:MM~H:MM" in the text is an interval (start, end) in minutes after midnight, kept
+# sorted by start. Overlaps of two cells are found by a sweep over both lists:
+#
+#   merge_intervals   the sorted intervals of one cell, overlapping ones joined
+#   overlap_spans     the spans covered by both cells, walking the two merged lists
+#
+# Both steps are linear after the sort, so a row costs O(n log n) in its ranges instead
+# of one strptime pair per combination. Spans are returned for the log and reports, and
+# ranges_in_spans() gives back the text of the ranges of a cell that fall in them.
+#
+# Times are read as strptime("%H:%M") read them after normalize_time_format(): hours and
+# minutes of one or two digits, seconds dropped.
+
+RANGE_PATTERN = re.compile(r'(\d{1,2})\s*[:：]\s*(\d{1,2})(?:\s*[:：]\s*\d{2})?\s*[~〜～]'
+                           r'\s*(\d{1,2})\s*[:：]\s*(\d{1,2})(?:\s*[:：]\s*\d{2})?')
+
+# Distinct cell values whose intervals are kept
+INTERVAL_CACHE_SIZE = 4096
+
+
+def to_minutes(hours, minutes):
+    """Minutes after midnight of an "H:MM" time, None when it is not a valid time of day."""
+    hours = int(hours)
+    minutes = int(minutes)
+    if hours > 23 or minutes > 59:
+        return None
+    return hours * 60 + minutes
+
+
+@lru_cache(maxsize=INTERVAL_CACHE_SIZE)
+def parse_ranges(value):
+    """Sorted (start, end, text) of the time ranges in a cell value, empty for other values."""
+    if not isinstance(value, str):
+        return ()
+    ranges = []
+    for match in RANGE_PATTERN.finditer(value):
+        start_hours, start_minutes, end_hours, end_minutes = match.groups()
+        start = to_minutes(start_hours, start_minutes)
+        end = to_minutes(end_hours, end_minutes)
+        # Invalid times and empty or reversed ranges cannot overlap anything
+        if start is not None and end is not None and start < end:
+            ranges.append((start, end, match.group(0)))
+    return tuple(sorted(ranges))
+
+
+@lru_cache(maxsize=INTERVAL_CACHE_SIZE)
+def parse_intervals(value):
+    """Sorted (start, end) minute intervals of the time ranges in a cell value, empty for other values."""
+    return tuple((start, end) for start, end, text in parse_ranges(value))
+
+
+def merge_intervals(intervals):
+    """Sorted intervals with the overlapping and touching ones joined."""
+    merged = []
+    for start, end in intervals:
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def overlap_spans(intervals1, intervals2):
+    """Spans (start, end) covered by both interval lists; empty when they do not overlap."""
+    merged1 = merge_intervals(intervals1)
+    merged2 = merge_intervals(intervals2)
+    spans = []
+    index1 = index2 = 0
+    while index1 < len(merged1) and index2 < len(merged2):
+        start1, end1 = merged1[index1]
+        start2, end2 = merged2[index2]
+        start = max(start1, start2)
+        end = min(end1, end2)
+        if start < end:
+            spans.append((start, end))
+        # The interval that ends first cannot overlap anything further on the other side
+        if end1 < end2:
+            index1 += 1
+        else:
+            index2 += 1
+    return spans
+
+
+def ranges_in_spans(ranges, spans):
+    """Texts of the ranges (parse_ranges()) that share time with the sorted, disjoint spans."""
+    span_ends = [end for start, end in spans]
+    texts = []
+    for start, end, text in ranges:
+        # First span ending after the range starts: the only one that can begin before it ends
+        index = bisect_right(span_ends, start)
+        if index < len(spans) and spans[index][0] < end:
+            texts.append(text)
+    return texts
+
+
+def format_span(span):
+    """Minute span as "H:MM~H:MM"."""
+    start, end = span
+    return f"{start // 60}:{start % 60:02d}~{end // 60}:{end % 60:02d}"
+
+
+def format_spans(spans):
+    """Minute spans as "H:MM~H:MM, ..." for the log."""
+    return ', '.join(format_span(span) for span in spans)
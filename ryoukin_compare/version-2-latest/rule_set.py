@@ -0,0 +1,191 @@
+import os
+import re
+import json
+import logging
+from functools import lru_cache
+
+
+# Comparison rules kept in a rules.json next to each script instead of lists in the code.
+# The file is compiled once at import into frozensets/dicts, so every check is a hash lookup.
+#
+# {
+#   "format": 1,                      layout of this file (checked by the loader)
+#   "version": "2024.06.1",           revision of the rules, logged at start-up
+#   "ignored_pairs": [["休み", "シフト時間コード-1"], ...],   either order, null is None
+#   "ignored_values": ["有給", ...],  mismatch ignored if either value is one of these
+#   "equivalent_prefixes": ["【休暇", "休暇"],   equal when both values start with the same prefix
+#   "skip_markers": ["時間プラン"],   cells containing a marker are not compared
+#   "row_skip_markers": {"時間休": 2} rows whose marker cell contains a marker this many times are skipped
+#   "range_separators": ["〜", "～", "~"]   separators of time ranges
+# }
+#
+# All marker checks (skip markers, row skip markers, prefixes, separators) go through
+# one MarkerScanner: a value is scanned once and the rules test bits of the result.
+#
+# Which cell is checked for row_skip_markers, and the layout specific special cases
+# (column remapping, 申請書 columns, ...), stay in the engines.
+
+RULES_FORMAT = 1
+RULES_FILE = 'rules.json'
+
+# Distinct values whose scan result is kept (cell values repeat a lot within a workbook)
+SCAN_CACHE_SIZE = 1 << 16
+
+
+class RuleSetError(Exception):
+    """Raised when a rules file cannot be read or has an unsupported format."""
+    pass
+
+
+class MarkerScanner:
+    """
+    Finds every marker of a set in a string in one pass and returns them as a bitmask.
+
+    Works like an Aho-Corasick automaton, run by the re engine instead of Python code:
+    the markers form one pattern of lookaheads, longest first, so each position of the
+    value reports the longest marker starting there. Every shorter marker starting at
+    that position is one of its prefixes, precomputed per marker. Markers are given as
+    (text, kind, min_count):
+      'contains'  bit set when the text occurs at least min_count times (counted at every position)
+      'prefix'    bit set when the value starts with the text
+    """
+
+    def __init__(self, markers):
+        self.markers = list(markers)
+        texts = sorted({text for text, _, _ in self.markers}, key=len, reverse=True)
+        self.pattern = (re.compile('(?=(' + '|'.join(re.escape(text) for text in texts) + '))')
+                        if texts else None)
+        # For each text the pattern can report: bits of markers that are prefixes of it
+        self.found_bits = {}
+        self.prefix_bits = {}
+        self.counted = {}
+        for text in texts:
+            found = prefix = 0
+            counted = []
+            for index, (marker, kind, min_count) in enumerate(self.markers):
+                if not text.startswith(marker):
+                    continue
+                if kind == 'prefix':
+                    prefix |= 1 << index
+                elif min_count > 1:
+                    counted.append(index)
+                else:
+                    found |= 1 << index
+            self.found_bits[text] = found
+            self.prefix_bits[text] = prefix
+            self.counted[text] = counted
+
+    def scan(self, value):
+        """Bitmask of the markers present in a string (bit i for marker i)."""
+        if self.pattern is None:
+            return 0
+        mask = 0
+        counts = None
+        for match in self.pattern.finditer(value):
+            text = match.group(1)
+            mask |= self.found_bits[text]
+            if match.start() == 0:
+                mask |= self.prefix_bits[text]
+            if self.counted[text]:
+                counts = counts or {}
+                for index in self.counted[text]:
+                    counts[index] = counts.get(index, 0) + 1
+        if counts:
+            for index, count in counts.items():
+                if count >= self.markers[index][2]:
+                    mask |= 1 << index
+        return mask
+
+
+class RuleSet:
+    """Compiled rules of one rules.json."""
+
+    def __init__(self, data, path=None):
+        if data.get('format') != RULES_FORMAT:
+            raise RuleSetError(f"Unsupported rules format {data.get('format')} in {path}")
+        self.path = path
+        self.version = data.get('version')
+
+        pairs = set()
+        for pair in data.get('ignored_pairs', []):
+            if len(pair) != 2:
+                raise RuleSetError(f"Ignored pair must have two values: {pair} in {path}")
+            pairs.add((pair[0], pair[1]))
+            pairs.add((pair[1], pair[0]))
+        self.ignored_pairs = frozenset(pairs)
+        self.ignored_values = frozenset(data.get('ignored_values', []))
+        self.equivalent_prefixes = tuple(data.get('equivalent_prefixes', []))
+        self.skip_markers = tuple(data.get('skip_markers', []))
+        self.row_skip_markers = dict(data.get('row_skip_markers', {}))
+        self.range_separators = tuple(data.get('range_separators', []))
+
+        markers = ([(text, 'contains', 1) for text in self.skip_markers]
+                   + [(text, 'contains', min_count) for text, min_count in self.row_skip_markers.items()]
+                   + [(text, 'prefix', 1) for text in self.equivalent_prefixes]
+                   + [(text, 'contains', 1) for text in self.range_separators])
+        self.scanner = MarkerScanner(markers)
+        bits = [1 << index for index in range(len(markers))]
+        first = len(self.skip_markers)
+        second = first + len(self.row_skip_markers)
+        third = second + len(self.equivalent_prefixes)
+        self.skip_mask = sum(bits[:first])
+        self.row_skip_mask = sum(bits[first:second])
+        self.prefix_mask = sum(bits[second:third])
+        self.separator_mask = sum(bits[third:])
+        self._scan = lru_cache(maxsize=SCAN_CACHE_SIZE)(self.scanner.scan)
+
+    def scan(self, value):
+        """Marker bitmask of a cell value (0 for anything but a string)."""
+        if isinstance(value, str):
+            return self._scan(value)
+        return 0
+
+    def is_ignored_mismatch(self, value1, value2):
+        """True when the pair (in either order) or one of the values is ignored."""
+        return (contains(self.ignored_values, value1) or contains(self.ignored_values, value2)
+                or contains(self.ignored_pairs, (value1, value2)))
+
+    def is_equivalent(self, value1, value2):
+        """True when both strings start with the same equivalence prefix."""
+        return bool(self.scan(value1) & self.scan(value2) & self.prefix_mask)
+
+    def has_skip_marker(self, value):
+        """True when a cell value contains one of the skip markers."""
+        return bool(self.scan(value) & self.skip_mask)
+
+    def is_skip_row(self, value):
+        """True when the row marker cell repeats a row skip marker often enough."""
+        return bool(self.scan(value) & self.row_skip_mask)
+
+    def has_range_separator(self, value):
+        """True when a string contains one of the time range separators."""
+        return bool(self.scan(value) & self.separator_mask)
+
+
+def contains(table, value):
+    """Set membership that treats unhashable values (lists) as not found."""
+    try:
+        return value in table
+    except TypeError:
+        return False
+
+
+def load_rules(script_path):
+    """
+    Load and compile the rules.json next to a script (or a rules file given directly).
+    The engines pass their own __file__: this module is shared between tools loaded
+    in one process (bench, service), each with its own rules.
+    """
+    path = script_path
+    if not path.endswith('.json'):
+        path = os.path.join(os.path.dirname(os.path.abspath(script_path)), RULES_FILE)
+    try:
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        raise RuleSetError(f"Cannot read rules file {path}: {str(e)}") from e
+    rules = RuleSet(data, path)
+    # Engines load their rules at import, before setup_logging(): logging.debug() would
+    # configure the root logger there and the engine's log file would never be set up
+    logging.getLogger().debug(f'Rules {rules.version} loaded from {path}: {len(rules.ignored_pairs) // 2} ignored pairs')
+    return rules
@@ -1,698 +1,1007 @@
-import os
-import openpyxl
-import win32com.client
-import sys
-import tkinter as tk
-import logging
-import re
-from datetime import datetime
-from openpyxl.styles import PatternFill
-from tkinter import messagebox, filedialog
-
-
-# Set up logging configuration
-def setup_logging(debug_level):
-    # Create logs directory if it doesn't exist
-    os.makedirs('logs', exist_ok=True)
-
-    # Create a timestamp for the log file
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    log_file = f'logs/excel_comparison_{timestamp}.log'
-
-    # Define the logging format
-    log_format = '%(asctime)s - %(levelname)s - %(message)s'
-
-    # Set up logging level based on debug_level parameter
-    if debug_level == 'DEBUG':
-        logging_level = logging.DEBUG
-    elif debug_level == 'INFO':
-        logging_level = logging.INFO
-    else:
-        logging_level = logging.WARNING
-
-    # Configure logging
-    logging.basicConfig(
-        level=logging_level,
-        format=log_format,
-        handlers=[
-            logging.FileHandler(log_file, encoding='utf-8'),
-            logging.StreamHandler(sys.stdout)
-        ]
-    )
-
-    logging.info(f'Logging initialized at level: {debug_level}')
-
-
-def create_root():
-    root = tk.Tk()
-    root.withdraw()
-    return root
-
-
-def find_timeslot_column(sheet):
-    """Find the column containing '外出時間' and return its index."""
-    for row in sheet.iter_rows(min_row=1, max_row=1):
-        for cell in row:
-            if cell.value and isinstance(cell.value, str) and '外出時間' in cell.value:
-                logging.info(f"Found '外出時間' in column {cell.column_letter}")
-                return cell.column
-    return None
-
-
-def select_directory(root, prompt):
-    logging.debug(f'Showing directory selection dialog with prompt: {prompt}')
-    messagebox.showinfo('情報', prompt)
-    folder_selected = filedialog.askdirectory(title=prompt)
-    if folder_selected:
-        logging.info(f'Selected directory: {folder_selected}')
-    else:
-        logging.warning('No directory selected')
-    return folder_selected
-
-
-def show_message(title, message):
-    logging.debug(f'Showing message box - Title: {title}, Message: {message}')
-    messagebox.showinfo(title, message)
-
-
-def normalize_time_range_symbols(time_str):
-    """Normalize time format by removing variations in symbols and ensuring consistent spacing."""
-    return time_str.replace('〜', '~').replace('～', '~').strip()
-
-
-def format_time_range(time_str):
-    """Standardize time range format to ensure consistent comparison."""
-    time_str = normalize_time_range_symbols(time_str)  # Use the renamed function
-    parts = time_str.split('~')
-    if len(parts) == 2:
-        start_time = normalize_time_format(parts[0].strip())  # Use new normalization
-        end_time = normalize_time_format(parts[1].strip())  # Use new normalization
-        return f"{start_time}~{end_time}"
-    return time_str
-
-
-def compare_time_parts(time1, time2):
-    """Compare two time strings by removing leading zeros from hours."""
-    if ':' not in time1 or ':' not in time2:
-        return time1 == time2
-
-    hour1, minute1 = time1.split(':')
-    hour2, minute2 = time2.split(':')
-
-    # Remove leading zeros for comparison
-    hour1 = str(int(hour1))
-    hour2 = str(int(hour2))
-
-    return hour1 == hour2 and minute1 == minute2
-
-
-def is_datetime_string(value):
-    """Check if a string represents a datetime."""
-    if not isinstance(value, str):
-        return False
-
-    # Common datetime patterns in Excel
-    patterns = [
-        '%Y/%m/%d %H:%M:%S',
-        '%Y/%m/%d %H:%M:%S 午前',
-        '%Y/%m/%d %H:%M:%S 午後',
-        '%Y/%m/%d %H:%M',
-        '%Y/%m/%d %H:%M 午前',
-        '%Y/%m/%d %H:%M 午後',
-        '%Y/%m/%d'
-    ]
-
-    for pattern in patterns:
-        try:
-            datetime.strptime(value, pattern)
-            return True
-        except ValueError:
-            continue
-    return False
-
-
-def extract_date_part(value):
-    """Extract just the date part from a datetime string or object."""
-    if isinstance(value, datetime):
-        return value.strftime('%Y/%m/%d')
-
-    if not isinstance(value, str):
-        return value
-
-    # Try to extract date from string
-    patterns = [
-        '%Y-%m-%d %H:%M:%S',  # Added hyphen format
-        '%Y/%m/%d %H:%M:%S',
-        '%Y/%m/%d %H:%M:%S 午前',
-        '%Y/%m/%d %H:%M:%S 午後',
-        '%Y/%m/%d %H:%M',
-        '%Y/%m/%d %H:%M 午前',
-        '%Y/%m/%d %H:%M 午後',
-        '%Y/%m/%d',
-        '%Y-%m-%d'  # Added hyphen format without time
-    ]
-
-    for pattern in patterns:
-        try:
-            dt = datetime.strptime(value, pattern)
-            return dt.strftime('%Y/%m/%d')
-        except ValueError:
-            continue
-
-    # If no pattern matches, try to extract date using regex
-    date_pattern = r'(\d{4})[-/](\d{1,2})[-/](\d{1,2})'
-    match = re.search(date_pattern, str(value))
-    if match:
-        year, month, day = match.groups()
-        try:
-            return f"{year}/{int(month):02d}/{int(day):02d}"
-        except ValueError:
-            pass
-
-    return value
-
-
-def is_time_string(value):
-    """Check if a string represents a time value."""
-    if not isinstance(value, str):
-        return False
-
-    # Normalize the value first
-    value = normalize_time_format(value)
-
-    # Remove common time separators and spaces
-    value = value.replace(':', '').replace('：', '').strip()
-
-    # Check if it's a 3 or 4 digit number (e.g., 830 or 1430)
-    if value.isdigit() and (len(value) == 3 or len(value) == 4):
-        # Extract hours and minutes
-        if len(value) == 3:
-            hours = int(value[0])
-            minutes = int(value[1:])
-        else:
-            hours = int(value[:2])
-            minutes = int(value[2:])
-
-        # Validate hours and minutes
-        return 0 <= hours <= 23 and 0 <= minutes <= 59
-
-    return False
-
-
-def normalize_time_format(time_str):
-    """
-    Normalize time string format by removing leading zeros, seconds, and standardizing separators.
-    Examples:
-        "08:00:00" -> "8:00"
-        "8:00" -> "8:00"
-        "09:30:00" -> "9:30"
-    """
-    if not isinstance(time_str, str):
-        time_str = str(time_str)
-
-    # Remove any seconds portion if it exists
-    if time_str.count(':') == 2:
-        time_str = ':'.join(time_str.split(':')[:2])
-
-    # Split into hours and minutes
-    if ':' in time_str:
-        hours, minutes = time_str.split(':')
-        # Remove leading zeros from hours
-        hours = str(int(hours))
-        return f"{hours}:{minutes}"
-
-    return time_str
-
-
-# def get_comparison_columns(col, sheet_name):
-#     """
-#     Get the corresponding column numbers for comparison between sheets.
-#
-#     Args:
-#         col (int): Original column number
-#         sheet_name (str): Name of the sheet
-#
-#     Returns:
-#         tuple: (col1, col2) where col1 is for sheet1 and col2 is for sheet2
-#         None if the column should be skipped
-#     """
-#     # For sheets containing "勤務表" in their names
-#     if "勤務表" in sheet_name:
-#         if col < 13:
-#             return (col, col)
-#
-#         # For column 13, skip comparison
-#         elif col == 13:
-#             return None
-#             # For columns 14-32, subtract 1 from sheet1 column to account for skipped column 13 in sheet2
-#         elif 14 <= col <= 33:
-#             if col > 26:
-#                 if col == 30:
-#                     return (col - 4, col)
-#                 if col > 30:
-#                     return (col - 1, col)
-#                 return (col, col)
-#             return (col - 1, col)
-#         # For column 27 and above, skip comparison
-#         else:
-#             return None
-
-
-def get_mapped_column(original_col, is_sheet1=True):
-    """
-    Map column numbers according to the specified rules.
-
-    Args:
-        original_col (int): Original column number
-        is_sheet1 (bool): True if mapping for sheet1, False for sheet2
-
-    Returns:
-        int: Mapped column number
-    """
-    if is_sheet1:
-        # Sheet1: Use original column numbers
-        return original_col
-    else:
-        # Sheet2:
-        # If column < 13: Use same column number
-        # If column >= 13: Add 1 to column number
-        if original_col < 13:
-            return original_col
-        else:
-            return original_col + 1
-
-
-def extract_sheet_name_string(sheet_name):
-    """
-    Extract meaningful part of the sheet name by removing leading digits and symbols
-    (like dot or underscore) but retaining the rest of the original name structure.
-    """
-    # Remove leading numbers and symbols (e.g., '1.', '2_', etc.)
-    cleaned_name = re.sub(r'^[\d._\-]+', '', sheet_name)
-    # Return the remaining name as it is (does not strip anything further)
-    return cleaned_name
-
-
-def compare_time_values(time1, time2):
-    """
-    Compare two time values accounting for different formats.
-    Handles cases like "08:00:00" vs "8:00" as equal.
-    """
-    # Convert both values to strings and normalize
-    time1 = normalize_time_format(str(time1).strip())
-    time2 = normalize_time_format(str(time2).strip())
-
-    # If either isn't a valid time string, they're not equal
-    if not (is_time_string(time1) and is_time_string(time2)):
-        return False
-
-    # Compare the normalized strings
-    return time1 == time2
-
-def should_skip_column(value):
-    """Check if a column should be skipped based on content."""
-    if isinstance(value, str) and '時間プラン' in value:
-        logging.debug(f"Found '時間プラン' in cell value: {value}")
-        return True
-    return False
-
-def compare_excel_files(file1_path, file2_path):
-    """Compare two Excel files and return comparison result and modified workbook."""
-    logging.info(f'Starting comparison of files:\n  File 1: {file1_path}\n  File 2: {file2_path}')
-    """ actual file name should be passed to the function """
-    file_name = file1_path.split('/')[-1]
-
-    try:
-        
-        #  Recalculate formulas before loading (Windows only)
-        recalculate_excel(file1_path)
-        recalculate_excel(file2_path)
-        
-        # Load the Excel files
-        logging.debug('Loading workbooks')
-        wb1 = openpyxl.load_workbook(file1_path, data_only=True)
-        wb2 = openpyxl.load_workbook(file2_path, data_only=True)
-
-        # Initialize variables
-        mismatch_found = 0
-        fill_pattern_yellow = PatternFill(patternType="solid", fgColor='FFFF00')
-
-        # Get visible sheets and their string-only names
-        visible_sheets1 = [(sheet.title, extract_sheet_name_string(sheet.title))
-                           for sheet in wb1.worksheets
-                           if sheet.sheet_state == 'visible']
-
-        visible_sheets2 = [(sheet.title, extract_sheet_name_string(sheet.title))
-                           for sheet in wb2.worksheets
-                           if sheet.sheet_state == 'visible']
-
-        # Log visible sheets from both workbooks
-        logging.info("Visible sheets in V1:")
-        for original, string_only in visible_sheets1:
-            logging.info(f"  - Original: {original} -> String only: {string_only}")
-
-        logging.info("Visible sheets in V2:")
-        for original, string_only in visible_sheets2:
-            logging.info(f"  - Original: {original} -> String only: {string_only}")
-
-        # Create dictionaries to map string-only names to original names
-        sheets1_dict = {string: orig for orig, string in visible_sheets1}
-        sheets2_dict = {string: orig for orig, string in visible_sheets2}
-
-        # Find matching string-only names
-        common_string_names = set(sheets1_dict.keys()) & set(sheets2_dict.keys())
-
-        if not common_string_names:
-            logging.warning('No matching sheet names found between the workbooks')
-            show_message("警告", "両方のExcelファイルに同じ名前のシートが見つかりません。")
-            return 'X', wb2
-
-        # Compare each matching sheet
-        for string_name in common_string_names:
-            sheet_name1 = sheets1_dict[string_name]
-            sheet_name2 = sheets2_dict[string_name]
-
-            logging.info(f'\nComparing sheets: {sheet_name1} <-> {sheet_name2}')
-
-            sheet1 = wb1[sheet_name1]
-            sheet2 = wb2[sheet_name2]
-
-            # Check if row 40 in sheet 1 is empty
-            row_40_empty = all(cell.value is None for cell in sheet1[40])
-
-            # Get maximum dimensions for comparison
-            row_max = max(sheet1.max_row, sheet2.max_row)
-            col_max = max(sheet1.max_column, sheet2.max_column)
-            logging.debug(f'Sheet dimensions: {row_max} rows x {col_max} columns')
-
-            # Find timeslot column if it exists
-            timeslot_col = find_timeslot_column(sheet1)
-
-            # Compare cells
-            for row in range(1, row_max + 1):
-                if row == 40 and row_40_empty:
-                    logging.info("Row 40 is empty in sheet 1, skipping this row.")
-                    continue
-
-                for col in range(1, col_max + 1):
-                    try:
-                        # Get comparison columns
-                        # comparison_cols = get_comparison_columns(col, file_name)
-                        # if comparison_cols is None:
-                        #     continue  # Skip this column
-
-                        # col1, col2 = comparison_cols
-                        value1 = sheet1.cell(row, col).value
-                        value2 = sheet2.cell(row, col).value
-
-                        logging.debug(f'Comparing cell ({row}, {col}) with ({row}, {col})')
-                        logging.debug(f'Value1: {value1}, Value2: {value2}')
-                        
-                        # Check if either cell contains "時間プラン" - skip comparison if it does
-                        if should_skip_column(value1) or should_skip_column(value2):
-                            logging.debug(f"Skipping comparison for cell ({row}, {col}) because it contains '時間プラン'")
-                            continue
-
-                        # Normalize values
-                        value1 = normalize_value(value1)
-                        value2 = normalize_value(value2)
-                        
-                        logging.debug(f'Normalize Value1: {value1},Normalize Value2: {value2}')
-
-                        # Handle None values
-                        if value1 is None and value2 is None:
-                            continue
-                        if value1 is None or value2 is None:
-                            sheet2.cell(row, col).fill = fill_pattern_yellow
-                            mismatch_found += 1
-                            logging.debug(f'Value mismatch at ({row}, {col}): {value1} vs {value2}')
-                            continue
-
-                        # Convert to string and strip whitespace if not datetime object
-                        if not isinstance(value1, datetime):
-                            value1 = str(value1).strip()
-                        if not isinstance(value2, datetime):
-                            value2 = str(value2).strip()
-
-                        # Check if either value is a datetime
-                        is_datetime1 = isinstance(value1, datetime) or is_datetime_string(value1)
-                        is_datetime2 = isinstance(value2, datetime) or is_datetime_string(value2)
-
-                        if is_datetime1 or is_datetime2:
-                            date1 = extract_date_part(value1)
-                            date2 = extract_date_part(value2)
-
-                            if date1 != date2:
-                                sheet2.cell(row, col).fill = fill_pattern_yellow
-                                mismatch_found += 1
-                                logging.debug(f'Date mismatch at ({row}, {col}): {date1} vs {date2}')
-                            continue
-
-                        # Check if either value is a time string
-                        is_time1 = is_time_string(str(value1))
-                        is_time2 = is_time_string(str(value2))
-
-                        if is_time1 or is_time2:
-                            if not compare_time_values(value1, value2):
-                                sheet2.cell(row, col).fill = fill_pattern_yellow
-                                mismatch_found += 1
-                                logging.debug(f'Time mismatch at ({row}, {col}): {value1} vs {value2}')
-                            continue
-
-                        # Handle time range comparison
-                        if any(separator in str(value1) or separator in str(value2)
-                               for separator in ['〜', '～', '~']):
-                            time1_parts = format_time_range(str(value1)).split('~')
-                            time2_parts = format_time_range(str(value2)).split('~')
-
-                            if len(time1_parts) == 2 and len(time2_parts) == 2:
-                                start_match = compare_time_parts(time1_parts[0], time2_parts[0])
-                                end_match = compare_time_parts(time1_parts[1], time2_parts[1])
-
-                                if not (start_match and end_match):
-                                    sheet2.cell(row, col).fill = fill_pattern_yellow
-                                    mismatch_found += 1
-                                    logging.debug(f'Time range mismatch at ({row}, {col}): {value1} vs {value2}')
-                                continue
-
-                        # For all other values, compare as strings
-                        if str(value1) != str(value2):
-                            if not is_ignored_mismatch(value1, value2):
-                                sheet2.cell(row, col).fill = fill_pattern_yellow
-                                mismatch_found += 1
-                                logging.debug(f'Value mismatch at ({row}, {col}): {value1} vs {value2}')
-
-                    except Exception as e:
-                        logging.error(f'Error comparing cell ({row}, {col}): {str(e)}')
-                        mismatch_found += 1
-                        continue
-
-        # Determine final result
-        result = 'X' if mismatch_found > 0 else 'O'
-        logging.info(f'Comparison completed. Result: {result} (mismatches: {mismatch_found})')
-        return result, wb2
-
-    except Exception as e:
-        logging.error(f'Error during comparison: {str(e)}', exc_info=True)
-        raise
-
-
-def normalize_value(value):
-    """Normalize values to handle numeric equivalence, time formats, blank/None equivalence, and remove special characters."""
-    # Handle None values and empty strings
-    if value is None or (isinstance(value, str) and value.strip() == ""):
-        return None
-
-    #  If it's a formula (starts with '='), ignore the value and return as is
-    # if isinstance(value, str) and value.startswith('='):
-    #     return value
-
-    # If it's already a datetime object, return it
-    if isinstance(value, datetime):
-        return value
-
-    # Convert to string and strip whitespace and quotation marks
-    if not isinstance(value, str):
-        # Handle float values - convert to int if it's a whole number
-        if isinstance(value, float) and value.is_integer():
-            value = int(value)
-
-    # Convert to string and normalize
-    value = str(value)
-
-    # Remove special characters and normalize whitespace
-    value = value.replace("_x000D_", "")  # Remove Excel carriage return
-    value = value.replace("\r", "")  # Remove carriage return
-    value = value.replace("\n", "")  # Remove line feed
-    value = value.replace('"', '')  # Remove double quotes
-    value = value.replace('"', '')  # Remove smart quotes (opening)
-    value = value.replace('"', '')  # Remove smart quotes (closing)
-    value = ' '.join(value.split())  # Normalize whitespace
-    value = value.strip()  # Remove leading/trailing whitespace
-    # Normalize specific separators (、 and ・ and . to a common separator ",")
-    value = value.replace("、", ",").replace("・", ",").replace(".", ",")
-
-    # If after cleaning the string is empty, return None
-    if value == "":
-        return None
-
-    # List of patterns to be normalized to None
-    normalize_patterns = [None, "0", "0:00", "00:00:00", "12:00:00午前"]
-
-    if value in normalize_patterns:
-        return None
-
-    # Try parsing as datetime with multiple formats
-    datetime_patterns = [
-        '%Y-%m-%d %H:%M:%S',
-        '%Y/%m/%d %H:%M:%S',
-        '%Y-%m-%d',
-        '%Y/%m/%d'
-    ]
-
-    for pattern in datetime_patterns:
-        try:
-            return datetime.strptime(value, pattern)
-        except ValueError:
-            continue
-
-    # If it's a numeric string (like "1.0" or "1")
-    try:
-        num = float(value)
-        if num.is_integer():
-            return str(int(num))
-    except ValueError:
-        pass
-
-    return value
-
-
-def compare_datetime_values(value1, value2):
-    """Compare two datetime values, handling various formats."""
-    try:
-        # First normalize both values
-        norm1 = normalize_value(value1)
-        norm2 = normalize_value(value2)
-
-        # If both are datetime objects, compare them directly
-        if isinstance(norm1, datetime) and isinstance(norm2, datetime):
-            return norm1.date() == norm2.date()
-
-        # If they're strings, compare the date parts
-        date1 = extract_date_part(norm1)
-        date2 = extract_date_part(norm2)
-
-        return date1 == date2
-    except Exception as e:
-        logging.error(f"Error comparing datetime values: {value1} vs {value2} - {str(e)}")
-        return False
-
-
-def is_ignored_mismatch(value1, value2):
-    """Check if the mismatch between value1 and value2 should be ignored."""
-    ignored_pairs = [
-        ("休み", "シフト時間コード-1"),
-        ("フリー", "シフト時間コード2147483647"),
-        ("退職", "【退職後】"),
-        ("フリー", "シフト時間コード2147483647"),
-        ("【長期休暇】育児", "長期休暇：育児"),
-        # Add other ignored pairs if needed
-    ]
-    return (value1, value2) in ignored_pairs or (value2, value1) in ignored_pairs
-
-# Recalculate formulas using Excel (Windows only)
-def recalculate_excel(file_path):
-    """Force Excel to recalculate formulas and save the file."""
-    excel = win32com.client.Dispatch("Excel.Application")
-    excel.Visible = False  # Run in the background
-    workbook = excel.Workbooks.Open(os.path.abspath(file_path))
-    workbook.RefreshAll()  # Recalculate all formulas
-    workbook.Save()
-    workbook.Close()
-    excel.Quit()
-    logging.info(f"Recalculated formulas in {file_path}")
-
-def main():
-    # Initialize logging
-    setup_logging('DEBUG')  # Can be set to 'DEBUG', 'INFO', or 'WARNING'
-
-    logging.info('Starting Excel comparison program')
-
-    try:
-        # Create root window
-        root = create_root()
-
-        # Select folders
-        folder_vb1 = select_directory(root, "フォルダーを選択してください.")
-        if not folder_vb1:
-            logging.warning('First folder selection cancelled')
-            show_message("フォルダー選択", "フォルダーが選択されていません。終了します...")
-            return
-
-        folder_vb2 = select_directory(root, "以前選択した名前のExcelファイルがある別のフォルダーを選択してください.")
-        if not folder_vb2:
-            logging.warning('Second folder selection cancelled')
-            show_message("フォルダー選択", "フォルダーが選択されていません。終了します...")
-            return
-
-        folder_vb3 = select_directory(root, "宛先フォルダーを選択してください。")
-        if not folder_vb3:
-            logging.warning('Output folder selection cancelled')
-            show_message("フォルダー選択", "フォルダーが選択されていません。終了します...")
-            return
-
-        # Create output folder
-        os.makedirs(folder_vb3, exist_ok=True)
-        logging.info('Output folder created/verified')
-
-        # Get file lists
-        files_vb1 = [f for f in os.listdir(folder_vb1) if f.endswith(('.xlsx', '.xls'))]
-        files_vb2 = [f for f in os.listdir(folder_vb2) if f.endswith(('.xlsx', '.xls'))]
-
-        logging.info(f'Found {len(files_vb1)} Excel files in first folder')
-        logging.info(f'Found {len(files_vb2)} Excel files in second folder')
-
-        # Start comparison process
-        show_message("比較を開始します", "比較プロセスを開始しています....")
-
-        for file_name in files_vb1:
-            base_name = os.path.splitext(file_name)[0]
-            matching_files = [f for f in files_vb2 if os.path.splitext(f)[0] == base_name]
-
-            if matching_files:
-                file2_name = matching_files[0]
-                logging.info(f'\nProcessing files:\n{file_name}\n{file2_name}')
-
-                file1 = os.path.join(folder_vb1, file_name)
-                file2 = os.path.join(folder_vb2, file2_name)
-
-                try:
-                    # Get comparison result and modified workbook
-                    result, modified_wb = compare_excel_files(file1, file2)
-
-                    # Create output filename with result prefix
-                    output_path = os.path.join(folder_vb3, f"{result}_{base_name}.xlsx")
-
-                    # Save the compared file
-                    logging.info(f'Saving comparison result to: {output_path}')
-                    modified_wb.save(output_path)
-
-                except Exception as e:
-                    logging.error(f'Error processing file {file_name}: {str(e)}')
-                    show_message("Error", f"Error processing file {file_name}: {str(e)}")
-                    continue
-
-        logging.info('Comparison process completed')
-        show_message("比較が完了しました", "比較プロセスが完了しました.")
-
-    except Exception as e:
-        logging.error(f'Unexpected error: {str(e)}', exc_info=True)
-        messagebox.showerror("エラーが発生しました", f"予期しないエラーが発生しました: {str(e)}")
-    finally:
-        logging.info('Program finished')
-        if root:
-            root.destroy()
-
-
-if __name__ == "__main__":
+import os
+import openpyxl
+import sys
+import logging
+import re
+import zipfile
+import argparse
+from copy import copy
+from itertools import zip_longest
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.cell.read_only import EMPTY_CELL
+from openpyxl.styles import PatternFill
+from rule_set import load_rules
+
+# tkinter and win32com are imported only on the GUI and recalculation paths, so the
+# batch mode (run_cli) also runs where they are not available.
+# HEADLESS sends show_message() to the log instead of a dialog.
+HEADLESS = False
+
+# Ignored pairs, equivalence prefixes and skip markers, compiled from rules.json next to this script
+RULES = load_rules(__file__)
+
+# Recalculate the formulas through Excel before comparing (needs Windows and Excel)
+RECALCULATE = True
+
+# Large workbooks are compared by compare_excel_files_chunked(): both workbooks are read
+# in read-only mode and the marked V2 is written in write-only mode, CHUNK_ROWS rows at
+# a time, so the memory of a pair does not grow with the size of its sheets (openpyxl
+# still keeps the shared strings of a workbook). A pair is compared that way when one of
+# its worksheets is larger than CHUNKED_MIN_SHEET_BYTES of XML; 0 streams every pair.
+CHUNK_ROWS = 1000
+CHUNKED_MIN_SHEET_BYTES = 32 * 1024 * 1024
+
+
+# Set up logging configuration
+def setup_logging(debug_level, log_file=None):
+    # Create logs directory if it doesn't exist
+    os.makedirs('logs', exist_ok=True)
+
+    # Create a timestamp for the log file (worker processes pass the main process log file)
+    if log_file is None:
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        log_file = f'logs/excel_comparison_{timestamp}.log'
+
+    # Define the logging format
+    log_format = '%(asctime)s - %(levelname)s - %(message)s'
+
+    # Set up logging level based on debug_level parameter
+    if debug_level == 'DEBUG':
+        logging_level = logging.DEBUG
+    elif debug_level == 'INFO':
+        logging_level = logging.INFO
+    else:
+        logging_level = logging.WARNING
+
+    # Configure logging
+    logging.basicConfig(
+        level=logging_level,
+        format=log_format,
+        handlers=[
+            logging.FileHandler(log_file, encoding='utf-8'),
+            logging.StreamHandler(sys.stdout)
+        ]
+    )
+
+    logging.info(f'Logging initialized at level: {debug_level}')
+
+
+def create_root():
+    import tkinter as tk
+    root = tk.Tk()
+    root.withdraw()
+    return root
+
+
+def find_timeslot_column(sheet):
+    """Find the column containing '外出時間' and return its index."""
+    for row in sheet.iter_rows(min_row=1, max_row=1):
+        for cell in row:
+            if cell.value and isinstance(cell.value, str) and '外出時間' in cell.value:
+                logging.info(f"Found '外出時間' in column {cell.column_letter}")
+                return cell.column
+    return None
+
+
+def select_directory(root, prompt):
+    from tkinter import messagebox, filedialog
+    logging.debug(f'Showing directory selection dialog with prompt: {prompt}')
+    messagebox.showinfo('情報', prompt)
+    folder_selected = filedialog.askdirectory(title=prompt)
+    if folder_selected:
+        logging.info(f'Selected directory: {folder_selected}')
+    else:
+        logging.warning('No directory selected')
+    return folder_selected
+
+
+def show_message(title, message):
+    if HEADLESS:
+        logging.info(f'{title}: {message}')
+        return
+    from tkinter import messagebox
+    logging.debug(f'Showing message box - Title: {title}, Message: {message}')
+    messagebox.showinfo(title, message)
+
+
+def normalize_time_range_symbols(time_str):
+    """Normalize time format by removing variations in symbols and ensuring consistent spacing."""
+    return time_str.replace('〜', '~').replace('～', '~').strip()
+
+
+def format_time_range(time_str):
+    """Standardize time range format to ensure consistent comparison."""
+    time_str = normalize_time_range_symbols(time_str)  # Use the renamed function
+    parts = time_str.split('~')
+    if len(parts) == 2:
+        start_time = normalize_time_format(parts[0].strip())  # Use new normalization
+        end_time = normalize_time_format(parts[1].strip())  # Use new normalization
+        return f"{start_time}~{end_time}"
+    return time_str
+
+
+def compare_time_parts(time1, time2):
+    """Compare two time strings by removing leading zeros from hours."""
+    if ':' not in time1 or ':' not in time2:
+        return time1 == time2
+
+    hour1, minute1 = time1.split(':')
+    hour2, minute2 = time2.split(':')
+
+    # Remove leading zeros for comparison
+    hour1 = str(int(hour1))
+    hour2 = str(int(hour2))
+
+    return hour1 == hour2 and minute1 == minute2
+
+
+def is_datetime_string(value):
+    """Check if a string represents a datetime."""
+    if not isinstance(value, str):
+        return False
+
+    # Common datetime patterns in Excel
+    patterns = [
+        '%Y/%m/%d %H:%M:%S',
+        '%Y/%m/%d %H:%M:%S 午前',
+        '%Y/%m/%d %H:%M:%S 午後',
+        '%Y/%m/%d %H:%M',
+        '%Y/%m/%d %H:%M 午前',
+        '%Y/%m/%d %H:%M 午後',
+        '%Y/%m/%d'
+    ]
+
+    for pattern in patterns:
+        try:
+            datetime.strptime(value, pattern)
+            return True
+        except ValueError:
+            continue
+    return False
+
+
+def extract_date_part(value):
+    """Extract just the date part from a datetime string or object."""
+    if isinstance(value, datetime):
+        return value.strftime('%Y/%m/%d')
+
+    if not isinstance(value, str):
+        return value
+
+    # Try to extract date from string
+    patterns = [
+        '%Y-%m-%d %H:%M:%S',  # Added hyphen format
+        '%Y/%m/%d %H:%M:%S',
+        '%Y/%m/%d %H:%M:%S 午前',
+        '%Y/%m/%d %H:%M:%S 午後',
+        '%Y/%m/%d %H:%M',
+        '%Y/%m/%d %H:%M 午前',
+        '%Y/%m/%d %H:%M 午後',
+        '%Y/%m/%d',
+        '%Y-%m-%d'  # Added hyphen format without time
+    ]
+
+    for pattern in patterns:
+        try:
+            dt = datetime.strptime(value, pattern)
+            return dt.strftime('%Y/%m/%d')
+        except ValueError:
+            continue
+
+    # If no pattern matches, try to extract date using regex
+    date_pattern = r'(\d{4})[-/](\d{1,2})[-/](\d{1,2})'
+    match = re.search(date_pattern, str(value))
+    if match:
+        year, month, day = match.groups()
+        try:
+            return f"{year}/{int(month):02d}/{int(day):02d}"
+        except ValueError:
+            pass
+
+    return value
+
+
+def is_time_string(value):
+    """Check if a string represents a time value."""
+    if not isinstance(value, str):
+        return False
+
+    # Normalize the value first
+    value = normalize_time_format(value)
+
+    # Remove common time separators and spaces
+    value = value.replace(':', '').replace('：', '').strip()
+
+    # Check if it's a 3 or 4 digit number (e.g., 830 or 1430)
+    if value.isdigit() and (len(value) == 3 or len(value) == 4):
+        # Extract hours and minutes
+        if len(value) == 3:
+            hours = int(value[0])
+            minutes = int(value[1:])
+        else:
+            hours = int(value[:2])
+            minutes = int(value[2:])
+
+        # Validate hours and minutes
+        return 0 <= hours <= 23 and 0 <= minutes <= 59
+
+    return False
+
+
+def normalize_time_format(time_str):
+    """
+    Normalize time string format by removing leading zeros, seconds, and standardizing separators.
+    Examples:
+        "08:00:00" -> "8:00"
+        "8:00" -> "8:00"
+        "09:30:00" -> "9:30"
+    """
+    if not isinstance(time_str, str):
+        time_str = str(time_str)
+
+    # Remove any seconds portion if it exists
+    if time_str.count(':') == 2:
+        time_str = ':'.join(time_str.split(':')[:2])
+
+    # Split into hours and minutes
+    if ':' in time_str:
+        hours, minutes = time_str.split(':')
+        # Remove leading zeros from hours
+        hours = str(int(hours))
+        return f"{hours}:{minutes}"
+
+    return time_str
+
+
+# def get_comparison_columns(col, sheet_name):
+#     """
+#     Get the corresponding column numbers for comparison between sheets.
+#
+#     Args:
+#         col (int): Original column number
+#         sheet_name (str): Name of the sheet
+#
+#     Returns:
+#         tuple: (col1, col2) where col1 is for sheet1 and col2 is for sheet2
+#         None if the column should be skipped
+#     """
+#     # For sheets containing "勤務表" in their names
+#     if "勤務表" in sheet_name:
+#         if col < 13:
+#             return (col, col)
+#
+#         # For column 13, skip comparison
+#         elif col == 13:
+#             return None
+#             # For columns 14-32, subtract 1 from sheet1 column to account for skipped column 13 in sheet2
+#         elif 14 <= col <= 33:
+#             if col > 26:
+#                 if col == 30:
+#                     return (col - 4, col)
+#                 if col > 30:
+#                     return (col - 1, col)
+#                 return (col, col)
+#             return (col - 1, col)
+#         # For column 27 and above, skip comparison
+#         else:
+#             return None
+
+
+def get_mapped_column(original_col, is_sheet1=True):
+    """
+    Map column numbers according to the specified rules.
+
+    Args:
+        original_col (int): Original column number
+        is_sheet1 (bool): True if mapping for sheet1, False for sheet2
+
+    Returns:
+        int: Mapped column number
+    """
+    if is_sheet1:
+        # Sheet1: Use original column numbers
+        return original_col
+    else:
+        # Sheet2:
+        # If column < 13: Use same column number
+        # If column >= 13: Add 1 to column number
+        if original_col < 13:
+            return original_col
+        else:
+            return original_col + 1
+
+
+def extract_sheet_name_string(sheet_name):
+    """
+    Extract meaningful part of the sheet name by removing leading digits and symbols
+    (like dot or underscore) but retaining the rest of the original name structure.
+    """
+    # Remove leading numbers and symbols (e.g., '1.', '2_', etc.)
+    cleaned_name = re.sub(r'^[\d._\-]+', '', sheet_name)
+    # Return the remaining name as it is (does not strip anything further)
+    return cleaned_name
+
+
+def compare_time_values(time1, time2):
+    """
+    Compare two time values accounting for different formats.
+    Handles cases like "08:00:00" vs "8:00" as equal.
+    """
+    # Convert both values to strings and normalize
+    time1 = normalize_time_format(str(time1).strip())
+    time2 = normalize_time_format(str(time2).strip())
+
+    # If either isn't a valid time string, they're not equal
+    if not (is_time_string(time1) and is_time_string(time2)):
+        return False
+
+    # Compare the normalized strings
+    return time1 == time2
+
+def should_skip_column(value):
+    """Check if a column should be skipped based on content."""
+    if RULES.has_skip_marker(value):
+        logging.debug(f"Found skip marker in cell value: {value}")
+        return True
+    return False
+
+def cell_mismatch(value1, value2, row, col):
+    """
+    True when a V1/V2 cell pair is a mismatch to be marked in V2, False when it matches
+    or is not compared. Errors of the rules are raised to the caller.
+    """
+    logging.debug(f'Comparing cell ({row}, {col}) with ({row}, {col})')
+    logging.debug(f'Value1: {value1}, Value2: {value2}')
+
+    # Check if either cell contains "時間プラン" - skip comparison if it does
+    if should_skip_column(value1) or should_skip_column(value2):
+        logging.debug(f"Skipping comparison for cell ({row}, {col}) because it contains '時間プラン'")
+        return False
+
+    # Normalize values
+    value1 = normalize_value(value1)
+    value2 = normalize_value(value2)
+
+    logging.debug(f'Normalize Value1: {value1},Normalize Value2: {value2}')
+
+    # Handle None values
+    if value1 is None and value2 is None:
+        return False
+    if value1 is None or value2 is None:
+        logging.debug(f'Value mismatch at ({row}, {col}): {value1} vs {value2}')
+        return True
+
+    # Convert to string and strip whitespace if not datetime object
+    if not isinstance(value1, datetime):
+        value1 = str(value1).strip()
+    if not isinstance(value2, datetime):
+        value2 = str(value2).strip()
+
+    # Check if either value is a datetime
+    is_datetime1 = isinstance(value1, datetime) or is_datetime_string(value1)
+    is_datetime2 = isinstance(value2, datetime) or is_datetime_string(value2)
+
+    if is_datetime1 or is_datetime2:
+        date1 = extract_date_part(value1)
+        date2 = extract_date_part(value2)
+
+        if date1 != date2:
+            logging.debug(f'Date mismatch at ({row}, {col}): {date1} vs {date2}')
+            return True
+        return False
+
+    # Check if either value is a time string
+    is_time1 = is_time_string(str(value1))
+    is_time2 = is_time_string(str(value2))
+
+    if is_time1 or is_time2:
+        if not compare_time_values(value1, value2):
+            logging.debug(f'Time mismatch at ({row}, {col}): {value1} vs {value2}')
+            return True
+        return False
+
+    # Handle time range comparison
+    if RULES.has_range_separator(str(value1)) or RULES.has_range_separator(str(value2)):
+        time1_parts = format_time_range(str(value1)).split('~')
+        time2_parts = format_time_range(str(value2)).split('~')
+
+        if len(time1_parts) == 2 and len(time2_parts) == 2:
+            start_match = compare_time_parts(time1_parts[0], time2_parts[0])
+            end_match = compare_time_parts(time1_parts[1], time2_parts[1])
+
+            if not (start_match and end_match):
+                logging.debug(f'Time range mismatch at ({row}, {col}): {value1} vs {value2}')
+                return True
+            return False
+
+    # For all other values, compare as strings
+    if str(value1) != str(value2):
+        if not is_ignored_mismatch(value1, value2):
+            logging.debug(f'Value mismatch at ({row}, {col}): {value1} vs {value2}')
+            return True
+    return False
+
+
+def compare_excel_files(file1_path, file2_path):
+    """Compare two Excel files and return comparison result and modified workbook."""
+    logging.info(f'Starting comparison of files:\n  File 1: {file1_path}\n  File 2: {file2_path}')
+    """ actual file name should be passed to the function """
+    file_name = file1_path.split('/')[-1]
+
+    try:
+        
+        #  Recalculate formulas before loading (Windows only)
+        if RECALCULATE:
+            recalculate_excel(file1_path)
+            recalculate_excel(file2_path)
+        
+        # Load the Excel files
+        logging.debug('Loading workbooks')
+        wb1 = openpyxl.load_workbook(file1_path, data_only=True)
+        wb2 = openpyxl.load_workbook(file2_path, data_only=True)
+
+        # Initialize variables
+        mismatch_found = 0
+        fill_pattern_yellow = PatternFill(patternType="solid", fgColor='FFFF00')
+
+        # Get visible sheets and their string-only names
+        visible_sheets1 = [(sheet.title, extract_sheet_name_string(sheet.title))
+                           for sheet in wb1.worksheets
+                           if sheet.sheet_state == 'visible']
+
+        visible_sheets2 = [(sheet.title, extract_sheet_name_string(sheet.title))
+                           for sheet in wb2.worksheets
+                           if sheet.sheet_state == 'visible']
+
+        # Log visible sheets from both workbooks
+        logging.info("Visible sheets in V1:")
+        for original, string_only in visible_sheets1:
+            logging.info(f"  - Original: {original} -> String only: {string_only}")
+
+        logging.info("Visible sheets in V2:")
+        for original, string_only in visible_sheets2:
+            logging.info(f"  - Original: {original} -> String only: {string_only}")
+
+        # Create dictionaries to map string-only names to original names
+        sheets1_dict = {string: orig for orig, string in visible_sheets1}
+        sheets2_dict = {string: orig for orig, string in visible_sheets2}
+
+        # Find matching string-only names
+        common_string_names = set(sheets1_dict.keys()) & set(sheets2_dict.keys())
+
+        if not common_string_names:
+            logging.warning('No matching sheet names found between the workbooks')
+            show_message("警告", "両方のExcelファイルに同じ名前のシートが見つかりません。")
+            return 'X', wb2
+
+        # Compare each matching sheet
+        for string_name in common_string_names:
+            sheet_name1 = sheets1_dict[string_name]
+            sheet_name2 = sheets2_dict[string_name]
+
+            logging.info(f'\nComparing sheets: {sheet_name1} <-> {sheet_name2}')
+
+            sheet1 = wb1[sheet_name1]
+            sheet2 = wb2[sheet_name2]
+
+            # Check if row 40 in sheet 1 is empty
+            row_40_empty = all(cell.value is None for cell in sheet1[40])
+
+            # Get maximum dimensions for comparison
+            row_max = max(sheet1.max_row, sheet2.max_row)
+            col_max = max(sheet1.max_column, sheet2.max_column)
+            logging.debug(f'Sheet dimensions: {row_max} rows x {col_max} columns')
+
+            # Find timeslot column if it exists
+            timeslot_col = find_timeslot_column(sheet1)
+
+            # Compare cells
+            for row in range(1, row_max + 1):
+                if row == 40 and row_40_empty:
+                    logging.info("Row 40 is empty in sheet 1, skipping this row.")
+                    continue
+
+                for col in range(1, col_max + 1):
+                    try:
+                        # Get comparison columns
+                        # comparison_cols = get_comparison_columns(col, file_name)
+                        # if comparison_cols is None:
+                        #     continue  # Skip this column
+
+                        # col1, col2 = comparison_cols
+                        value1 = sheet1.cell(row, col).value
+                        value2 = sheet2.cell(row, col).value
+
+                        if cell_mismatch(value1, value2, row, col):
+                            sheet2.cell(row, col).fill = fill_pattern_yellow
+                            mismatch_found += 1
+
+                    except Exception as e:
+                        logging.error(f'Error comparing cell ({row}, {col}): {str(e)}')
+                        mismatch_found += 1
+                        continue
+
+        # Determine final result
+        result = 'X' if mismatch_found > 0 else 'O'
+        logging.info(f'Comparison completed. Result: {result} (mismatches: {mismatch_found})')
+        return result, wb2
+
+    except Exception as e:
+        logging.error(f'Error during comparison: {str(e)}', exc_info=True)
+        raise
+
+
+def largest_sheet_size(file_path):
+    """Uncompressed size in bytes of the largest worksheet of an xlsx, 0 when it is not a zip (.xls)."""
+    try:
+        with zipfile.ZipFile(file_path) as archive:
+            return max((info.file_size for info in archive.infolist()
+                        if info.filename.startswith('xl/worksheets/') and info.filename.endswith('.xml')),
+                       default=0)
+    except (OSError, zipfile.BadZipFile):
+        return 0
+
+
+def is_large_pair(file1_path, file2_path):
+    """True when a pair is compared in row blocks (see CHUNKED_MIN_SHEET_BYTES)."""
+    return max(largest_sheet_size(file1_path), largest_sheet_size(file2_path)) >= CHUNKED_MIN_SHEET_BYTES
+
+
+def iter_row_blocks(sheet1, sheet2, size=CHUNK_ROWS):
+    """
+    Blocks of up to size (row, values1, cells2) of two read-only sheets, aligned by row
+    number up to the last row of either sheet. values1 are the values of the V1 row,
+    cells2 the read-only cells of the V2 row; a row missing on one side is empty.
+    """
+    # The dimensions saved in a file can be missing or wrong: read every row there is
+    sheet1.reset_dimensions()
+    sheet2.reset_dimensions()
+    rows = zip_longest(sheet1.iter_rows(values_only=True), sheet2.iter_rows(), fillvalue=())
+    block = []
+    for row, (values1, cells2) in enumerate(rows, 1):
+        block.append((row, values1, cells2))
+        if len(block) == size:
+            yield block
+            block = []
+    if block:
+        yield block
+
+
+def copy_cell(ws_out, cell, marked, styles, fill):
+    """
+    A read-only V2 cell for the write-only copy: same value and style, with fill when
+    marked. styles keeps the style of each (style id, marked) once it has been set up.
+    """
+    style_id = getattr(cell, '_style_id', 0)
+    if cell.value is None and not style_id and not marked:
+        return None
+    out_cell = WriteOnlyCell(ws_out)
+    # Value and type as read: WriteOnlyCell(value) would take "=..." strings for formulas
+    out_cell._value = cell.value
+    out_cell.data_type = cell.data_type
+    if not style_id and not marked:
+        return out_cell
+    style = styles.get((style_id, marked))
+    if style is None:
+        if style_id:
+            out_cell.font = cell.font
+            out_cell.border = cell.border
+            out_cell.fill = cell.fill
+            out_cell.number_format = cell.number_format
+            out_cell.protection = cell.protection
+            out_cell.alignment = cell.alignment
+        if marked:
+            out_cell.fill = fill
+        style = styles[(style_id, marked)] = copy(out_cell._style)
+    out_cell._style = copy(style)
+    return out_cell
+
+
+def copy_row(ws_out, cells2, marked, styles, fill):
+    """Cells of a V2 row for the write-only copy, with fill on the marked columns."""
+    width = max(len(cells2), max(marked, default=0))
+    return [copy_cell(ws_out, cells2[col - 1] if col <= len(cells2) else EMPTY_CELL, col in marked, styles, fill)
+            for col in range(1, width + 1)]
+
+
+def compare_sheet_chunked(sheet1, sheet2, ws_out, styles, fill):
+    """
+    Compare two read-only sheets block by block and append the rows of sheet2 to ws_out
+    with the mismatches marked. Returns the number of mismatches.
+    """
+    mismatch_found = 0
+    for block in iter_row_blocks(sheet1, sheet2):
+        for row, values1, cells2 in block:
+            marked = set()
+            if row == 40 and all(value is None for value in values1):
+                logging.info("Row 40 is empty in sheet 1, skipping this row.")
+            else:
+                for col in range(1, max(len(values1), len(cells2)) + 1):
+                    value1 = values1[col - 1] if col <= len(values1) else None
+                    value2 = cells2[col - 1].value if col <= len(cells2) else None
+                    try:
+                        if cell_mismatch(value1, value2, row, col):
+                            marked.add(col)
+                            mismatch_found += 1
+                    except Exception as e:
+                        logging.error(f'Error comparing cell ({row}, {col}): {str(e)}')
+                        mismatch_found += 1
+            ws_out.append(copy_row(ws_out, cells2, marked, styles, fill))
+        logging.debug(f'Compared rows {block[0][0]}-{block[-1][0]} of {sheet2.title}')
+    return mismatch_found
+
+
+def compare_excel_files_chunked(file1_path, file2_path, output_path):
+    """
+    Compare two Excel files CHUNK_ROWS rows at a time and write the marked copy of V2 to
+    output_path. Returns the comparison result.
+
+    The copy keeps the sheets, values and cell styles of V2. Column widths, row heights,
+    merged cells and the other sheet settings are not read in read-only mode and are lost.
+    """
+    logging.info(f'Starting chunked comparison of files:\n  File 1: {file1_path}\n  File 2: {file2_path}')
+    wb1 = wb2 = None
+    try:
+        #  Recalculate formulas before loading (Windows only)
+        if RECALCULATE:
+            recalculate_excel(file1_path)
+            recalculate_excel(file2_path)
+
+        logging.debug('Opening workbooks in read-only mode')
+        wb1 = openpyxl.load_workbook(file1_path, read_only=True, data_only=True)
+        wb2 = openpyxl.load_workbook(file2_path, read_only=True, data_only=True)
+
+        mismatch_found = 0
+        fill_pattern_yellow = PatternFill(patternType="solid", fgColor='FFFF00')
+
+        visible_sheets1 = [(sheet.title, extract_sheet_name_string(sheet.title))
+                           for sheet in wb1.worksheets
+                           if sheet.sheet_state == 'visible']
+
+        visible_sheets2 = [(sheet.title, extract_sheet_name_string(sheet.title))
+                           for sheet in wb2.worksheets
+                           if sheet.sheet_state == 'visible']
+
+        logging.info("Visible sheets in V1:")
+        for original, string_only in visible_sheets1:
+            logging.info(f"  - Original: {original} -> String only: {string_only}")
+
+        logging.info("Visible sheets in V2:")
+        for original, string_only in visible_sheets2:
+            logging.info(f"  - Original: {original} -> String only: {string_only}")
+
+        sheets1_dict = {string: orig for orig, string in visible_sheets1}
+        sheets2_dict = {string: orig for orig, string in visible_sheets2}
+        common_string_names = set(sheets1_dict.keys()) & set(sheets2_dict.keys())
+
+        if not common_string_names:
+            logging.warning('No matching sheet names found between the workbooks')
+            show_message("警告", "両方のExcelファイルに同じ名前のシートが見つかりません。")
+
+        # V2 sheet -> V1 sheet it is compared with; the other sheets are copied as they are
+        compared_sheets = {sheets2_dict[string]: sheets1_dict[string] for string in common_string_names}
+
+        # The copy is written in V2 sheet order, one sheet after the other
+        wb_out = openpyxl.Workbook(write_only=True)
+        styles = {}
+        for sheet2 in wb2.worksheets:
+            ws_out = wb_out.create_sheet(sheet2.title)
+            ws_out.sheet_state = sheet2.sheet_state
+            sheet_name1 = compared_sheets.get(sheet2.title)
+            if sheet_name1 is None:
+                sheet2.reset_dimensions()
+                for cells2 in sheet2.iter_rows():
+                    ws_out.append(copy_row(ws_out, cells2, (), styles, fill_pattern_yellow))
+                continue
+
+            logging.info(f'\nComparing sheets: {sheet_name1} <-> {sheet2.title}')
+            mismatch_found += compare_sheet_chunked(wb1[sheet_name1], sheet2, ws_out, styles, fill_pattern_yellow)
+
+        logging.info(f'Saving comparison result to: {output_path}')
+        wb_out.save(output_path)
+
+        result = 'X' if mismatch_found > 0 or not compared_sheets else 'O'
+        logging.info(f'Comparison completed. Result: {result} (mismatches: {mismatch_found})')
+        return result
+
+    except Exception as e:
+        logging.error(f'Error during comparison: {str(e)}', exc_info=True)
+        raise
+    finally:
+        for wb in (wb1, wb2):
+            if wb is not None:
+                wb.close()
+
+
+def normalize_value(value):
+    """Normalize values to handle numeric equivalence, time formats, blank/None equivalence, and remove special characters."""
+    # Handle None values and empty strings
+    if value is None or (isinstance(value, str) and value.strip() == ""):
+        return None
+
+    #  If it's a formula (starts with '='), ignore the value and return as is
+    # if isinstance(value, str) and value.startswith('='):
+    #     return value
+
+    # If it's already a datetime object, return it
+    if isinstance(value, datetime):
+        return value
+
+    # Convert to string and strip whitespace and quotation marks
+    if not isinstance(value, str):
+        # Handle float values - convert to int if it's a whole number
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+
+    # Convert to string and normalize
+    value = str(value)
+
+    # Remove special characters and normalize whitespace
+    value = value.replace("_x000D_", "")  # Remove Excel carriage return
+    value = value.replace("\r", "")  # Remove carriage return
+    value = value.replace("\n", "")  # Remove line feed
+    value = value.replace('"', '')  # Remove double quotes
+    value = value.replace('"', '')  # Remove smart quotes (opening)
+    value = value.replace('"', '')  # Remove smart quotes (closing)
+    value = ' '.join(value.split())  # Normalize whitespace
+    value = value.strip()  # Remove leading/trailing whitespace
+    # Normalize specific separators (、 and ・ and . to a common separator ",")
+    value = value.replace("、", ",").replace("・", ",").replace(".", ",")
+
+    # If after cleaning the string is empty, return None
+    if value == "":
+        return None
+
+    # List of patterns to be normalized to None
+    normalize_patterns = [None, "0", "0:00", "00:00:00", "12:00:00午前"]
+
+    if value in normalize_patterns:
+        return None
+
+    # Try parsing as datetime with multiple formats
+    datetime_patterns = [
+        '%Y-%m-%d %H:%M:%S',
+        '%Y/%m/%d %H:%M:%S',
+        '%Y-%m-%d',
+        '%Y/%m/%d'
+    ]
+
+    for pattern in datetime_patterns:
+        try:
+            return datetime.strptime(value, pattern)
+        except ValueError:
+            continue
+
+    # If it's a numeric string (like "1.0" or "1")
+    try:
+        num = float(value)
+        if num.is_integer():
+            return str(int(num))
+    except ValueError:
+        pass
+
+    return value
+
+
+def compare_datetime_values(value1, value2):
+    """Compare two datetime values, handling various formats."""
+    try:
+        # First normalize both values
+        norm1 = normalize_value(value1)
+        norm2 = normalize_value(value2)
+
+        # If both are datetime objects, compare them directly
+        if isinstance(norm1, datetime) and isinstance(norm2, datetime):
+            return norm1.date() == norm2.date()
+
+        # If they're strings, compare the date parts
+        date1 = extract_date_part(norm1)
+        date2 = extract_date_part(norm2)
+
+        return date1 == date2
+    except Exception as e:
+        logging.error(f"Error comparing datetime values: {value1} vs {value2} - {str(e)}")
+        return False
+
+
+def is_ignored_mismatch(value1, value2):
+    """Check if the mismatch between value1 and value2 should be ignored (ignored_pairs in rules.json)."""
+    return RULES.is_ignored_mismatch(value1, value2)
+
+# Recalculate formulas using Excel (Windows only)
+def recalculate_excel(file_path):
+    """Force Excel to recalculate formulas and save the file."""
+    import win32com.client
+    excel = win32com.client.Dispatch("Excel.Application")
+    excel.Visible = False  # Run in the background
+    workbook = excel.Workbooks.Open(os.path.abspath(file_path))
+    workbook.RefreshAll()  # Recalculate all formulas
+    workbook.Save()
+    workbook.Close()
+    excel.Quit()
+    logging.info(f"Recalculated formulas in {file_path}")
+
+def process_file_pair(file1, file2, folder_vb3):
+    """Compare one V1/V2 pair and save the marked workbook with its O/X prefix. False when it failed."""
+    base_name = os.path.splitext(os.path.basename(file1))[0]
+    try:
+        if is_large_pair(file1, file2):
+            # Streamed to a temporary file, named once the result is known
+            temp_path = os.path.join(folder_vb3, f"{base_name}.xlsx.tmp")
+            result = compare_excel_files_chunked(file1, file2, temp_path)
+            output_path = os.path.join(folder_vb3, f"{result}_{base_name}.xlsx")
+            os.replace(temp_path, output_path)
+            logging.info(f'Comparison result saved as: {output_path}')
+            return True
+
+        # Get comparison result and modified workbook
+        result, modified_wb = compare_excel_files(file1, file2)
+
+        # Create output filename with result prefix
+        output_path = os.path.join(folder_vb3, f"{result}_{base_name}.xlsx")
+
+        # Save the compared file
+        logging.info(f'Saving comparison result to: {output_path}')
+        modified_wb.save(output_path)
+        return True
+
+    except Exception as e:
+        logging.error(f'Error processing file {os.path.basename(file1)}: {str(e)}')
+        show_message("Error", f"Error processing file {os.path.basename(file1)}: {str(e)}")
+        return False
+
+
+def process_files(folder_vb1, folder_vb2, folder_vb3, workers=1):
+    """
+    Compare the Excel files of folder_vb1 with the same names in folder_vb2, results to folder_vb3.
+    Returns the number of pairs that could not be compared.
+    """
+    # Create output folder
+    os.makedirs(folder_vb3, exist_ok=True)
+    logging.info('Output folder created/verified')
+
+    # Get file lists
+    files_vb1 = [f for f in os.listdir(folder_vb1) if f.endswith(('.xlsx', '.xls'))]
+    files_vb2 = [f for f in os.listdir(folder_vb2) if f.endswith(('.xlsx', '.xls'))]
+
+    logging.info(f'Found {len(files_vb1)} Excel files in first folder')
+    logging.info(f'Found {len(files_vb2)} Excel files in second folder')
+
+    pairs = []
+    for file_name in files_vb1:
+        base_name = os.path.splitext(file_name)[0]
+        matching_files = [f for f in files_vb2 if os.path.splitext(f)[0] == base_name]
+
+        if matching_files:
+            file2_name = matching_files[0]
+            logging.info(f'\nProcessing files:\n{file_name}\n{file2_name}')
+            pairs.append((os.path.join(folder_vb1, file_name), os.path.join(folder_vb2, file2_name), folder_vb3))
+
+    if workers > 1 and RECALCULATE:
+        # All processes would drive the same Excel instance, and each one quits it when done
+        logging.warning('Excel recalculation runs in a single process, ignoring the workers setting')
+        workers = 1
+
+    if workers > 1:
+        results = run_in_workers(pairs, workers)
+    else:
+        results = [process_file_pair(*pair) for pair in pairs]
+    failures = results.count(False)
+    if failures:
+        logging.error(f'{failures} of {len(pairs)} file pairs could not be compared')
+    return failures
+
+
+def init_worker(log_level, log_file, recalculate, chunked_min_sheet_bytes):
+    """Worker process set-up: same log file, no dialogs."""
+    global HEADLESS, RECALCULATE, CHUNKED_MIN_SHEET_BYTES
+    HEADLESS = True
+    RECALCULATE = recalculate
+    CHUNKED_MIN_SHEET_BYTES = chunked_min_sheet_bytes
+    setup_logging(log_level, log_file)
+
+
+def run_in_workers(pairs, workers):
+    """Run (file1, file2, folder_vb3) pairs in a pool of worker processes, results in pair order."""
+    root_logger = logging.getLogger()
+    log_files = [h.baseFilename for h in root_logger.handlers if isinstance(h, logging.FileHandler)]
+    initargs = (logging.getLevelName(root_logger.level), log_files[0] if log_files else None, RECALCULATE,
+                CHUNKED_MIN_SHEET_BYTES)
+    logging.info(f'Running {len(pairs)} file pairs in {workers} worker processes')
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=initargs) as executor:
+        futures = [executor.submit(process_file_pair, *pair) for pair in pairs]
+        return [future.result() for future in futures]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Compare two folders of 料金 workbooks without the GUI.')
+    parser.add_argument('folder_vb1', help='folder with the V1 workbooks')
+    parser.add_argument('folder_vb2', help='folder with the V2 workbooks of the same names')
+    parser.add_argument('--output', required=True, help='folder for the marked workbooks')
+    parser.add_argument('--no-recalculate', action='store_true',
+                        help='compare the values as last saved, without recalculating through Excel')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='worker processes (default: 1, only used with --no-recalculate)')
+    parser.add_argument('--chunked-min-mb', type=int, default=CHUNKED_MIN_SHEET_BYTES // (1024 * 1024),
+                        help='compare pairs with a worksheet of this many MB of XML or more in row blocks, '
+                             'with bounded memory (default: %(default)s, 0: every pair)')
+    parser.add_argument('--log-level', choices=['DEBUG', 'INFO', 'WARNING'], default='INFO')
+    return parser.parse_args(argv)
+
+
+def run_cli(argv=None):
+    """Batch entry point: no Tk root and no dialogs. Returns the exit code."""
+    global HEADLESS, RECALCULATE, CHUNKED_MIN_SHEET_BYTES
+    args = parse_args(argv)
+    HEADLESS = True
+    RECALCULATE = not args.no_recalculate
+    CHUNKED_MIN_SHEET_BYTES = args.chunked_min_mb * 1024 * 1024
+    setup_logging(args.log_level)
+    logging.info('Starting Excel comparison program (batch mode)')
+
+    try:
+        failures = process_files(args.folder_vb1, args.folder_vb2, args.output, args.workers)
+    except Exception as e:
+        logging.error(f'Unexpected error: {str(e)}', exc_info=True)
+        return 1
+    finally:
+        logging.info('Program finished')
+    # Failed pairs are only logged while the others are compared: report them in the exit code
+    return 1 if failures else 0
+
+
+def main():
+    from tkinter import messagebox
+
+    # Initialize logging
+    setup_logging('DEBUG')  # Can be set to 'DEBUG', 'INFO', or 'WARNING'
+
+    logging.info('Starting Excel comparison program')
+
+    try:
+        # Create root window
+        root = create_root()
+
+        # Select folders
+        folder_vb1 = select_directory(root, "フォルダーを選択してください.")
+        if not folder_vb1:
+            logging.warning('First folder selection cancelled')
+            show_message("フォルダー選択", "フォルダーが選択されていません。終了します...")
+            return
+
+        folder_vb2 = select_directory(root, "以前選択した名前のExcelファイルがある別のフォルダーを選択してください.")
+        if not folder_vb2:
+            logging.warning('Second folder selection cancelled')
+            show_message("フォルダー選択", "フォルダーが選択されていません。終了します...")
+            return
+
+        folder_vb3 = select_directory(root, "宛先フォルダーを選択してください。")
+        if not folder_vb3:
+            logging.warning('Output folder selection cancelled')
+            show_message("フォルダー選択", "フォルダーが選択されていません。終了します...")
+            return
+
+        # Start comparison process
+        show_message("比較を開始します", "比較プロセスを開始しています....")
+
+        process_files(folder_vb1, folder_vb2, folder_vb3)
+
+        logging.info('Comparison process completed')
+        show_message("比較が完了しました", "比較プロセスが完了しました.")
+
+    except Exception as e:
+        logging.error(f'Unexpected error: {str(e)}', exc_info=True)
+        messagebox.showerror("エラーが発生しました", f"予期しないエラーが発生しました: {str(e)}")
+    finally:
+        logging.info('Program finished')
+        if root:
+            root.destroy()
+
+
+if __name__ == "__main__":
+    # Any command line arguments select the batch mode, without arguments the GUI starts
+    if len(sys.argv) > 1:
+        sys.exit(run_cli())
     main()
\ No newline at end of file
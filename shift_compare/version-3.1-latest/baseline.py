@@ -0,0 +1,71 @@
+import os
+import logging
+
+import openpyxl
+
+from sheet_grid import GridWorkbook
+from snapshot import load_baseline_workbook
+
+
+# Baseline-once, compare-many: the V1 workbooks of a recompare folder are parsed and
+# indexed a single time and kept in memory, so comparing another V2 build only pays
+# for parsing V2 and diffing. The per-sheet index (row alignment keys, column plan)
+# is computed by the engine's index_sheet function, since each engine aligns rows differently.
+
+
+class BaselineWorkbook:
+    """One resident V1 workbook and the index of each of its visible sheets."""
+
+    def __init__(self, file_path, workbook, sheets):
+        self.file_path = file_path
+        self.workbook = workbook
+        self.sheets = sheets
+
+    def open(self):
+        """Fresh copy for one comparison (the engines write into V1 sheets while comparing)."""
+        if self.workbook is not None:
+            return self.workbook.copy()
+        # Workbooks that could not be turned into a grid are parsed again each time
+        return openpyxl.load_workbook(self.file_path)
+
+
+class BaselineSet:
+    """All V1 workbooks under a recompare folder, parsed and indexed once."""
+
+    def __init__(self, recompare_folder, index_sheet=None):
+        self.recompare_folder = recompare_folder
+        self.index_sheet = index_sheet
+        self.workbooks = {}
+
+    def load(self):
+        """Parse and index every V1 workbook. Returns the number of workbooks loaded."""
+        subfolders = [f for f in os.listdir(self.recompare_folder)
+                      if os.path.isdir(os.path.join(self.recompare_folder, f, 'V1'))]
+        for subfolder in subfolders:
+            v1_path = os.path.join(self.recompare_folder, subfolder, 'V1')
+            for file_name in os.listdir(v1_path):
+                if not file_name.endswith(('.xlsx', '.xls')):
+                    continue
+                file_path = os.path.join(v1_path, file_name)
+                try:
+                    self.workbooks[os.path.normpath(file_path)] = self.load_workbook(file_path)
+                except Exception as e:
+                    # Left to the normal compare path, which reports the error per file
+                    logging.error(f'Error loading baseline {file_path}: {str(e)}')
+        logging.info(f'Baseline loaded: {len(self.workbooks)} V1 workbooks from {self.recompare_folder}')
+        return len(self.workbooks)
+
+    def load_workbook(self, file_path):
+        wb = load_baseline_workbook(file_path)
+        sheets = {}
+        for sheet in wb.worksheets:
+            if sheet.sheet_state != 'visible' or self.index_sheet is None:
+                continue
+            # Index a copy so the resident sheet stays exactly as loaded
+            is_grid = isinstance(wb, GridWorkbook)
+            sheets[sheet.title] = self.index_sheet(sheet.copy() if is_grid else sheet)
+        return BaselineWorkbook(file_path, wb if isinstance(wb, GridWorkbook) else None, sheets)
+
+    def get(self, file_path):
+        """Resident baseline for a V1 file path, or None when it is not loaded."""
+        return self.workbooks.get(os.path.normpath(file_path))
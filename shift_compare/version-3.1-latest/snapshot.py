@@ -0,0 +1,236 @@
+import os
+import sys
+import json
+import hashlib
+import logging
+import zipfile
+import argparse
+from array import array
+from datetime import datetime, date, time, timedelta
+
+import openpyxl
+
+from sheet_grid import ValueTable, GridSheet, GridWorkbook, workbook_to_grid
+from raw_loader import load_raw_workbook, FALLBACK_ERRORS
+
+
+# On-disk snapshot of the visible sheets of a V1 workbook, keyed by the sha256 of the xlsx.
+# Layout (a plain zip, no extra dependencies):
+#   meta.json    format version, source file, digest, sheet titles and dimensions
+#   values.json  value table, one [type, payload] pair per interned value (id 0 is None)
+#   sheet_N.ids  array('I') little endian, max_row * max_column value ids (row major)
+# Raw cell values are stored, normalization is left to the engine so every engine
+# version reads the same snapshot (normalize_value runs once per distinct value anyway).
+
+#
+# Snapshots are opt-in: load_baseline_workbook() only reads and writes them once a folder
+# is set (set_snapshot_dir(), the --snapshots options of the engines). The default folder
+# is next to this script, never the current directory, and every written snapshot is logged.
+
+SNAPSHOT_FORMAT = 1
+SNAPSHOT_SUFFIX = '.snap'
+
+# Default snapshot folder, next to the engine script
+DEFAULT_SNAPSHOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'snapshots')
+
+# Folder used by load_baseline_workbook(), None while snapshots are off
+SNAPSHOT_DIR = None
+
+
+class SnapshotError(Exception):
+    """Raised when a workbook cannot be stored in or read from a snapshot."""
+    pass
+
+
+def file_digest(file_path):
+    """sha256 of the file contents."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def set_snapshot_dir(snapshot_dir):
+    """Turn snapshots on in snapshot_dir (DEFAULT_SNAPSHOT_DIR when empty), or off with None."""
+    global SNAPSHOT_DIR
+    if snapshot_dir is None:
+        SNAPSHOT_DIR = None
+    else:
+        SNAPSHOT_DIR = os.path.abspath(snapshot_dir or DEFAULT_SNAPSHOT_DIR)
+
+
+def snapshot_path(digest, snapshot_dir):
+    return os.path.join(snapshot_dir, digest + SNAPSHOT_SUFFIX)
+
+
+def encode_value(value):
+    """Encode a cell value as a JSON-safe [type, payload] pair."""
+    # bool before int, datetime before date (subclasses)
+    if isinstance(value, str):
+        return ['s', value]
+    if isinstance(value, bool):
+        return ['b', value]
+    if isinstance(value, int):
+        return ['i', value]
+    if isinstance(value, float):
+        return ['f', repr(value)]
+    if isinstance(value, datetime):
+        return ['dt', value.isoformat()]
+    if isinstance(value, date):
+        return ['d', value.isoformat()]
+    if isinstance(value, time):
+        return ['t', value.isoformat()]
+    if isinstance(value, timedelta):
+        return ['td', [value.days, value.seconds, value.microseconds]]
+    raise SnapshotError(f"Unsupported cell value type: {type(value).__name__}")
+
+
+def decode_value(item):
+    kind, payload = item
+    if kind in ('s', 'b', 'i'):
+        return payload
+    if kind == 'f':
+        return float(payload)
+    if kind == 'dt':
+        return datetime.fromisoformat(payload)
+    if kind == 'd':
+        return date.fromisoformat(payload)
+    if kind == 't':
+        return time.fromisoformat(payload)
+    if kind == 'td':
+        return timedelta(days=payload[0], seconds=payload[1], microseconds=payload[2])
+    raise SnapshotError(f"Unknown value kind in snapshot: {kind}")
+
+
+def save_snapshot(grid_wb, path, source='', digest=''):
+    """Write a GridWorkbook to a snapshot file (written to a temp file, then renamed)."""
+    values = [encode_value(value) for value in grid_wb.table.values[1:]]
+    meta = {
+        'format': SNAPSHOT_FORMAT,
+        'source': os.path.basename(source),
+        'digest': digest,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'sheets': [{'title': sheet.title, 'max_row': sheet.rows, 'max_column': sheet.columns}
+                   for sheet in grid_wb.worksheets],
+    }
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with zipfile.ZipFile(temp_path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr('meta.json', json.dumps(meta, ensure_ascii=False))
+        zf.writestr('values.json', json.dumps(values, ensure_ascii=False))
+        for index, sheet in enumerate(grid_wb.worksheets):
+            ids = array('I', sheet.ids)
+            if sys.byteorder == 'big':
+                ids.byteswap()
+            zf.writestr(f'sheet_{index}.ids', ids.tobytes())
+    os.replace(temp_path, path)
+    logging.info(f'Snapshot written: {path} ({len(values)} distinct values)')
+
+
+def load_snapshot(path):
+    """Read a snapshot file back into a GridWorkbook."""
+    with zipfile.ZipFile(path) as zf:
+        meta = json.loads(zf.read('meta.json'))
+        if meta.get('format') != SNAPSHOT_FORMAT:
+            raise SnapshotError(f"Unsupported snapshot format {meta.get('format')} in {path}")
+        table = ValueTable()
+        for item in json.loads(zf.read('values.json')):
+            table.values.append(decode_value(item))
+        # Rebuild the intern index so values written by the engine reuse existing ids
+        for value_id, value in enumerate(table.values[1:], start=1):
+            table._ids.setdefault((value.__class__, value), value_id)
+
+        worksheets = []
+        for index, info in enumerate(meta['sheets']):
+            ids = array('I')
+            ids.frombytes(zf.read(f'sheet_{index}.ids'))
+            if sys.byteorder == 'big':
+                ids.byteswap()
+            if len(ids) != info['max_row'] * info['max_column']:
+                raise SnapshotError(f"Sheet {info['title']} has a wrong size in {path}")
+            worksheets.append(GridSheet(info['title'], info['max_row'], info['max_column'], ids, table))
+    return GridWorkbook(worksheets, table)
+
+
+def load_workbook_grid(file_path):
+    """
+    Parse a V1 workbook into a GridWorkbook (raw loader, openpyxl for files it does not
+    handle), or the openpyxl workbook when its values do not fit in a grid.
+    """
+    try:
+        return load_raw_workbook(file_path)
+    except FALLBACK_ERRORS as e:
+        logging.debug(f'Loading {file_path} with openpyxl: {str(e)}')
+        wb = openpyxl.load_workbook(file_path)
+        try:
+            return workbook_to_grid(wb)
+        except (SnapshotError, TypeError) as e:
+            logging.debug(f'Keeping the openpyxl workbook for {file_path}: {str(e)}')
+            return wb
+
+
+def load_baseline_workbook(file_path, snapshot_dir=None):
+    """
+    Load the visible sheets of a V1 workbook, from its snapshot when one exists.
+
+    The xlsx is read only when there is no snapshot for its current contents (by the raw
+    loader, or openpyxl for files it does not handle), and the snapshot is written for
+    the next run. Without snapshot_dir or SNAPSHOT_DIR the xlsx is always read and nothing
+    is written. If the workbook contains values a snapshot cannot hold, the openpyxl
+    workbook is returned unchanged.
+    """
+    snapshot_dir = snapshot_dir or SNAPSHOT_DIR
+    if snapshot_dir is None:
+        return load_workbook_grid(file_path)
+
+    digest = file_digest(file_path)
+    path = snapshot_path(digest, snapshot_dir)
+    if os.path.exists(path):
+        try:
+            grid_wb = load_snapshot(path)
+            logging.debug(f'Loaded V1 snapshot {path} for {file_path}')
+            return grid_wb
+        except (SnapshotError, zipfile.BadZipFile, OSError, KeyError, ValueError) as e:
+            logging.warning(f'Ignoring unreadable snapshot {path}: {str(e)}')
+
+    grid_wb = load_workbook_grid(file_path)
+    if not isinstance(grid_wb, GridWorkbook):
+        logging.warning(f'No snapshot for {file_path}: values a snapshot cannot hold')
+        return grid_wb
+    try:
+        save_snapshot(grid_wb, path, file_path, digest)
+    except (SnapshotError, OSError) as e:
+        logging.warning(f'Could not write snapshot for {file_path}: {str(e)}')
+    return grid_wb
+
+
+def build_snapshots(recompare_folder, snapshot_dir=None):
+    """Create snapshots for every V1 workbook under a recompare folder (default folder: DEFAULT_SNAPSHOT_DIR)."""
+    snapshot_dir = snapshot_dir or DEFAULT_SNAPSHOT_DIR
+    count = 0
+    for school in sorted(os.listdir(recompare_folder)):
+        v1_folder = os.path.join(recompare_folder, school, 'V1')
+        if not os.path.isdir(v1_folder):
+            continue
+        for file_name in sorted(os.listdir(v1_folder)):
+            if not file_name.endswith('.xlsx') or file_name.startswith('~$'):
+                continue
+            file_path = os.path.join(v1_folder, file_name)
+            try:
+                load_baseline_workbook(file_path, snapshot_dir)
+                count += 1
+            except Exception as e:
+                logging.error(f'Error creating snapshot for {file_path}: {str(e)}')
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Create V1 snapshots for a recompare folder.')
+    parser.add_argument('recompare_folder')
+    parser.add_argument('--snapshot-dir', default=DEFAULT_SNAPSHOT_DIR,
+                        help='snapshot folder (default: snapshots next to this script)')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    print(f'{build_snapshots(args.recompare_folder, args.snapshot_dir)} snapshots up to date in {args.snapshot_dir}')
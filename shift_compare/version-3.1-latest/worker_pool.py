@@ -0,0 +1,290 @@
+import os
+import sys
+import logging
+import contextlib
+import multiprocessing
+from multiprocessing.connection import wait
+
+
+# Worker processes for the subfolders of a recompare folder (--workers), scheduled under
+# a memory budget. openpyxl does not give all the memory of a workbook back once it is
+# done with it, so a long-lived worker keeps growing over a batch. A worker is replaced
+#
+#   after max_files workbooks         like maxtasksperchild, counted in workbooks
+#   when its RSS is above max_rss     read by the worker after each job
+#
+# and a job (one subfolder) only starts while the RSS last reported by the live workers,
+# the estimates of the running jobs and its own estimate stay within memory_budget.
+# Jobs are estimated from the size of their workbooks; a job that does not fit waits
+# for a running one to end, and starts alone when nothing is running.
+#
+# run_jobs() returns the results in job order and raises the exception of a failed job
+# once every job has run, as the future.result() loop over a ProcessPoolExecutor did.
+# iter_jobs() yields each result as soon as its job and every job before it are done,
+# so the caller can write them out while the later jobs run; a failed job raises in its
+# turn. A job whose worker exits under it (killed for memory) fails with WorkerError.
+
+# openpyxl holds a workbook in roughly this many times its xlsx size
+WORKBOOK_MEMORY_FACTOR = 30
+
+# RSS assumed for a worker until it reports its own
+WORKER_START_MEMORY = 100 * 1024 * 1024
+
+WORKBOOK_EXTENSIONS = ('.xlsx', '.xls')
+
+MB = 1024 * 1024
+
+
+class WorkerError(Exception):
+    """Raised when a worker process exits while starting or running a job."""
+    pass
+
+
+def current_rss():
+    """Resident memory of this process in bytes, None where it cannot be read."""
+    if sys.platform == 'win32':
+        import ctypes
+        from ctypes import wintypes
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD),
+                        ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                        ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                        ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t), ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                        ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        get_current_process = ctypes.windll.kernel32.GetCurrentProcess
+        get_current_process.restype = wintypes.HANDLE
+        get_memory_info = ctypes.windll.psapi.GetProcessMemoryInfo
+        get_memory_info.argtypes = [wintypes.HANDLE, ctypes.POINTER(ProcessMemoryCounters), wintypes.DWORD]
+        if not get_memory_info(get_current_process(), ctypes.byref(counters), counters.cb):
+            return None
+        return counters.WorkingSetSize
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def folder_job(args, *folders):
+    """
+    Job (args, memory, files) for the workbooks of V1/V2 folders: the largest workbook of
+    each folder is in memory at once, files is the workbook count of the fullest folder.
+    """
+    memory = 0
+    files = 0
+    for folder in folders:
+        try:
+            sizes = [os.path.getsize(os.path.join(folder, name)) for name in os.listdir(folder)
+                     if name.endswith(WORKBOOK_EXTENSIONS)]
+        except OSError:
+            continue
+        memory += max(sizes, default=0) * WORKBOOK_MEMORY_FACTOR
+        files = max(files, len(sizes))
+    return args, memory, files
+
+
+def worker_main(conn, function, initializer, initargs):
+    """Loop of a worker process: run the (index, args) jobs sent by run_jobs() until None."""
+    if initializer is not None:
+        initializer(*initargs)
+    conn.send(('ready', None, None, current_rss()))
+    while True:
+        job = conn.recv()
+        if job is None:
+            break
+        index, args = job
+        try:
+            result, error = function(*args), None
+        except Exception as e:
+            result, error = None, e
+        try:
+            conn.send(('done', index, (result, error), current_rss()))
+        except Exception as e:
+            # Result or exception that cannot be pickled
+            conn.send(('done', index, (None, WorkerError(f'Job {index + 1} result not sent back: {str(e)}')),
+                       current_rss()))
+    conn.close()
+
+
+class Worker:
+    """A worker process as seen by run_jobs(): its pipe, last RSS and running job."""
+
+    def __init__(self, context, function, initializer, initargs):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=worker_main, args=(child_conn, function, initializer, initargs),
+                                       daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.ready = False
+        self.rss = WORKER_START_MEMORY
+        self.job = None
+        self.files = 0
+
+    def run(self, index, args):
+        self.job = index
+        self.conn.send((index, args))
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join()
+        self.conn.close()
+
+
+def run_jobs(function, jobs, workers, initializer=None, initargs=(), memory_budget=None, max_files=None,
+             max_rss=None):
+    """
+    Run function(*args) for the jobs (args, memory, files) of folder_job() in up to workers
+    processes started with initializer(*initargs). Returns the results in job order.
+    """
+    results = [None] * len(jobs)
+    errors = {}
+    with contextlib.closing(run_scheduled(function, jobs, workers, initializer, initargs, memory_budget,
+                                          max_files, max_rss)) as completed:
+        for index, result, error in completed:
+            results[index] = result
+            if error is not None:
+                errors[index] = error
+
+    for index in range(len(jobs)):
+        if index in errors:
+            raise errors[index]
+    return results
+
+
+def iter_jobs(function, jobs, workers, initializer=None, initargs=(), memory_budget=None, max_files=None,
+              max_rss=None):
+    """
+    Run the jobs like run_jobs() and yield their results in job order, each one as soon
+    as its job and every job before it are done. Only the results of jobs that finished
+    ahead of an earlier one are held back. The exception of a failed job is raised in its
+    turn, and the workers are stopped once their running jobs end.
+    """
+    held = {}
+    next_index = 0
+    with contextlib.closing(run_scheduled(function, jobs, workers, initializer, initargs, memory_budget,
+                                          max_files, max_rss)) as completed:
+        for index, result, error in completed:
+            held[index] = (result, error)
+            while next_index in held:
+                result, error = held.pop(next_index)
+                if error is not None:
+                    raise error
+                yield result
+                next_index += 1
+
+
+def run_scheduled(function, jobs, workers, initializer, initargs, memory_budget, max_files, max_rss):
+    """Scheduler of run_jobs() and iter_jobs(): yields (index, result, error) as each job ends."""
+    context = multiprocessing.get_context()
+    pending = list(range(len(jobs)))
+    live = []
+
+    def next_job(extra):
+        """First pending job that fits in the budget, the first one when nothing is running."""
+        committed = extra + sum(worker.rss for worker in live) + sum(jobs[worker.job][1] for worker in live
+                                                                     if worker.job is not None)
+        for index in pending:
+            if memory_budget is None or committed + jobs[index][1] <= memory_budget:
+                return index
+        if all(worker.job is None for worker in live):
+            logging.warning(f'Job {pending[0] + 1} is estimated at {jobs[pending[0]][1] // MB} MB, '
+                            f'over the memory budget with the workers: running it alone')
+            return pending[0]
+        return None
+
+    def retire(worker, reason):
+        logging.info(f'Replacing worker process {worker.process.pid}: {reason}')
+        live.remove(worker)
+        worker.stop()
+
+    def lost(worker):
+        """Drop a worker that exited; returns the WorkerError of the job it was running, if any."""
+        live.remove(worker)
+        worker.conn.close()
+        worker.process.join()
+        if not worker.ready:
+            raise WorkerError(f'Worker process exited with code {worker.process.exitcode} while starting')
+        if worker.job is not None:
+            return WorkerError(f'Worker process exited with code {worker.process.exitcode} '
+                               f'while running job {worker.job + 1}')
+        return None
+
+    try:
+        while pending or live:
+            # Start what fits: idle workers first, then new ones up to the workers limit
+            while pending:
+                worker = next((worker for worker in live if worker.job is None), None)
+                if worker is None and len(live) >= workers:
+                    break
+                index = next_job(0 if worker is not None else WORKER_START_MEMORY)
+                if index is None:
+                    break
+                if worker is None:
+                    worker = Worker(context, function, initializer, initargs)
+                    live.append(worker)
+                pending.remove(index)
+                worker.run(index, jobs[index][0])
+
+            if not any(worker.job is not None for worker in live):
+                break
+
+            ready = wait([worker.conn for worker in live] + [worker.process.sentinel for worker in live])
+            for worker in list(live):
+                if worker.conn not in ready and worker.process.sentinel not in ready:
+                    continue
+                try:
+                    while worker.conn.poll():
+                        kind, index, outcome, rss = worker.conn.recv()
+                        if rss is not None:
+                            worker.rss = rss
+                        if kind == 'ready':
+                            worker.ready = True
+                            continue
+                        result, error = outcome
+                        worker.job = None
+                        worker.files += jobs[index][2]
+                        yield index, result, error
+                except (EOFError, OSError):
+                    index, error = worker.job, lost(worker)
+                    if error is not None:
+                        yield index, None, error
+                    continue
+                if not worker.process.is_alive():
+                    index, error = worker.job, lost(worker)
+                    if error is not None:
+                        yield index, None, error
+                elif worker.job is None:
+                    if max_files and worker.files >= max_files:
+                        retire(worker, f'{worker.files} workbooks compared')
+                    elif max_rss and worker.rss >= max_rss:
+                        retire(worker, f'RSS {worker.rss // MB} MB')
+    finally:
+        for worker in live:
+            worker.stop()
+
+
+def add_worker_arguments(parser):
+    """Command line options of the run_jobs() limits, read back by worker_limits()."""
+    parser.add_argument('--memory-budget-mb', type=int,
+                        help='with --workers: start a subfolder only while the workers and the running '
+                             'subfolders are estimated to fit in this many MB')
+    parser.add_argument('--max-files-per-worker', type=int,
+                        help='with --workers: replace a worker process after this many workbooks')
+    parser.add_argument('--max-worker-rss-mb', type=int,
+                        help='with --workers: replace a worker process once its RSS is above this many MB')
+
+
+def worker_limits(args):
+    """run_jobs() keyword arguments of the options added by add_worker_arguments()."""
+    return {
+        'memory_budget': args.memory_budget_mb * MB if args.memory_budget_mb else None,
+        'max_files': args.max_files_per_worker or None,
+        'max_rss': args.max_worker_rss_mb * MB if args.max_worker_rss_mb else None,
+    }
@@ -1,828 +1,935 @@
-import os
-import openpyxl
-import sys
-import tkinter as tk
-import logging
-import re
-from datetime import datetime
-from openpyxl.styles import PatternFill
-from tkinter import messagebox, filedialog
-
-
-# Set up logging configuration
-def setup_logging(debug_level):
-    # Create logs directory if it doesn't exist
-    os.makedirs('logs', exist_ok=True)
-    
-    # Create a timestamp for the log file
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    log_file = f'logs/excel_comparison_{timestamp}.log'
-    
-    # Define the logging format
-    log_format = '%(asctime)s - %(levelname)s - %(message)s'
-    
-    # Set up logging level based on debug_level parameter
-    if debug_level == 'DEBUG':
-        logging_level = logging.DEBUG
-    elif debug_level == 'INFO':
-        logging_level = logging.INFO
-    else:
-        logging_level = logging.WARNING
-    
-    # Configure logging
-    logging.basicConfig(
-        level=logging_level,
-        format=log_format,
-        handlers=[
-            logging.FileHandler(log_file, encoding='utf-8'),
-            logging.StreamHandler(sys.stdout)
-        ]
-    )
-    
-    logging.info(f'Logging initialized at level: {debug_level}')
-
-
-def create_root():
-    root = tk.Tk()
-    root.withdraw()
-    return root
-
-def find_timeslot_column(sheet):
-    """Find the column containing '外出時間' and return its index."""
-    for row in sheet.iter_rows(min_row=1, max_row=1):
-        for cell in row:
-            if cell.value and isinstance(cell.value, str) and '外出時間' in cell.value:
-                logging.info(f"Found '外出時間' in column {cell.column_letter}")
-                return cell.column
-    return None
-
-
-def select_directory(root, prompt):
-    logging.debug(f'Showing directory selection dialog with prompt: {prompt}')
-    messagebox.showinfo('情報', prompt)
-    folder_selected = filedialog.askdirectory(title=prompt)
-    if folder_selected:
-        logging.info(f'Selected directory: {folder_selected}')
-    else:
-        logging.warning('No directory selected')
-    return folder_selected
-
-def show_message(title, message):
-    logging.debug(f'Showing message box - Title: {title}, Message: {message}')
-    messagebox.showinfo(title, message)
-
-def normalize_time_format(time_str):
-    """
-    Normalize time string format by removing leading zeros, seconds, and standardizing separators.
-    Examples:
-        "08:00:00" -> "8:00"
-        "8:00" -> "8:00"
-        "09:30:00" -> "9:30"
-    """
-    if not isinstance(time_str, str):
-        time_str = str(time_str)
-    
-    # Remove any seconds portion if it exists
-    if time_str.count(':') == 2:
-        time_str = ':'.join(time_str.split(':')[:2])
-    
-    # Split into hours and minutes
-    if ':' in time_str:
-        hours, minutes = time_str.split(':')
-        # Remove leading zeros from hours
-        hours = str(int(hours))
-        return f"{hours}:{minutes}"
-    
-    return time_str
-
-def normalize_time_range_symbols(time_str):
-    """Normalize time format by removing variations in symbols and ensuring consistent spacing."""
-    return time_str.replace('〜', '~').replace('～', '~').strip()
-
-def format_time_range(time_str):
-    """Standardize time range format to ensure consistent comparison."""
-    time_str = normalize_time_range_symbols(time_str)  # Use the renamed function
-    parts = time_str.split('~')
-    if len(parts) == 2:
-        start_time = normalize_time_format(parts[0].strip())  # Use new normalization
-        end_time = normalize_time_format(parts[1].strip())    # Use new normalization
-        return f"{start_time}~{end_time}"
-    return time_str
-
-def compare_time_parts(time1, time2):
-    """Compare two time strings by removing leading zeros from hours."""
-    if ':' not in time1 or ':' not in time2:
-        return time1 == time2
-    
-    hour1, minute1 = time1.split(':')
-    hour2, minute2 = time2.split(':')
-    
-    # Remove leading zeros for comparison
-    hour1 = str(int(hour1))
-    hour2 = str(int(hour2))
-    
-    return hour1 == hour2 and minute1 == minute2
-
-def is_datetime_string(value):
-    """Check if a string represents a datetime."""
-    if not isinstance(value, str):
-        return False
-    
-    # Common datetime patterns in Excel
-    patterns = [
-        '%Y/%m/%d %H:%M:%S',
-        '%Y/%m/%d %H:%M:%S 午前',
-        '%Y/%m/%d %H:%M:%S 午後',
-        '%Y/%m/%d %H:%M',
-        '%Y/%m/%d %H:%M 午前',
-        '%Y/%m/%d %H:%M 午後',
-        '%Y/%m/%d'
-    ]
-    
-    for pattern in patterns:
-        try:
-            datetime.strptime(value, pattern)
-            return True
-        except ValueError:
-            continue
-    return False
-
-def extract_date_part(value):
-    """Extract just the date part from a datetime string or object."""
-    if isinstance(value, datetime):
-        return value.strftime('%Y/%m/%d')
-    
-    if not isinstance(value, str):
-        return value
-        
-    # Try to extract date from string
-    patterns = [
-        '%Y-%m-%d %H:%M:%S',  # Added hyphen format
-        '%Y/%m/%d %H:%M:%S',
-        '%Y/%m/%d %H:%M:%S 午前',
-        '%Y/%m/%d %H:%M:%S 午後',
-        '%Y/%m/%d %H:%M',
-        '%Y/%m/%d %H:%M 午前',
-        '%Y/%m/%d %H:%M 午後',
-        '%Y/%m/%d',
-        '%Y-%m-%d'  # Added hyphen format without time
-    ]
-    
-    for pattern in patterns:
-        try:
-            dt = datetime.strptime(value, pattern)
-            return dt.strftime('%Y/%m/%d')
-        except ValueError:
-            continue
-            
-    # If no pattern matches, try to extract date using regex
-    date_pattern = r'(\d{4})[-/](\d{1,2})[-/](\d{1,2})'
-    match = re.search(date_pattern, str(value))
-    if match:
-        year, month, day = match.groups()
-        try:
-            return f"{year}/{int(month):02d}/{int(day):02d}"
-        except ValueError:
-            pass
-            
-    return value
-
-def is_time_string(value):
-    """Check if a string represents a time value."""
-    if not isinstance(value, str):
-        return False
-    
-    # Normalize the value first
-    value = normalize_time_format(value)
-    
-    # Remove common time separators and spaces
-    value = value.replace(':', '').replace('：', '').strip()
-    
-    # Check if it's a 3 or 4 digit number (e.g., 830 or 1430)
-    if value.isdigit() and (len(value) == 3 or len(value) == 4):
-        # Extract hours and minutes
-        if len(value) == 3:
-            hours = int(value[0])
-            minutes = int(value[1:])
-        else:
-            hours = int(value[:2])
-            minutes = int(value[2:])
-        
-        # Validate hours and minutes
-        return 0 <= hours <= 23 and 0 <= minutes <= 59
-    
-    return False
-
-def normalize_time_format(time_str):
-    """
-    Normalize time string format by removing leading zeros, seconds, and standardizing separators.
-    Examples:
-        "08:00:00" -> "8:00"
-        "8:00" -> "8:00"
-        "09:30:00" -> "9:30"
-    """
-    if not isinstance(time_str, str):
-        time_str = str(time_str)
-    
-    # Remove any seconds portion if it exists
-    if time_str.count(':') == 2:
-        time_str = ':'.join(time_str.split(':')[:2])
-    
-    # Split into hours and minutes
-    if ':' in time_str:
-        hours, minutes = time_str.split(':')
-        # Remove leading zeros from hours
-        hours = str(int(hours))
-        return f"{hours}:{minutes}"
-    
-    return time_str
-        
-def get_comparison_columns(col, sheet_name):
-    """
-    Get the corresponding column numbers for comparison between sheets.
-    
-    Args:
-        col (int): Original column number
-        sheet_name (str): Name of the sheet
-    
-    Returns:
-        tuple: (col1, col2) where col1 is for sheet1 and col2 is for sheet2
-        None if the column should be skipped
-    """
-    # For sheets containing "勤務表" in their names
-    if "シフト" in sheet_name:
-        if col < 39:
-            return (col, col)
-        else:
-            return None
-        
-def get_mapped_column(original_col, is_sheet1=True):
-    """
-    Map column numbers according to the specified rules.
-    
-    Args:
-        original_col (int): Original column number
-        is_sheet1 (bool): True if mapping for sheet1, False for sheet2
-    
-    Returns:
-        int: Mapped column number
-    """
-    if is_sheet1:
-        # Sheet1: Use original column numbers
-        return original_col
-    else:
-        # Sheet2:
-        # If column < 13: Use same column number
-        # If column >= 13: Add 1 to column number
-        if original_col < 13:
-            return original_col
-        else:
-            return original_col + 1
-
-def extract_sheet_name_string(sheet_name):
-    """
-    Extract meaningful part of the sheet name by removing leading digits and symbols
-    (like dot or underscore) but retaining the rest of the original name structure.
-    """
-    # Remove leading numbers and symbols (e.g., '1.', '2_', etc.)
-    cleaned_name = re.sub(r'^[\d._\-]+', '', sheet_name)
-    # Return the remaining name as it is (does not strip anything further)
-    return cleaned_name
-
-def compare_time_values(time1, time2):
-    """
-    Compare two time values accounting for different formats.
-    Handles cases like "08:00:00" vs "8:00" as equal.
-    """
-    # Convert both values to strings and normalize
-    time1 = normalize_time_format(str(time1).strip())
-    time2 = normalize_time_format(str(time2).strip())
-    
-    # If either isn't a valid time string, they're not equal
-    if not (is_time_string(time1) and is_time_string(time2)):
-        return False
-    
-    # Compare the normalized strings
-    return time1 == time2
-
-def compare_excel_files(file1_path, file2_path):
-    """Compare two Excel files and return comparison result and modified workbook."""
-    logging.info(f'Starting comparison of files:\n  File 1: {file1_path}\n  File 2: {file2_path}')
-    """ actual file name should be passed to the function """
-    file_name = file1_path.split('/')[-1]
-    
-    reports = []
-
-    try:
-        # Load the Excel files
-        logging.debug('Loading workbooks')
-        wb1 = openpyxl.load_workbook(file1_path)
-        wb2 = openpyxl.load_workbook(file2_path)
-        
-        # Initialize variables
-        
-        fill_pattern_yellow = PatternFill(patternType="solid", fgColor='FFFF00')
-        
-        # Get visible sheets and their string-only names
-        visible_sheets1 = [(sheet.title, extract_sheet_name_string(sheet.title)) 
-                          for sheet in wb1.worksheets 
-                          if sheet.sheet_state == 'visible']
-        
-        visible_sheets2 = [(sheet.title, extract_sheet_name_string(sheet.title)) 
-                          for sheet in wb2.worksheets 
-                          if sheet.sheet_state == 'visible']
-        
-        # Log visible sheets from both workbooks
-        logging.info("Visible sheets in V1:")
-        for original, string_only in visible_sheets1:
-            logging.info(f"  - Original: {original} -> String only: {string_only}")
-            
-        logging.info("Visible sheets in V2:")
-        for original, string_only in visible_sheets2:
-            logging.info(f"  - Original: {original} -> String only: {string_only}")
-        
-        # Create dictionaries to map string-only names to original names
-        sheets1_dict = {string: orig for orig, string in visible_sheets1}
-        sheets2_dict = {string: orig for orig, string in visible_sheets2}
-        
-        # Find matching string-only names
-        common_string_names = set(sheets1_dict.keys()) & set(sheets2_dict.keys())
-        
-        if not common_string_names:
-            logging.warning('No matching sheet names found between the workbooks')
-            show_message("警告", "両方のExcelファイルに同じ名前のシートが見つかりません。")
-            return 'X', wb2
-            
-        # Compare each matching sheet
-        for string_name in common_string_names:
-            
-            sheet_report = []
-            mismatch_found = 0
-            sheet_name1 = sheets1_dict[string_name]
-            sheet_name2 = sheets2_dict[string_name]
-            
-            logging.info(f'\nComparing sheets: {sheet_name1} <-> {sheet_name2}')
-            
-            sheet1 = wb1[sheet_name1]
-            sheet2 = wb2[sheet_name2]
-            
-            # Get maximum dimensions for comparison
-            row_max = max(sheet1.max_row, sheet2.max_row)
-            col_max = max(sheet1.max_column, sheet2.max_column)
-            logging.debug(f'Sheet dimensions: {row_max} rows x {col_max} columns')
-            
-            # Find timeslot column if it exists
-            timeslot_col = find_timeslot_column(sheet1)
-
-            # Create dictionary to store Column E values and their row numbers
-            wb1_col_e = {}
-            wb2_col_e = {}
-
-            # Map Column E values for wb1 (column 5 = E)
-            for row in range(6, sheet1.max_row + 1):
-                value = normalize_value(sheet1.cell(row, 5).value)
-                if value is not None:
-                    wb1_col_e[value] = row
-
-            # Compare cells
-            for row2 in range(6, row_max + 1):
-                try:
-                    value = normalize_value(sheet2.cell(row2, 5).value)
-                    if value is None:
-                        continue
-
-                    if value in wb1_col_e:
-                        row1 = wb1_col_e[value]
-                        logging.debug(f'Found match: wb1 row {row1} matches wb2 row {row2}')
-                        
-                        # Remove the matched value from wb1_col_e 
-                        del wb1_col_e[value]
-
-                        for col in range(3, col_max + 1):
-                            try:
-                                # Get comparison columns
-                                comparison_cols = get_comparison_columns(col, file_name)
-                                
-                                if comparison_cols is None:
-                                    continue  # Skip this column
-                                    
-                                col1, col2 = comparison_cols
-                                value1 = sheet1.cell(row1, col1).value
-                                value2 = sheet2.cell(row2, col2).value
-
-                                logging.debug(f'Comparing cell wb1({row1}, {col1}) with wb2({row2}, {col2})')
-                                logging.debug(f'Value1: {value1}, Value2: {value2}')
-
-                                # Normalize values
-                                value1 = normalize_value(value1)
-                                value2 = normalize_value(value2)
-
-                                # Handle None values
-                                if value1 is None and value2 is None:
-                                    continue
-                                if value1 is None or value2 is None:
-                                    sheet2.cell(row2, col2).fill = fill_pattern_yellow
-                                    mismatch_found += 1
-                                    logging.debug(f'Value mismatch at ({row2}, {col2}): {value1} vs {value2}')
-                                    continue
-
-                                # Convert to string and strip whitespace if not datetime object
-                                if not isinstance(value1, datetime):
-                                    value1 = str(value1).strip()
-                                if not isinstance(value2, datetime):
-                                    value2 = str(value2).strip()
-
-                                # Check if either value is a datetime
-                                is_datetime1 = isinstance(value1, datetime) or is_datetime_string(value1)
-                                is_datetime2 = isinstance(value2, datetime) or is_datetime_string(value2)
-
-                                if is_datetime1 or is_datetime2:
-                                    date1 = extract_date_part(value1)
-                                    date2 = extract_date_part(value2)
-                                    
-                                    if date1 != date2:
-                                        sheet_report.append({
-                                            "row1": row1,
-                                            "col1": col1,
-                                            "val1": value1,
-                                            "row2": row2,
-                                            "col2": col2,
-                                            "val2": value2
-                                        })
-                                        # sheet2.cell(row2, col2).fill = fill_pattern_yellow
-                                        mismatch_found += 1
-                                        logging.debug(f'Date mismatch at ({row2}, {col2}): {date1} vs {date2}')
-                                    continue
-
-                                # Check if either value is a time string
-                                is_time1 = is_time_string(str(value1))
-                                is_time2 = is_time_string(str(value2))
-
-                                if is_time1 or is_time2:
-                                    if not compare_time_values(value1, value2):
-                                        sheet_report.append({
-                                            "row1": row1,
-                                            "col1": col1,
-                                            "val1": value1,
-                                            "row2": row2,
-                                            "col2": col2,
-                                            "val2": value2
-                                        })
-                                        # sheet2.cell(row2, col2).fill = fill_pattern_yellow
-                                        mismatch_found += 1
-                                        logging.debug(f'Time mismatch at ({row2}, {col2}): {value1} vs {value2}')
-                                    continue
-
-                                # Handle time range comparison
-                                if any(separator in str(value1) or separator in str(value2) 
-                                    for separator in ['〜', '～', '~']):
-                                        time1_parts = format_time_range(str(value1)).split('~')
-                                        time2_parts = format_time_range(str(value2)).split('~')
-                                    
-                                        if len(time1_parts) == 2 and len(time2_parts) == 2:
-                                            start_match = compare_time_parts(time1_parts[0], time2_parts[0])
-                                            end_match = compare_time_parts(time1_parts[1], time2_parts[1])
-                                            
-                                            if not (start_match and end_match):
-                                                sheet_report.append({
-                                                    "row1": row1,
-                                                    "col1": col1,
-                                                    "val1": value1,
-                                                    "row2": row2,
-                                                    "col2": col2,
-                                                    "val2": value2
-                                                })
-                                                # sheet2.cell(row2, col2).fill = fill_pattern_yellow
-                                                mismatch_found += 1
-                                                logging.debug(f'Time range mismatch at ({row2}, {col2}): {value1} vs {value2}')
-                                            continue
-
-                                # For all other values, compare as strings
-                                if str(value1) != str(value2):
-                                    if not is_ignored_mismatch(value1, value2):
-                                        sheet_report.append({
-                                            "row1": row1,
-                                            "col1": col1,
-                                            "val1": value1,
-                                            "row2": row2,
-                                            "col2": col2,
-                                            "val2": value2
-                                        })
-                                        # sheet2.cell(row2, col2).fill = fill_pattern_yellow
-                                        mismatch_found += 1
-                                        logging.debug(f'Value mismatch at ({row2}, {col2}): {value1} vs {value2}')
-                                    
-                            except Exception as e:
-                                logging.error(f'Error comparing cell ({row2}, {col2}): {str(e)}')
-                                # mismatch_found += 1
-                                continue
-            
-                except Exception as e:
-                    logging.error(f'Error processing row {row2}: {str(e)}')
-                    continue
-        
-        if sheet_report:
-            reports.append({
-                "sheet_name": string_name,
-                "sheet_report": sheet_report,
-                "mismatch_found": mismatch_found
-            })
-        
-        # Determine final result
-        # result = 'X' if mismatch_found > 0 else 'O'
-        # logging.info(f'Comparison completed. Result: {result} (mismatches: {mismatch_found})')
-        # return result, wb2
-        return reports
-        
-    except Exception as e:
-        logging.error(f'Error during comparison: {str(e)}', exc_info=True)
-        raise
-
-def normalize_value(value):
-    """Normalize values to handle numeric equivalence, time formats, blank/None equivalence, and remove special characters."""
-    # Handle None values and empty strings
-    if value is None or (isinstance(value, str) and value.strip() == ""):
-        return None
-    
-    # If it's already a datetime object, return it
-    if isinstance(value, datetime):
-        return value
-    
-    # Convert to string and strip whitespace and quotation marks
-    if not isinstance(value, str):
-        # Handle float values - convert to int if it's a whole number
-        if isinstance(value, float) and value.is_integer():
-            value = int(value)
-    
-    # Convert to string and normalize
-    value = str(value)
-    
-    # Remove special characters and normalize whitespace
-    value = value.replace("_x000D_", "")  # Remove Excel carriage return
-    value = value.replace("\r", "")       # Remove carriage return
-    value = value.replace("\n", "")       # Remove line feed
-    value = value.replace('"', '')        # Remove double quotes
-    value = value.replace('"', '')        # Remove smart quotes (opening)
-    value = value.replace('"', '')        # Remove smart quotes (closing)
-    value = ' '.join(value.split())       # Normalize whitespace
-    value = value.strip()                 # Remove leading/trailing whitespace
-    
-    # If after cleaning the string is empty, return None
-    if value == "":
-        return None
-    
-    # List of patterns to be normalized to None
-    normalize_patterns = [None, "0", "0:00", "00:00:00", "12:00:00午前"]
-    
-    if value in normalize_patterns:
-        return None
-        
-    # Try parsing as datetime with multiple formats
-    datetime_patterns = [
-        '%Y-%m-%d %H:%M:%S',
-        '%Y/%m/%d %H:%M:%S',
-        '%Y-%m-%d',
-        '%Y/%m/%d'
-    ]
-    
-    for pattern in datetime_patterns:
-        try:
-            return datetime.strptime(value, pattern)
-        except ValueError:
-            continue
-    
-    # If it's a numeric string (like "1.0" or "1")
-    try:
-        num = float(value)
-        if num.is_integer():
-            return str(int(num))
-    except ValueError:
-        pass
-        
-    return value
-
-def compare_datetime_values(value1, value2):
-    """Compare two datetime values, handling various formats."""
-    try:
-        # First normalize both values
-        norm1 = normalize_value(value1)
-        norm2 = normalize_value(value2)
-        
-        # If both are datetime objects, compare them directly
-        if isinstance(norm1, datetime) and isinstance(norm2, datetime):
-            return norm1.date() == norm2.date()
-            
-        # If they're strings, compare the date parts
-        date1 = extract_date_part(norm1)
-        date2 = extract_date_part(norm2)
-        
-        return date1 == date2
-    except Exception as e:
-        logging.error(f"Error comparing datetime values: {value1} vs {value2} - {str(e)}")
-        return False
-
-def is_ignored_mismatch(value1, value2):
-
-    """Check if the mismatch between value1 and value2 should be ignored."""
-    # List of terms to ignore
-    ignored_values = [
-        "有給", "振替", "特別", "欠勤", "病気", "介護", "育児", "看護", "公休","その他"
-    ]
-
-    # Check if either value1 or value2 is in the ignored values list
-    if value1 in ignored_values or value2 in ignored_values:
-        return True
-
-    """Check if the mismatch between value1 and value2 should be ignored."""
-    same_pairs = [
-        ("休み", "シフト時間コード-1"),
-        ("長期休", "シフト時間コード-1"),
-        ("フリー", "シフト時間コード2147483647")
-        # Add other ignored pairs if needed
-    ]
-    return (value1, value2) in same_pairs or (value2, value1) in same_pairs
-
-def generate_report(all_reports):
-    """Generate a markdown report of comparison results organized by school ID and workbook."""
-    
-    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    
-    report_lines = [
-        "# Excel Comparison Report",
-        f"**Generated on:** {timestamp}",
-        ""
-    ]
-    
-    if not all_reports:
-        report_lines.append("## No mismatches found")
-        report_lines.append("No differences were detected during the comparison.")
-        report_path = save_report(report_lines)
-        print(f"Report generated at: {report_path}")
-        return report_path
-    
-    for school_report in all_reports:
-        for school_id, file_reports in school_report.items():
-            report_lines.append(f"## School ID: {school_id}")
-            report_lines.append("")
-            
-            for file_report in file_reports:
-                workbook_name = list(file_report.keys())[0]
-                report_lines.append(f"### Workbook: {workbook_name}")
-                report_lines.append("")
-                report_lines.append("| Sheet Name | Count | V1 Row | V1 Col | V1 Value | V2 Row | V2 Col | V2 Value |")
-                report_lines.append("|------------|-------|--------|--------|----------|--------|--------|----------|")
-                
-                sheets = file_report[workbook_name]
-                current_sheet = None
-                
-                for sheet_report in sheets:
-                    sheet_name = sheet_report["sheet_name"]
-                    mismatches = sheet_report["sheet_report"]
-                    mismatch_count = sheet_report["mismatch_found"]
-                    
-                    if mismatch_count == 0:
-                        report_lines.append(f"| {sheet_name} | {mismatch_count} | - | - | No mismatches | - | - | - |")
-                        continue
-                        
-                    for mismatch in mismatches:
-                        if sheet_name != current_sheet:
-                            if current_sheet is not None:
-                                report_lines.append("| | | | | | | | |")
-                            current_sheet = sheet_name
-                            report_lines.append(
-                                f"| {sheet_name} | {mismatch_count} | {mismatch['row1']} | {mismatch['col1']} | "
-                                f"{mismatch['val1']} | {mismatch['row2']} | {mismatch['col2']} | "
-                                f"{mismatch['val2']} |"
-                            )
-                        else:
-                            report_lines.append(
-                                f"| | | {mismatch['row1']} | {mismatch['col1']} | "
-                                f"{mismatch['val1']} | {mismatch['row2']} | {mismatch['col2']} | "
-                                f"{mismatch['val2']} |"
-                            )
-                
-                report_lines.append("")  # Extra newline between workbooks
-    
-    save_report(report_lines)
-
-def save_report(report_lines):
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    report_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), f"{timestamp}_comparison_report.md")
-    with open(report_path, 'w', encoding='utf-8') as f:
-        f.write('\n'.join(report_lines))
-    return report_path
-  
-def process_folder(recompare_folder):
-    """Process all subfolders in recompare directory"""
-    try:
-        all_reports = []
-        # Get all subfolders in recompare directory
-        subfolders = [f for f in os.listdir(recompare_folder) 
-                     if os.path.isdir(os.path.join(recompare_folder, f))]
-        
-        logging.info(f'Found {len(subfolders)} subfolders to process')
-        
-        for subfolder in subfolders:
-            subfolder_path = os.path.join(recompare_folder, subfolder)
-            v1_path = os.path.join(subfolder_path, 'V1')
-            v2_path = os.path.join(subfolder_path, 'V2')
-            result_path = os.path.join(subfolder_path, 'result')
-            
-            # Check if required folders exist
-            if not all(os.path.exists(p) for p in [v1_path, v2_path]):
-                logging.warning(f'Skipping {subfolder}: V1 or V2 folder missing')
-                continue
-                
-            # Create result folder if it doesn't exist
-            os.makedirs(result_path, exist_ok=True)
-            logging.info(f'Processing subfolder: {subfolder}')
-            
-            # Get Excel files from V1
-            files_v1 = [f for f in os.listdir(v1_path) 
-                       if f.endswith(('.xlsx', '.xls'))]
-            
-            school_report = []
-            
-            # Process each file
-            for file_name in files_v1:
-                base_name = os.path.splitext(file_name)[0]
-                file_v2 = f"{base_name}.xlsx"  # Assuming same name in V2
-                
-                v1_file_path = os.path.join(v1_path, file_name)
-                v2_file_path = os.path.join(v2_path, file_v2)
-                
-                if not os.path.exists(v2_file_path):
-                    logging.warning(f'No matching V2 file for {file_name}')
-                    continue
-                    
-                logging.info(f'\nComparing:\nV1: {file_name}\nV2: {file_v2}')
-                
-                try:
-                    # Compare files and get result
-                    # result, modified_wb = compare_excel_files(v1_file_path, v2_file_path)
-                    reports  = compare_excel_files(v1_file_path, v2_file_path)
-                    # Save result
-                    # output_filename = f"{result}_{base_name}.xlsx"
-                    # output_path = os.path.join(result_path, output_filename)
-                    
-                    # logging.info(f'Saving result to: {output_path}')
-                    # modified_wb.save(output_path)
-                    
-                    if reports:
-                        school_report.append({file_name: reports})
-                    
-                except Exception as e:
-                    logging.error(f'Error processing {file_name}: {str(e)}')
-                    continue
-                  
-            all_reports.append({subfolder: school_report})
-        
-        if all_reports:
-            generate_report(all_reports)
-        else:
-            logging.warning('No reports found')
-                    
-        return True
-        
-    except Exception as e:
-        logging.error(f'Error in process_folder: {str(e)}', exc_info=True)
-        return False
-
-def main():
-    # Initialize logging
-    setup_logging('DEBUG')
-    logging.info('Starting Excel comparison program')
-    
-    try:
-        # Create root window
-        root = create_root()
-        
-        # Select recompare folder
-        recompare_folder = select_directory(root, "recompareフォルダーを選択してください")
-        if not recompare_folder:
-            logging.warning('Folder selection cancelled')
-            show_message("フォルダー選択", "フォルダーが選択されていません。終了します...")
-            return
-            
-        logging.info(f'Selected recompare folder: {recompare_folder}')
-        show_message("比較を開始します", "比較プロセスを開始しています....")
-        
-        # Process all subfolders
-        success = process_folder(recompare_folder)
-        
-        if success:
-            logging.info('Comparison process completed successfully')
-            show_message("比較が完了しました", "比較プロセスが完了しました.")
-        else:
-            show_message("エラー", "処理中にエラーが発生しました。ログを確認してください。")
-            
-    except Exception as e:
-        logging.error(f'Unexpected error: {str(e)}', exc_info=True)
-        messagebox.showerror("エラーが発生しました", f"予期しないエラーが発生しました: {str(e)}")
-    finally:
-        logging.info('Program finished')
-        if root:
-            root.destroy()
-
-if __name__ == "__main__":
+import os
+import openpyxl
+import sys
+import logging
+import re
+import argparse
+from datetime import datetime
+from openpyxl.styles import PatternFill
+
+from report_sink import MarkdownSink, MultiSink, open_report_sink, write_school, SINKS
+from report_db import SqliteSink
+from report_delta import write_db_delta
+from report_patterns import PatternSink
+from rule_set import load_rules
+from raw_loader import open_workbook
+from sheet_grid import ValueTable, GridWorkbook
+from column_profile import SheetProfiles, KIND_DATE, KIND_TEXT
+from fast_normalize import is_date_value, same_date
+from verdict_cache import VerdictCache, file_signature, MISSING
+from worker_pool import iter_jobs, folder_job, add_worker_arguments, worker_limits
+
+# tkinter is imported only on the GUI path, so the batch mode (run_cli) also runs
+# where no display is available. HEADLESS sends show_message() to the log instead.
+HEADLESS = False
+
+# Ignored pairs, equivalence prefixes and skip markers, compiled from rules.json next to this script
+RULES = load_rules(__file__)
+
+# Verdicts of the value rules per value pair, shared by all sheets and files of the process
+# (signed with the files the verdicts are computed by: this script, rules.json and the
+# modules compare_values() calls into)
+VERDICTS = VerdictCache(file_signature(__file__, RULES.path, *(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), name)
+    for name in ('rule_set.py', 'column_profile.py', 'fast_normalize.py'))))
+
+
+# Memory budget and recycling of the worker processes (iter_jobs() keyword arguments,
+# set from the command line)
+WORKER_LIMITS = {}
+
+
+# Set up logging configuration
+def setup_logging(debug_level, log_file=None):
+    # Create logs directory if it doesn't exist
+    os.makedirs('logs', exist_ok=True)
+    
+    # Create a timestamp for the log file (worker processes pass the main process log file)
+    if log_file is None:
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        log_file = f'logs/excel_comparison_{timestamp}.log'
+    
+    # Define the logging format
+    log_format = '%(asctime)s - %(levelname)s - %(message)s'
+    
+    # Set up logging level based on debug_level parameter
+    if debug_level == 'DEBUG':
+        logging_level = logging.DEBUG
+    elif debug_level == 'INFO':
+        logging_level = logging.INFO
+    else:
+        logging_level = logging.WARNING
+    
+    # Configure logging
+    logging.basicConfig(
+        level=logging_level,
+        format=log_format,
+        handlers=[
+            logging.FileHandler(log_file, encoding='utf-8'),
+            logging.StreamHandler(sys.stdout)
+        ]
+    )
+    
+    logging.info(f'Logging initialized at level: {debug_level}')
+
+
+def create_root():
+    import tkinter as tk
+    root = tk.Tk()
+    root.withdraw()
+    return root
+
+def find_timeslot_column(sheet):
+    """Find the column containing '外出時間' and return its index."""
+    for row in sheet.iter_rows(min_row=1, max_row=1):
+        for cell in row:
+            if cell.value and isinstance(cell.value, str) and '外出時間' in cell.value:
+                logging.info(f"Found '外出時間' in column {cell.column_letter}")
+                return cell.column
+    return None
+
+
+def select_directory(root, prompt):
+    from tkinter import messagebox, filedialog
+    logging.debug(f'Showing directory selection dialog with prompt: {prompt}')
+    messagebox.showinfo('情報', prompt)
+    folder_selected = filedialog.askdirectory(title=prompt)
+    if folder_selected:
+        logging.info(f'Selected directory: {folder_selected}')
+    else:
+        logging.warning('No directory selected')
+    return folder_selected
+
+def show_message(title, message):
+    if HEADLESS:
+        logging.info(f'{title}: {message}')
+        return
+    from tkinter import messagebox
+    logging.debug(f'Showing message box - Title: {title}, Message: {message}')
+    messagebox.showinfo(title, message)
+
+def normalize_time_format(time_str):
+    """
+    Normalize time string format by removing leading zeros, seconds, and standardizing separators.
+    Examples:
+        "08:00:00" -> "8:00"
+        "8:00" -> "8:00"
+        "09:30:00" -> "9:30"
+    """
+    if not isinstance(time_str, str):
+        time_str = str(time_str)
+    
+    # Remove any seconds portion if it exists
+    if time_str.count(':') == 2:
+        time_str = ':'.join(time_str.split(':')[:2])
+    
+    # Split into hours and minutes
+    if ':' in time_str:
+        hours, minutes = time_str.split(':')
+        # Remove leading zeros from hours
+        hours = str(int(hours))
+        return f"{hours}:{minutes}"
+    
+    return time_str
+
+def normalize_time_range_symbols(time_str):
+    """Normalize time format by removing variations in symbols and ensuring consistent spacing."""
+    return time_str.replace('〜', '~').replace('～', '~').strip()
+
+def format_time_range(time_str):
+    """Standardize time range format to ensure consistent comparison."""
+    time_str = normalize_time_range_symbols(time_str)  # Use the renamed function
+    parts = time_str.split('~')
+    if len(parts) == 2:
+        start_time = normalize_time_format(parts[0].strip())  # Use new normalization
+        end_time = normalize_time_format(parts[1].strip())    # Use new normalization
+        return f"{start_time}~{end_time}"
+    return time_str
+
+def compare_time_parts(time1, time2):
+    """Compare two time strings by removing leading zeros from hours."""
+    if ':' not in time1 or ':' not in time2:
+        return time1 == time2
+    
+    hour1, minute1 = time1.split(':')
+    hour2, minute2 = time2.split(':')
+    
+    # Remove leading zeros for comparison
+    hour1 = str(int(hour1))
+    hour2 = str(int(hour2))
+    
+    return hour1 == hour2 and minute1 == minute2
+
+def is_datetime_string(value):
+    """Check if a string represents a datetime."""
+    if not isinstance(value, str):
+        return False
+    
+    # Common datetime patterns in Excel
+    patterns = [
+        '%Y/%m/%d %H:%M:%S',
+        '%Y/%m/%d %H:%M:%S 午前',
+        '%Y/%m/%d %H:%M:%S 午後',
+        '%Y/%m/%d %H:%M',
+        '%Y/%m/%d %H:%M 午前',
+        '%Y/%m/%d %H:%M 午後',
+        '%Y/%m/%d'
+    ]
+    
+    for pattern in patterns:
+        try:
+            datetime.strptime(value, pattern)
+            return True
+        except ValueError:
+            continue
+    return False
+
+def extract_date_part(value):
+    """Extract just the date part from a datetime string or object."""
+    if isinstance(value, datetime):
+        return value.strftime('%Y/%m/%d')
+    
+    if not isinstance(value, str):
+        return value
+        
+    # Try to extract date from string
+    patterns = [
+        '%Y-%m-%d %H:%M:%S',  # Added hyphen format
+        '%Y/%m/%d %H:%M:%S',
+        '%Y/%m/%d %H:%M:%S 午前',
+        '%Y/%m/%d %H:%M:%S 午後',
+        '%Y/%m/%d %H:%M',
+        '%Y/%m/%d %H:%M 午前',
+        '%Y/%m/%d %H:%M 午後',
+        '%Y/%m/%d',
+        '%Y-%m-%d'  # Added hyphen format without time
+    ]
+    
+    for pattern in patterns:
+        try:
+            dt = datetime.strptime(value, pattern)
+            return dt.strftime('%Y/%m/%d')
+        except ValueError:
+            continue
+            
+    # If no pattern matches, try to extract date using regex
+    date_pattern = r'(\d{4})[-/](\d{1,2})[-/](\d{1,2})'
+    match = re.search(date_pattern, str(value))
+    if match:
+        year, month, day = match.groups()
+        try:
+            return f"{year}/{int(month):02d}/{int(day):02d}"
+        except ValueError:
+            pass
+            
+    return value
+
+def is_time_string(value):
+    """Check if a string represents a time value."""
+    if not isinstance(value, str):
+        return False
+    
+    # Normalize the value first
+    value = normalize_time_format(value)
+    
+    # Remove common time separators and spaces
+    value = value.replace(':', '').replace('：', '').strip()
+    
+    # Check if it's a 3 or 4 digit number (e.g., 830 or 1430)
+    if value.isdigit() and (len(value) == 3 or len(value) == 4):
+        # Extract hours and minutes
+        if len(value) == 3:
+            hours = int(value[0])
+            minutes = int(value[1:])
+        else:
+            hours = int(value[:2])
+            minutes = int(value[2:])
+        
+        # Validate hours and minutes
+        return 0 <= hours <= 23 and 0 <= minutes <= 59
+    
+    return False
+
+def normalize_time_format(time_str):
+    """
+    Normalize time string format by removing leading zeros, seconds, and standardizing separators.
+    Examples:
+        "08:00:00" -> "8:00"
+        "8:00" -> "8:00"
+        "09:30:00" -> "9:30"
+    """
+    if not isinstance(time_str, str):
+        time_str = str(time_str)
+    
+    # Remove any seconds portion if it exists
+    if time_str.count(':') == 2:
+        time_str = ':'.join(time_str.split(':')[:2])
+    
+    # Split into hours and minutes
+    if ':' in time_str:
+        hours, minutes = time_str.split(':')
+        # Remove leading zeros from hours
+        hours = str(int(hours))
+        return f"{hours}:{minutes}"
+    
+    return time_str
+        
+def get_comparison_columns(col, sheet_name):
+    """
+    Get the corresponding column numbers for comparison between sheets.
+    
+    Args:
+        col (int): Original column number
+        sheet_name (str): Name of the sheet
+    
+    Returns:
+        tuple: (col1, col2) where col1 is for sheet1 and col2 is for sheet2
+        None if the column should be skipped
+    """
+    # For sheets containing "勤務表" in their names
+    if "シフト" in sheet_name:
+        if col < 39:
+            return (col, col)
+        else:
+            return None
+        
+def get_mapped_column(original_col, is_sheet1=True):
+    """
+    Map column numbers according to the specified rules.
+    
+    Args:
+        original_col (int): Original column number
+        is_sheet1 (bool): True if mapping for sheet1, False for sheet2
+    
+    Returns:
+        int: Mapped column number
+    """
+    if is_sheet1:
+        # Sheet1: Use original column numbers
+        return original_col
+    else:
+        # Sheet2:
+        # If column < 13: Use same column number
+        # If column >= 13: Add 1 to column number
+        if original_col < 13:
+            return original_col
+        else:
+            return original_col + 1
+
+def extract_sheet_name_string(sheet_name):
+    """
+    Extract meaningful part of the sheet name by removing leading digits and symbols
+    (like dot or underscore) but retaining the rest of the original name structure.
+    """
+    # Remove leading numbers and symbols (e.g., '1.', '2_', etc.)
+    cleaned_name = re.sub(r'^[\d._\-]+', '', sheet_name)
+    # Return the remaining name as it is (does not strip anything further)
+    return cleaned_name
+
+def compare_time_values(time1, time2):
+    """
+    Compare two time values accounting for different formats.
+    Handles cases like "08:00:00" vs "8:00" as equal.
+    """
+    # Convert both values to strings and normalize
+    time1 = normalize_time_format(str(time1).strip())
+    time2 = normalize_time_format(str(time2).strip())
+    
+    # If either isn't a valid time string, they're not equal
+    if not (is_time_string(time1) and is_time_string(time2)):
+        return False
+    
+    # Compare the normalized strings
+    return time1 == time2
+
+def compare_excel_files(file1_path, file2_path, on_sheet=None):
+    """
+    Compare two Excel files and return the sheet reports.
+    With on_sheet, each sheet with mismatches is passed to on_sheet(sheet_name, mismatches, count)
+    as soon as it is compared instead of being collected.
+    """
+    logging.info(f'Starting comparison of files:\n  File 1: {file1_path}\n  File 2: {file2_path}')
+    """ actual file name should be passed to the function """
+    file_name = file1_path.split('/')[-1]
+    
+    reports = []
+
+    try:
+        # Load the Excel files
+        logging.debug('Loading workbooks')
+        table = ValueTable()
+        wb1 = open_workbook(file1_path, table=table)
+        wb2 = open_workbook(file2_path, table=table)
+
+        # V1 and V2 values share one table, so cells holding the same value have the same id.
+        # Ids whose value was found equal to itself by the rules below (None to start with)
+        # are compared by id only; openpyxl workbooks (loader fallback) have no ids
+        equal_ids = {0} if isinstance(wb1, GridWorkbook) and isinstance(wb2, GridWorkbook) else None
+        
+        # Initialize variables
+        
+        fill_pattern_yellow = PatternFill(patternType="solid", fgColor='FFFF00')
+        
+        # Get visible sheets and their string-only names
+        visible_sheets1 = [(sheet.title, extract_sheet_name_string(sheet.title)) 
+                          for sheet in wb1.worksheets 
+                          if sheet.sheet_state == 'visible']
+        
+        visible_sheets2 = [(sheet.title, extract_sheet_name_string(sheet.title)) 
+                          for sheet in wb2.worksheets 
+                          if sheet.sheet_state == 'visible']
+        
+        # Log visible sheets from both workbooks
+        logging.info("Visible sheets in V1:")
+        for original, string_only in visible_sheets1:
+            logging.info(f"  - Original: {original} -> String only: {string_only}")
+            
+        logging.info("Visible sheets in V2:")
+        for original, string_only in visible_sheets2:
+            logging.info(f"  - Original: {original} -> String only: {string_only}")
+        
+        # Create dictionaries to map string-only names to original names
+        sheets1_dict = {string: orig for orig, string in visible_sheets1}
+        sheets2_dict = {string: orig for orig, string in visible_sheets2}
+        
+        # Find matching string-only names
+        common_string_names = set(sheets1_dict.keys()) & set(sheets2_dict.keys())
+        
+        if not common_string_names:
+            logging.warning('No matching sheet names found between the workbooks')
+            show_message("警告", "両方のExcelファイルに同じ名前のシートが見つかりません。")
+            return 'X', wb2
+            
+        # Compare each matching sheet
+        for string_name in common_string_names:
+            
+            sheet_report = []
+            mismatch_found = 0
+            sheet_name1 = sheets1_dict[string_name]
+            sheet_name2 = sheets2_dict[string_name]
+            
+            logging.info(f'\nComparing sheets: {sheet_name1} <-> {sheet_name2}')
+            
+            sheet1 = wb1[sheet_name1]
+            sheet2 = wb2[sheet_name2]
+            
+            # Get maximum dimensions for comparison
+            row_max = max(sheet1.max_row, sheet2.max_row)
+            col_max = max(sheet1.max_column, sheet2.max_column)
+            logging.debug(f'Sheet dimensions: {row_max} rows x {col_max} columns')
+
+            # Kind of data in each V2 column, sampled on first use (see column_profile.py)
+            profiles = SheetProfiles(sheet2, normalize_value, 6, sheet2.max_row)
+            
+            # Find timeslot column if it exists
+            timeslot_col = find_timeslot_column(sheet1)
+
+            # Create dictionary to store Column E values and their row numbers
+            wb1_col_e = {}
+            wb2_col_e = {}
+
+            # Map Column E values for wb1 (column 5 = E)
+            for row in range(6, sheet1.max_row + 1):
+                value = normalize_value(sheet1.cell(row, 5).value)
+                if value is not None:
+                    wb1_col_e[value] = row
+
+            # Compare cells
+            for row2 in range(6, row_max + 1):
+                try:
+                    value = normalize_value(sheet2.cell(row2, 5).value)
+                    if value is None:
+                        continue
+
+                    if value in wb1_col_e:
+                        row1 = wb1_col_e[value]
+                        logging.debug(f'Found match: wb1 row {row1} matches wb2 row {row2}')
+                        
+                        # Remove the matched value from wb1_col_e 
+                        del wb1_col_e[value]
+
+                        for col in range(3, col_max + 1):
+                            try:
+                                # Get comparison columns
+                                comparison_cols = get_comparison_columns(col, file_name)
+                                
+                                if comparison_cols is None:
+                                    continue  # Skip this column
+                                    
+                                col1, col2 = comparison_cols
+                                if equal_ids is not None:
+                                    value_id1 = sheet1.get_id(row1, col1)
+                                    value_id2 = sheet2.get_id(row2, col2)
+                                    if value_id1 == value_id2 and value_id1 in equal_ids:
+                                        continue
+
+                                value1 = sheet1.cell(row1, col1).value
+                                value2 = sheet2.cell(row2, col2).value
+
+                                logging.debug(f'Comparing cell wb1({row1}, {col1}) with wb2({row2}, {col2})')
+                                logging.debug(f'Value1: {value1}, Value2: {value2}')
+
+                                # Normalize values
+                                value1 = normalize_value(value1)
+                                value2 = normalize_value(value2)
+
+                                # Handle None values
+                                if value1 is None and value2 is None:
+                                    continue
+                                if value1 is None or value2 is None:
+                                    sheet2.cell(row2, col2).fill = fill_pattern_yellow
+                                    mismatch_found += 1
+                                    logging.debug(f'Value mismatch at ({row2}, {col2}): {value1} vs {value2}')
+                                    continue
+
+                                # Convert to string and strip whitespace if not datetime object
+                                if not isinstance(value1, datetime):
+                                    value1 = str(value1).strip()
+                                if not isinstance(value2, datetime):
+                                    value2 = str(value2).strip()
+
+                                # Verdict of the value rules, cached per value pair
+                                verdict = VERDICTS.get(value1, value2)
+                                if verdict is MISSING:
+                                    verdict = compare_values(value1, value2, profiles[col2])
+                                    VERDICTS.put(value1, value2, verdict)
+
+                                if verdict is None and equal_ids is not None and value_id1 == value_id2:
+                                    equal_ids.add(value_id1)
+
+                                if verdict is not None:
+                                    sheet_report.append({
+                                        "row1": row1,
+                                        "col1": col1,
+                                        "val1": value1,
+                                        "row2": row2,
+                                        "col2": col2,
+                                        "val2": value2
+                                    })
+                                    # sheet2.cell(row2, col2).fill = fill_pattern_yellow
+                                    mismatch_found += 1
+                                    logging.debug(f'Mismatch ({verdict}) at ({row2}, {col2}): {value1} vs {value2}')
+                                
+                            except Exception as e:
+                                logging.error(f'Error comparing cell ({row2}, {col2}): {str(e)}')
+                                # mismatch_found += 1
+                                continue
+            
+                except Exception as e:
+                    logging.error(f'Error processing row {row2}: {str(e)}')
+                    continue
+        
+            if sheet_report:
+                if on_sheet is not None:
+                    on_sheet(string_name, sheet_report, mismatch_found)
+                    continue
+                reports.append({
+                    "sheet_name": string_name,
+                    "sheet_report": sheet_report,
+                    "mismatch_found": mismatch_found
+                })
+        
+        # Determine final result
+        # result = 'X' if mismatch_found > 0 else 'O'
+        # logging.info(f'Comparison completed. Result: {result} (mismatches: {mismatch_found})')
+        # return result, wb2
+        return reports
+        
+    except Exception as e:
+        logging.error(f'Error during comparison: {str(e)}', exc_info=True)
+        raise
+
+def normalize_value(value):
+    """Normalize values to handle numeric equivalence, time formats, blank/None equivalence, and remove special characters."""
+    # Handle None values and empty strings
+    if value is None or (isinstance(value, str) and value.strip() == ""):
+        return None
+    
+    # If it's already a datetime object, return it
+    if isinstance(value, datetime):
+        return value
+    
+    # Convert to string and strip whitespace and quotation marks
+    if not isinstance(value, str):
+        # Handle float values - convert to int if it's a whole number
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+    
+    # Convert to string and normalize
+    value = str(value)
+    
+    # Remove special characters and normalize whitespace
+    value = value.replace("_x000D_", "")  # Remove Excel carriage return
+    value = value.replace("\r", "")       # Remove carriage return
+    value = value.replace("\n", "")       # Remove line feed
+    value = value.replace('"', '')        # Remove double quotes
+    value = value.replace('"', '')        # Remove smart quotes (opening)
+    value = value.replace('"', '')        # Remove smart quotes (closing)
+    value = ' '.join(value.split())       # Normalize whitespace
+    value = value.strip()                 # Remove leading/trailing whitespace
+    
+    # If after cleaning the string is empty, return None
+    if value == "":
+        return None
+    
+    # List of patterns to be normalized to None
+    normalize_patterns = [None, "0", "0:00", "00:00:00", "12:00:00午前"]
+    
+    if value in normalize_patterns:
+        return None
+        
+    # Try parsing as datetime with multiple formats
+    datetime_patterns = [
+        '%Y-%m-%d %H:%M:%S',
+        '%Y/%m/%d %H:%M:%S',
+        '%Y-%m-%d',
+        '%Y/%m/%d'
+    ]
+    
+    for pattern in datetime_patterns:
+        try:
+            return datetime.strptime(value, pattern)
+        except ValueError:
+            continue
+    
+    # If it's a numeric string (like "1.0" or "1")
+    try:
+        num = float(value)
+        if num.is_integer():
+            return str(int(num))
+    except ValueError:
+        pass
+        
+    return value
+
+def compare_datetime_values(value1, value2):
+    """Compare two datetime values, handling various formats."""
+    try:
+        # First normalize both values
+        norm1 = normalize_value(value1)
+        norm2 = normalize_value(value2)
+        
+        # If both are datetime objects, compare them directly
+        if isinstance(norm1, datetime) and isinstance(norm2, datetime):
+            return norm1.date() == norm2.date()
+            
+        # If they're strings, compare the date parts
+        date1 = extract_date_part(norm1)
+        date2 = extract_date_part(norm2)
+        
+        return date1 == date2
+    except Exception as e:
+        logging.error(f"Error comparing datetime values: {value1} vs {value2} - {str(e)}")
+        return False
+
+def is_ignored_mismatch(value1, value2):
+    """Check if the mismatch between value1 and value2 should be ignored (ignored_values and ignored_pairs in rules.json)."""
+    return RULES.is_ignored_mismatch(value1, value2)
+
+def generate_report(all_reports, output_folder=None):
+    """Generate a markdown report of comparison results organized by school ID and workbook."""
+    sink = MarkdownSink(output_folder or os.path.dirname(os.path.abspath(__file__)))
+    for school_report in all_reports:
+        for school_id, file_reports in school_report.items():
+            write_school(sink, school_id, file_reports)
+    report_path = sink.close()
+    print(f"Report generated at: {report_path}")
+    return report_path
+  
+def compare_values(value1, value2, profile):
+    """
+    Verdict of the value rules for a normalized pair (datetime or stripped string):
+    None when the values are equal, else the rule of the mismatch ('date', 'time',
+    'time_range' or 'value'). The result only depends on the two values (profile only
+    picks the fast path), so it is cached per pair in VERDICTS.
+    """
+    # Column comparator: values of the column's kind skip the detection below
+    fast_kind = profile.fast_kind(value1, value2)
+
+    # Check if either value is a datetime (date shapes and ordinals from fast_normalize.py)
+    if fast_kind is None:
+        is_datetime1 = is_date_value(value1)
+        is_datetime2 = is_date_value(value2)
+    else:
+        is_datetime1 = is_datetime2 = fast_kind == KIND_DATE
+
+    if is_datetime1 or is_datetime2:
+        if not same_date(value1, value2):
+            logging.debug(f'Date mismatch: {extract_date_part(value1)} vs {extract_date_part(value2)}')
+            return 'date'
+        return None
+
+    # Check if either value is a time string
+    if fast_kind == KIND_TEXT:
+        is_time1 = is_time2 = False
+    else:
+        is_time1 = is_time_string(str(value1))
+        is_time2 = is_time_string(str(value2))
+
+    if is_time1 or is_time2:
+        if not compare_time_values(value1, value2):
+            return 'time'
+        return None
+
+    # Handle time range comparison
+    if RULES.has_range_separator(str(value1)) or RULES.has_range_separator(str(value2)):
+        time1_parts = format_time_range(str(value1)).split('~')
+        time2_parts = format_time_range(str(value2)).split('~')
+
+        if len(time1_parts) == 2 and len(time2_parts) == 2:
+            start_match = compare_time_parts(time1_parts[0], time2_parts[0])
+            end_match = compare_time_parts(time1_parts[1], time2_parts[1])
+
+            if not (start_match and end_match):
+                return 'time_range'
+            return None
+
+    # For all other values, compare as strings
+    if str(value1) != str(value2):
+        if not is_ignored_mismatch(value1, value2):
+            return 'value'
+    return None
+
+def process_subfolder(recompare_folder, subfolder, sink=None):
+    """
+    Compare the V1/V2 workbooks of one school subfolder. Returns (school_report, failures):
+    with a sink each sheet is written to the report as it finishes, otherwise (worker
+    processes) the file reports are collected and returned in school_report (None when
+    the school is skipped). failures is the number of workbooks that could not be compared.
+    """
+    subfolder_path = os.path.join(recompare_folder, subfolder)
+    v1_path = os.path.join(subfolder_path, 'V1')
+    v2_path = os.path.join(subfolder_path, 'V2')
+    result_path = os.path.join(subfolder_path, 'result')
+    
+    # Check if required folders exist
+    if not all(os.path.exists(p) for p in [v1_path, v2_path]):
+        logging.warning(f'Skipping {subfolder}: V1 or V2 folder missing')
+        return None, 0
+        
+    # Create result folder if it doesn't exist
+    os.makedirs(result_path, exist_ok=True)
+    logging.info(f'Processing subfolder: {subfolder}')
+    failures = 0
+    
+    # Get Excel files from V1
+    files_v1 = [f for f in os.listdir(v1_path) 
+               if f.endswith(('.xlsx', '.xls'))]
+    
+    school_report = []
+    if sink is not None:
+        sink.start_school(subfolder)
+    
+    # Process each file
+    for file_name in files_v1:
+        base_name = os.path.splitext(file_name)[0]
+        file_v2 = f"{base_name}.xlsx"  # Assuming same name in V2
+        
+        v1_file_path = os.path.join(v1_path, file_name)
+        v2_file_path = os.path.join(v2_path, file_v2)
+        
+        if not os.path.exists(v2_file_path):
+            logging.warning(f'No matching V2 file for {file_name}')
+            continue
+            
+        logging.info(f'\nComparing:\nV1: {file_name}\nV2: {file_v2}')
+        
+        try:
+            # Compare files and get result
+            # result, modified_wb = compare_excel_files(v1_file_path, v2_file_path)
+            if sink is not None:
+                sink.start_workbook(file_name)
+                compare_excel_files(v1_file_path, v2_file_path, sink.write_sheet)
+                continue
+
+            # Listed before it is compared, like sink.start_workbook(): the report database
+            # keeps workbooks without mismatches too
+            reports = []
+            school_report.append({file_name: reports})
+            compare_excel_files(v1_file_path, v2_file_path, lambda sheet_name, mismatches, count: reports.append({
+                "sheet_name": sheet_name,
+                "sheet_report": mismatches,
+                "mismatch_found": count
+            }))
+            # Save result
+            # output_filename = f"{result}_{base_name}.xlsx"
+            # output_path = os.path.join(result_path, output_filename)
+            
+            # logging.info(f'Saving result to: {output_path}')
+            # modified_wb.save(output_path)
+            
+        except Exception as e:
+            logging.error(f'Error processing {file_name}: {str(e)}')
+            failures += 1
+
+    if sink is not None:
+        sink.end_school()
+    return school_report, failures
+
+
+def process_folder(recompare_folder, output_folder=None, workers=1, formats=('md',), per_school=False, db_path=None,
+                   patterns=None):
+    """
+    Process all subfolders in recompare directory.
+    The report is written to output_folder (default: next to this script) while the
+    schools are compared, in each of formats ('md', 'csv', 'jsonl'); per_school writes
+    one file per school and an index into a <timestamp>_comparison_report folder.
+    With db_path the run is also stored in that SQLite database (see report_db.py), with
+    patterns the top N systemic mismatch patterns are written too (see report_patterns.py).
+    """
+    try:
+        # Get all subfolders in recompare directory
+        subfolders = [f for f in os.listdir(recompare_folder) 
+                     if os.path.isdir(os.path.join(recompare_folder, f))]
+        
+        logging.info(f'Found {len(subfolders)} subfolders to process')
+
+        report_folder = output_folder or os.path.dirname(os.path.abspath(__file__))
+        sinks = [open_report_sink(report_folder, formats, per_school)]
+        if db_path:
+            sinks.append(SqliteSink(db_path, 'shift_report', os.path.abspath(recompare_folder)))
+        if patterns:
+            sinks.append(PatternSink(report_folder, patterns))
+        sink = sinks[0] if len(sinks) == 1 else MultiSink(sinks)
+        success = False
+        try:
+            if workers > 1:
+                # Each school is written as soon as it and the schools before it are done
+                school_results = run_in_workers([(recompare_folder, subfolder) for subfolder in subfolders], workers)
+                failures = 0
+                for subfolder, (school_report, school_failures) in zip(subfolders, school_results):
+                    failures += school_failures
+                    if school_report is not None:
+                        write_school(sink, subfolder, school_report)
+            else:
+                failures = sum(process_subfolder(recompare_folder, subfolder, sink)[1] for subfolder in subfolders)
+                VERDICTS.log_stats()
+            success = failures == 0
+        finally:
+            # A run that died or left workbooks out is not stored as finished (see report_db.py)
+            report_path = sink.close(success)
+        logging.info(f'Report written to: {report_path}')
+
+        # Failed workbooks are logged and left out of the report so the others still get compared
+        if failures:
+            logging.error(f'{failures} workbooks could not be compared, the report leaves them out')
+        return success
+        
+    except Exception as e:
+        logging.error(f'Error in process_folder: {str(e)}', exc_info=True)
+        return False
+
+def init_worker(log_level, log_file, verdict_cache=None):
+    """Worker process set-up: same log file, no dialogs and the saved verdicts."""
+    global HEADLESS
+    HEADLESS = True
+    setup_logging(log_level, log_file)
+    if verdict_cache:
+        # Read only: workers do not write the cache file back
+        VERDICTS.load(verdict_cache)
+
+
+def run_in_workers(tasks, workers):
+    """
+    Run (recompare_folder, subfolder) tasks in worker processes (worker_pool.py). Yields the
+    results in task order, each one as soon as its task and every task before it are done.
+    """
+    root_logger = logging.getLogger()
+    log_files = [h.baseFilename for h in root_logger.handlers if isinstance(h, logging.FileHandler)]
+    initargs = (logging.getLevelName(root_logger.level), log_files[0] if log_files else None, VERDICTS.path)
+    logging.info(f'Running {len(tasks)} subfolders in {workers} worker processes')
+    jobs = [folder_job(task, os.path.join(*task, 'V1'), os.path.join(*task, 'V2')) for task in tasks]
+    return iter_jobs(process_subfolder, jobs, workers, init_worker, initargs, **WORKER_LIMITS)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Write the comparison report of a recompare folder without the GUI.')
+    parser.add_argument('recompare_folder', help='folder with <school>/V1 and <school>/V2 subfolders')
+    parser.add_argument('--output', help='folder for the report (default: next to this script)')
+    parser.add_argument('--workers', type=int, default=1, help='worker processes (default: 1)')
+    parser.add_argument('--format', dest='formats', action='append', choices=sorted(SINKS),
+                        help='report format, repeatable (default: md)')
+    parser.add_argument('--per-school', action='store_true',
+                        help='one report file per school plus an index')
+    parser.add_argument('--db', help='also store the run in this SQLite database')
+    parser.add_argument('--delta', action='store_true',
+                        help='with --db: also write a delta report against the previous run')
+    parser.add_argument('--patterns', type=int, metavar='N',
+                        help='also write the top N mismatch patterns across schools')
+    parser.add_argument('--verdict-cache', help='file keeping the verdicts of value pairs between runs '
+                                                '(only updated by runs without --workers)')
+    parser.add_argument('--log-level', choices=['DEBUG', 'INFO', 'WARNING'], default='INFO')
+    add_worker_arguments(parser)
+    args = parser.parse_args(argv)
+    if args.delta and not args.db:
+        parser.error('--delta needs --db')
+    return args
+
+
+def run_cli(argv=None):
+    """Batch entry point: no Tk root and no dialogs. Returns the exit code."""
+    global HEADLESS, WORKER_LIMITS
+    args = parse_args(argv)
+    HEADLESS = True
+    WORKER_LIMITS = worker_limits(args)
+    setup_logging(args.log_level)
+    logging.info('Starting Excel comparison program (batch mode)')
+
+    if args.output:
+        os.makedirs(args.output, exist_ok=True)
+    if args.verdict_cache:
+        VERDICTS.load(args.verdict_cache)
+    success = process_folder(args.recompare_folder, args.output, args.workers,
+                             args.formats or ['md'], args.per_school, args.db, args.patterns)
+    if args.verdict_cache and args.workers <= 1:
+        VERDICTS.save()
+    if success and args.delta:
+        write_db_delta(args.db, args.output or os.path.dirname(os.path.abspath(__file__)), 'shift_report')
+
+    logging.info('Program finished')
+    return 0 if success else 1
+
+
+def main():
+    from tkinter import messagebox
+
+    # Initialize logging
+    setup_logging('DEBUG')
+    logging.info('Starting Excel comparison program')
+    
+    try:
+        # Create root window
+        root = create_root()
+        
+        # Select recompare folder
+        recompare_folder = select_directory(root, "recompareフォルダーを選択してください")
+        if not recompare_folder:
+            logging.warning('Folder selection cancelled')
+            show_message("フォルダー選択", "フォルダーが選択されていません。終了します...")
+            return
+            
+        logging.info(f'Selected recompare folder: {recompare_folder}')
+        show_message("比較を開始します", "比較プロセスを開始しています....")
+        
+        # Process all subfolders
+        success = process_folder(recompare_folder)
+        
+        if success:
+            logging.info('Comparison process completed successfully')
+            show_message("比較が完了しました", "比較プロセスが完了しました.")
+        else:
+            show_message("エラー", "処理中にエラーが発生しました。ログを確認してください。")
+            
+    except Exception as e:
+        logging.error(f'Unexpected error: {str(e)}', exc_info=True)
+        messagebox.showerror("エラーが発生しました", f"予期しないエラーが発生しました: {str(e)}")
+    finally:
+        logging.info('Program finished')
+        if root:
+            root.destroy()
+
+if __name__ == "__main__":
+    # Any command line arguments select the batch mode, without arguments the GUI starts
+    if len(sys.argv) > 1:
+        sys.exit(run_cli())
     main()
\ No newline at end of file
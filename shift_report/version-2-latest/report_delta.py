@@ -0,0 +1,188 @@
+import os
+import sys
+import json
+import logging
+import argparse
+from datetime import datetime
+
+from report_db import connect, latest_run, school_counts
+
+
+# Run-to-run delta: which mismatches a new run resolved, introduced or still has.
+# A mismatch is keyed by (school, workbook, sheet, row, column) on the V2 side, the side
+# the engines align V1 rows to, so the key stays the same between runs on the same V2 layout.
+# Values are compared as text (the database stores them as text). With the database,
+# schools compared in only one of the runs are listed apart instead of counting as resolved.
+#
+# Runs come from the SQLite history (--db, see report_db.py) or from JSONL reports
+# (a combined .jsonl file or a per-school report folder with index.jsonl).
+#
+#   python report_delta.py --db results.db                 latest run against the one before
+#   python report_delta.py old_report.jsonl new_report.jsonl --output reports
+
+
+def text(value):
+    return None if value is None else str(value)
+
+
+def load_jsonl_run(path):
+    """{key: (val1, val2)} of a JSONL report file or per-school JSONL report folder."""
+    if os.path.isdir(path):
+        files = sorted(os.path.join(path, f) for f in os.listdir(path)
+                       if f.endswith('.jsonl') and f != 'index.jsonl')
+    else:
+        files = [path]
+    mismatches = {}
+    for file_path in files:
+        with open(file_path, encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                key = (str(record['school_id']), record['workbook'], record['sheet_name'],
+                       record['row2'], record['col2'])
+                mismatches[key] = (text(record['val1']), text(record['val2']))
+    return mismatches
+
+
+def load_db_run(conn, run_id):
+    """{key: (val1, val2)} of a run stored by SqliteSink."""
+    rows = conn.execute("""
+        SELECT p.school_id, p.workbook, s.sheet_name, m.row2, m.col2, m.val1, m.val2
+        FROM mismatches m
+        JOIN sheets s ON s.id = m.sheet_id
+        JOIN file_pairs p ON p.id = s.pair_id
+        WHERE p.run_id = ?""", (run_id,))
+    return {(school_id, workbook, sheet_name, row2, col2): (val1, val2)
+            for school_id, workbook, sheet_name, row2, col2, val1, val2 in rows}
+
+
+def compute_delta(previous, current):
+    """Three-way split of two {key: values} runs: (resolved, introduced, still present) key sets."""
+    previous_keys = previous.keys()
+    current_keys = current.keys()
+    return previous_keys - current_keys, current_keys - previous_keys, previous_keys & current_keys
+
+
+def generate_delta_report(previous, current, previous_label, current_label, output_folder, compared=None):
+    """
+    Write the delta as markdown and return its path.
+    compared: (previous schools, current schools) when known; only schools in both are diffed.
+    """
+    only_previous = only_current = set()
+    if compared is not None:
+        previous_schools, current_schools = compared
+        only_previous = previous_schools - current_schools
+        only_current = current_schools - previous_schools
+        both = previous_schools & current_schools
+        previous = {key: values for key, values in previous.items() if key[0] in both}
+        current = {key: values for key, values in current.items() if key[0] in both}
+
+    resolved, introduced, still = compute_delta(previous, current)
+    changed = sum(1 for key in still if previous[key] != current[key])
+
+    schools = {}
+    for name, keys in (('resolved', resolved), ('introduced', introduced), ('still', still)):
+        for key in keys:
+            counts = schools.setdefault(key[0], {'resolved': 0, 'introduced': 0, 'still': 0})
+            counts[name] += 1
+
+    timestamp = datetime.now()
+    report_lines = [
+        "# Delta Report",
+        f"**Generated on:** {timestamp.strftime('%Y-%m-%d %H:%M:%S')}",
+        f"**Previous:** {previous_label}",
+        f"**Current:** {current_label}",
+        "",
+        "| Resolved | Introduced | Still present | Value changed |",
+        "|----------|------------|---------------|---------------|",
+        f"| {len(resolved)} | {len(introduced)} | {len(still)} | {changed} |",
+        "",
+    ]
+    if only_previous:
+        report_lines.append(f"**Not compared in the current run:** {', '.join(sorted(only_previous))}")
+        report_lines.append("")
+    if only_current:
+        report_lines.append(f"**New in the current run:** {', '.join(sorted(only_current))}")
+        report_lines.append("")
+
+    if schools:
+        report_lines.append("## Schools")
+        report_lines.append("")
+        report_lines.append("| School ID | Resolved | Introduced | Still present |")
+        report_lines.append("|-----------|----------|------------|---------------|")
+        for school_id in sorted(schools):
+            counts = schools[school_id]
+            report_lines.append(f"| {school_id} | {counts['resolved']} | {counts['introduced']} | {counts['still']} |")
+        report_lines.append("")
+
+    for title, keys, run in (("Introduced", introduced, current), ("Resolved", resolved, previous)):
+        if not keys:
+            continue
+        report_lines.append(f"## {title}")
+        report_lines.append("")
+        report_lines.append("| School ID | Workbook | Sheet Name | V2 Row | V2 Col | V1 Value | V2 Value |")
+        report_lines.append("|-----------|----------|------------|--------|--------|----------|----------|")
+        for key in sorted(keys):
+            school_id, workbook, sheet_name, row2, col2 = key
+            val1, val2 = run[key]
+            report_lines.append(f"| {school_id} | {workbook} | {sheet_name} | {row2} | {col2} | {val1} | {val2} |")
+        report_lines.append("")
+
+    report_path = os.path.join(output_folder, f"{timestamp.strftime('%Y%m%d_%H%M%S')}_delta_report.md")
+    with open(report_path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(report_lines))
+    logging.info(f'Delta report: {len(resolved)} resolved, {len(introduced)} introduced, '
+                 f'{len(still)} still present -> {report_path}')
+    return report_path
+
+
+def write_db_delta(db_path, output_folder, tool=None, previous_run=None, current_run=None):
+    """Delta between two runs of the database (default: the latest run and the one before it)."""
+    conn = connect(db_path)
+    try:
+        current_run = current_run or latest_run(conn, tool)
+        if current_run is None:
+            logging.warning(f'No finished runs in {db_path}')
+            return None
+        if previous_run is None:
+            row = conn.execute(
+                'SELECT id FROM runs WHERE finished IS NOT NULL AND id < ? AND tool = '
+                '(SELECT tool FROM runs WHERE id = ?) ORDER BY id DESC LIMIT 1',
+                (current_run, current_run)).fetchone()
+            if row is None:
+                logging.warning(f'No earlier run to compare run {current_run} with')
+                return None
+            previous_run = row[0]
+        compared = (set(school_counts(conn, previous_run)), set(school_counts(conn, current_run)))
+        return generate_delta_report(load_db_run(conn, previous_run), load_db_run(conn, current_run),
+                                     f"run {previous_run}", f"run {current_run}", output_folder, compared)
+    finally:
+        conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Resolved, introduced and remaining mismatches between two runs.')
+    parser.add_argument('previous', nargs='?', help='previous JSONL report (file or per-school folder)')
+    parser.add_argument('current', nargs='?', help='current JSONL report (file or per-school folder)')
+    parser.add_argument('--db', help='SQLite database written with --db instead of JSONL reports')
+    parser.add_argument('--tool', help='with --db: only runs of this tool (e.g. kinmu_report)')
+    parser.add_argument('--previous-run', type=int, help='with --db: previous run id (default: the one before --current-run)')
+    parser.add_argument('--current-run', type=int, help='with --db: current run id (default: latest)')
+    parser.add_argument('--output', default='.', help='folder for the delta report (default: current folder)')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    os.makedirs(args.output, exist_ok=True)
+    if args.db:
+        report_path = write_db_delta(args.db, args.output, args.tool, args.previous_run, args.current_run)
+    elif args.previous and args.current:
+        report_path = generate_delta_report(load_jsonl_run(args.previous), load_jsonl_run(args.current),
+                                            args.previous, args.current, args.output)
+    else:
+        parser.error('give two JSONL reports or --db')
+    return 0 if report_path else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+import os
+import re
+import logging
+from datetime import datetime
+
+from openpyxl.utils import get_column_letter
+
+
+# Systemic mismatch patterns across schools. Every mismatch is fingerprinted by
+# (sheet, V2 column, V1 pattern, V2 pattern, rule), where a pattern is the value with
+# each run of digits replaced by '#': "08:00〜17:00" vs "2024-01-06 09:00:00" becomes
+# "#:#〜#:#" vs "#-#-# #:#:#", the same for every row and school with that difference.
+# Patterns are counted in a dict while the report is written (PatternSink is a report
+# sink) and the top N are written at the end, with their schools and example rows.
+
+DIGITS = re.compile(r'\d+')
+
+# Example rows kept per pattern for the drill-down
+EXAMPLES = 5
+
+
+def value_pattern(value):
+    """Value with its digits folded, so differences of the same shape group together."""
+    if value is None:
+        return ''
+    return DIGITS.sub('#', str(value).strip())
+
+
+class Pattern:
+    """Occurrences of one fingerprint: total, per school and a few examples."""
+
+    __slots__ = ('count', 'schools', 'examples')
+
+    def __init__(self):
+        self.count = 0
+        self.schools = {}
+        self.examples = []
+
+
+class PatternSink:
+    """Report sink counting mismatch fingerprints, written as a patterns report on close()."""
+
+    def __init__(self, output_folder, top=20):
+        self.output_folder = output_folder
+        self.top = top
+        self.patterns = {}
+        self.total = 0
+        self.schools = set()
+        self.school_id = None
+        self.workbook = None
+
+    def start_school(self, school_id):
+        self.school_id = school_id
+
+    def start_workbook(self, workbook):
+        self.workbook = workbook
+
+    def write_sheet(self, sheet_name, mismatches, mismatch_count):
+        patterns = self.patterns
+        for mismatch in mismatches:
+            fingerprint = (sheet_name, mismatch['col2'], value_pattern(mismatch['val1']),
+                           value_pattern(mismatch['val2']), getattr(mismatch, 'rule_name', None))
+            pattern = patterns.get(fingerprint)
+            if pattern is None:
+                pattern = patterns[fingerprint] = Pattern()
+            pattern.count += 1
+            pattern.schools[self.school_id] = pattern.schools.get(self.school_id, 0) + 1
+            if len(pattern.examples) < EXAMPLES:
+                pattern.examples.append((self.school_id, self.workbook, mismatch['row2'],
+                                         mismatch['val1'], mismatch['val2']))
+            self.total += 1
+            self.schools.add(self.school_id)
+
+    def end_school(self):
+        self.school_id = None
+        self.workbook = None
+
+    def top_patterns(self):
+        """The top N (fingerprint, Pattern), most schools first, then most occurrences."""
+        ranked = sorted(self.patterns.items(), key=lambda item: (-len(item[1].schools), -item[1].count))
+        return ranked[:self.top]
+
+    def close(self, success=True):
+        timestamp = datetime.now()
+        report_lines = [
+            "# Systemic Mismatch Patterns",
+            f"**Generated on:** {timestamp.strftime('%Y-%m-%d %H:%M:%S')}",
+            f"**Mismatches:** {self.total} in {len(self.schools)} schools, {len(self.patterns)} distinct patterns",
+            "",
+            "| # | Schools | Count | Sheet Name | V2 Col | Rule | V1 Pattern | V2 Pattern |",
+            "|---|---------|-------|------------|--------|------|------------|------------|",
+        ]
+        top = self.top_patterns()
+        for number, ((sheet_name, col2, pattern1, pattern2, rule), pattern) in enumerate(top, start=1):
+            report_lines.append(
+                f"| {number} | {len(pattern.schools)} | {pattern.count} | {sheet_name} | "
+                f"{get_column_letter(col2)} | {rule or '-'} | {pattern1} | {pattern2} |"
+            )
+        report_lines.append("")
+
+        for number, ((sheet_name, col2, pattern1, pattern2, rule), pattern) in enumerate(top, start=1):
+            schools = sorted(pattern.schools.items(), key=lambda item: -item[1])
+            report_lines.append(f"## {number}. {sheet_name} {get_column_letter(col2)}: {pattern1} / {pattern2}")
+            report_lines.append("")
+            report_lines.append("**Schools:** " + ", ".join(f"{school_id} ({count})" for school_id, count in schools))
+            report_lines.append("")
+            report_lines.append("| School ID | Workbook | V2 Row | V1 Value | V2 Value |")
+            report_lines.append("|-----------|----------|--------|----------|----------|")
+            for school_id, workbook, row2, val1, val2 in pattern.examples:
+                report_lines.append(f"| {school_id} | {workbook} | {row2} | {val1} | {val2} |")
+            report_lines.append("")
+
+        report_path = os.path.join(self.output_folder, f"{timestamp.strftime('%Y%m%d_%H%M%S')}_patterns.md")
+        with open(report_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(report_lines))
+        logging.info(f'{len(self.patterns)} mismatch patterns, top {len(top)} written to {report_path}')
+        return report_path
@@ -0,0 +1,305 @@
+import os
+import csv
+import json
+from datetime import datetime
+
+
+# Streaming report writers. The report is written while the comparison runs:
+# schools, workbooks and sheets are passed in order and each sheet's rows are
+# written as soon as that sheet has been compared, nothing is kept for the whole run.
+#
+#   sink.start_school(school_id)
+#   sink.start_workbook(workbook_name)
+#   sink.write_sheet(sheet_name, mismatches, mismatch_count)   # repeated
+#   sink.end_school()
+#   report_path = sink.close(success)   # success: the whole run was compared
+#
+# Either one combined file (<timestamp>_comparison_report.<ext>) or, with per_school,
+# a <timestamp>_comparison_report folder with one file per school and an index.
+
+FIELDS = ['school_id', 'workbook', 'sheet_name', 'mismatch_count', 'row1', 'col1', 'val1', 'row2', 'col2', 'val2']
+
+
+class ReportSink:
+    """Common part of the report writers: file handling, per-school files and the index."""
+
+    extension = ''
+
+    def __init__(self, output_folder, per_school=False, timestamp=None):
+        timestamp = timestamp or datetime.now()
+        self.generated = timestamp.strftime('%Y-%m-%d %H:%M:%S')
+        report_name = f"{timestamp.strftime('%Y%m%d_%H%M%S')}_comparison_report"
+        self.per_school = per_school
+        if per_school:
+            self.folder = os.path.join(output_folder, report_name)
+            os.makedirs(self.folder, exist_ok=True)
+            self.path = os.path.join(self.folder, 'index' + self.extension)
+        else:
+            self.folder = output_folder
+            self.path = os.path.join(output_folder, report_name + self.extension)
+
+        self.file = None
+        self.school_id = None
+        self.workbook = None
+        self.workbook_written = False
+        # One summary per school for the index: [school_id, file name, workbooks, sheets, mismatches]
+        self.index = []
+
+        if not per_school:
+            self.file = self.open(self.path)
+            self.write_header()
+
+    def open(self, path):
+        return open(path, 'w', encoding='utf-8', newline='')
+
+    def start_school(self, school_id):
+        self.school_id = school_id
+        file_name = None
+        if self.per_school:
+            file_name = school_file_name(school_id) + self.extension
+            self.file = self.open(os.path.join(self.folder, file_name))
+            self.write_header()
+        self.index.append([school_id, file_name, 0, 0, 0])
+        self.write_school_header(school_id)
+
+    def start_workbook(self, workbook):
+        self.end_workbook()
+        self.workbook = workbook
+        self.workbook_written = False
+
+    def write_sheet(self, sheet_name, mismatches, mismatch_count):
+        """Write one compared sheet (only sheets with mismatches are passed in by the engines)."""
+        summary = self.index[-1]
+        if not self.workbook_written:
+            self.write_workbook_header(self.workbook)
+            self.workbook_written = True
+            summary[2] += 1
+        summary[3] += 1
+        summary[4] += mismatch_count
+        self.write_sheet_rows(sheet_name, mismatches, mismatch_count)
+
+    def end_workbook(self):
+        if self.workbook_written:
+            self.write_workbook_footer()
+        self.workbook = None
+        self.workbook_written = False
+
+    def end_school(self):
+        self.end_workbook()
+        if self.per_school and self.file is not None:
+            self.file.close()
+            self.file = None
+        self.school_id = None
+
+    def close(self, success=True):
+        """Finish the report and return its path (the index with per_school), also after a failed run."""
+        if self.school_id is not None:
+            self.end_school()
+        if self.per_school:
+            self.file = self.open(self.path)
+            self.write_header()
+            self.write_index()
+        elif not self.index:
+            self.write_empty()
+        self.file.close()
+        self.file = None
+        return self.path
+
+    # Format specific parts
+    def write_header(self):
+        pass
+
+    def write_school_header(self, school_id):
+        pass
+
+    def write_workbook_header(self, workbook):
+        pass
+
+    def write_workbook_footer(self):
+        pass
+
+    def write_sheet_rows(self, sheet_name, mismatches, mismatch_count):
+        raise NotImplementedError
+
+    def write_empty(self):
+        pass
+
+    def write_index(self):
+        raise NotImplementedError
+
+
+class MarkdownSink(ReportSink):
+    """Markdown tables, same layout as the original generate_report()."""
+
+    extension = '.md'
+
+    def open(self, path):
+        self.first_line = True
+        return super().open(path)
+
+    def write_lines(self, *lines):
+        # Lines are joined with '\n' without a trailing newline, like '\n'.join(report_lines)
+        for line in lines:
+            if not self.first_line:
+                self.file.write('\n')
+            self.file.write(line)
+            self.first_line = False
+
+    def write_header(self):
+        self.write_lines("# Excel Comparison Report", f"**Generated on:** {self.generated}", "")
+
+    def write_school_header(self, school_id):
+        self.write_lines(f"## School ID: {school_id}", "")
+
+    def write_workbook_header(self, workbook):
+        self.write_lines(
+            f"### Workbook: {workbook}",
+            "",
+            "| Sheet Name | Count | V1 Row | V1 Col | V1 Value | V2 Row | V2 Col | V2 Value |",
+            "|------------|-------|--------|--------|----------|--------|--------|----------|",
+        )
+        self.sheets_in_workbook = 0
+
+    def write_workbook_footer(self):
+        self.write_lines("")  # Extra newline between workbooks
+
+    def write_sheet_rows(self, sheet_name, mismatches, mismatch_count):
+        if mismatch_count == 0:
+            self.write_lines(f"| {sheet_name} | {mismatch_count} | - | - | No mismatches | - | - | - |")
+            return
+        if self.sheets_in_workbook:
+            self.write_lines("| | | | | | | | |")
+        self.sheets_in_workbook += 1
+        for number, mismatch in enumerate(mismatches):
+            name_cells = f"| {sheet_name} | {mismatch_count} |" if number == 0 else "| | |"
+            self.write_lines(
+                f"{name_cells} {mismatch['row1']} | {mismatch['col1']} | "
+                f"{mismatch['val1']} | {mismatch['row2']} | {mismatch['col2']} | "
+                f"{mismatch['val2']} |"
+            )
+
+    def write_empty(self):
+        self.write_lines("## No mismatches found", "No differences were detected during the comparison.")
+
+    def write_index(self):
+        self.write_lines(
+            "| School ID | Workbooks | Sheets | Mismatches | Report |",
+            "|-----------|-----------|--------|------------|--------|",
+        )
+        for school_id, file_name, workbooks, sheets, mismatches in self.index:
+            self.write_lines(f"| {school_id} | {workbooks} | {sheets} | {mismatches} | [{file_name}]({file_name}) |")
+
+
+class CsvSink(ReportSink):
+    """One row per mismatch (UTF-8 with BOM so Excel opens the Japanese text correctly)."""
+
+    extension = '.csv'
+
+    def open(self, path):
+        f = open(path, 'w', encoding='utf-8-sig', newline='')
+        self.writer = csv.writer(f)
+        return f
+
+    def write_header(self):
+        if self.per_school and self.school_id is None:
+            self.writer.writerow(['school_id', 'workbooks', 'sheets', 'mismatches', 'report'])
+        else:
+            self.writer.writerow(FIELDS)
+
+    def write_sheet_rows(self, sheet_name, mismatches, mismatch_count):
+        for mismatch in mismatches:
+            self.writer.writerow([self.school_id, self.workbook, sheet_name, mismatch_count,
+                                  mismatch['row1'], mismatch['col1'], mismatch['val1'],
+                                  mismatch['row2'], mismatch['col2'], mismatch['val2']])
+
+    def write_index(self):
+        for school_id, file_name, workbooks, sheets, mismatches in self.index:
+            self.writer.writerow([school_id, workbooks, sheets, mismatches, file_name])
+
+
+class JsonlSink(ReportSink):
+    """One JSON object per mismatch, values that are not JSON types are written as strings."""
+
+    extension = '.jsonl'
+
+    def write_json(self, record):
+        self.file.write(json.dumps(record, ensure_ascii=False, default=str))
+        self.file.write('\n')
+
+    def write_sheet_rows(self, sheet_name, mismatches, mismatch_count):
+        for mismatch in mismatches:
+            self.write_json({
+                'school_id': self.school_id,
+                'workbook': self.workbook,
+                'sheet_name': sheet_name,
+                'mismatch_count': mismatch_count,
+                'row1': mismatch['row1'],
+                'col1': mismatch['col1'],
+                'val1': mismatch['val1'],
+                'row2': mismatch['row2'],
+                'col2': mismatch['col2'],
+                'val2': mismatch['val2'],
+            })
+
+    def write_index(self):
+        for school_id, file_name, workbooks, sheets, mismatches in self.index:
+            self.write_json({'school_id': school_id, 'workbooks': workbooks, 'sheets': sheets,
+                             'mismatches': mismatches, 'report': file_name})
+
+
+class MultiSink:
+    """Sends the report to several sinks at once (e.g. markdown and CSV)."""
+
+    def __init__(self, sinks):
+        self.sinks = sinks
+
+    def start_school(self, school_id):
+        for sink in self.sinks:
+            sink.start_school(school_id)
+
+    def start_workbook(self, workbook):
+        for sink in self.sinks:
+            sink.start_workbook(workbook)
+
+    def write_sheet(self, sheet_name, mismatches, mismatch_count):
+        for sink in self.sinks:
+            sink.write_sheet(sheet_name, mismatches, mismatch_count)
+
+    def end_school(self):
+        for sink in self.sinks:
+            sink.end_school()
+
+    def close(self, success=True):
+        paths = [sink.close(success) for sink in self.sinks]
+        return paths[0] if len(paths) == 1 else paths
+
+
+SINKS = {
+    'md': MarkdownSink,
+    'csv': CsvSink,
+    'jsonl': JsonlSink,
+}
+
+
+def school_file_name(school_id):
+    """School ID usable as a file name."""
+    return ''.join('_' if c in '\\/:*?"<>|' else c for c in str(school_id))
+
+
+def open_report_sink(output_folder, formats=('md',), per_school=False):
+    """Create the sink(s) for the requested formats ('md', 'csv', 'jsonl')."""
+    timestamp = datetime.now()
+    sinks = [SINKS[fmt](output_folder, per_school, timestamp) for fmt in formats]
+    return sinks[0] if len(sinks) == 1 else MultiSink(sinks)
+
+
+def write_school(sink, school_id, file_reports):
+    """Write a school's already collected reports ([{workbook: [sheet reports]}]) to a sink."""
+    sink.start_school(school_id)
+    for file_report in file_reports:
+        for workbook, sheets in file_report.items():
+            sink.start_workbook(workbook)
+            for sheet_report in sheets:
+                sink.write_sheet(sheet_report["sheet_name"], sheet_report["sheet_report"],
+                                 sheet_report["mismatch_found"])
+    sink.end_school()
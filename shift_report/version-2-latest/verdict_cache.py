@@ -0,0 +1,103 @@
+import os
+import pickle
+import hashlib
+import logging
+
+
+# Verdicts of the value rules per (normalized value 1, normalized value 2) pair.
+# The same pairs come back in every row, sheet and file of a run ("8:00~17:00" vs
+# "08:00〜17:00", "休み" vs "シフト時間コード-1"), so the outcome of the rule cascade
+# (None when equal, else the rule that reported the mismatch) is computed once per pair.
+# Rules that look at neighbouring cells (その他(一日)/休み, Q/S overtime, ...) are
+# checked by the engines before or instead of the cache.
+#
+# A cache can be saved to disk and loaded by a later run. The file carries a signature
+# of the engine script, its rules.json and the helper modules its value rules call
+# (rule_set.py, column_profile.py, ...), verdicts of other code or rules are not loaded.
+
+# Returned by get() for pairs without a verdict
+MISSING = object()
+
+# Returned by the engines' value rules when only the column checks can decide
+UNDECIDED = object()
+
+# Pairs kept at most; further pairs are compared every time
+MAX_VERDICTS = 500000
+
+
+def file_signature(*paths):
+    """SHA-1 over the contents of files (engine script, rules file, helper modules)."""
+    digest = hashlib.sha1()
+    for path in paths:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+class VerdictCache:
+    """Verdicts by value pair, with hit counts."""
+
+    def __init__(self, signature=None, max_size=MAX_VERDICTS):
+        self.signature = signature
+        self.max_size = max_size
+        self.verdicts = {}
+        self.path = None
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.verdicts)
+
+    def get(self, value1, value2):
+        verdict = self.verdicts.get((value1, value2), MISSING)
+        if verdict is MISSING:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return verdict
+
+    def put(self, value1, value2, verdict):
+        if len(self.verdicts) < self.max_size:
+            self.verdicts[(value1, value2)] = verdict
+
+    def load(self, path):
+        """Add the verdicts saved in a file; later save() calls without a path write there."""
+        self.path = path
+        if not os.path.exists(path):
+            return 0
+        try:
+            with open(path, 'rb') as f:
+                data = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError) as e:
+            logging.warning(f'Cannot read verdict cache {path}: {str(e)}')
+            return 0
+        if not isinstance(data, dict) or 'verdicts' not in data:
+            logging.warning(f'Cannot read verdict cache {path}: not a verdict cache file')
+            return 0
+        if data.get('signature') != self.signature:
+            logging.info(f'Verdict cache {path} was written by another engine or rules version, not used')
+            return 0
+        for key, verdict in data['verdicts'].items():
+            if len(self.verdicts) >= self.max_size:
+                break
+            self.verdicts.setdefault(key, verdict)
+        logging.info(f'{len(data["verdicts"])} verdicts loaded from {path}')
+        return len(data['verdicts'])
+
+    def save(self, path=None):
+        path = path or self.path
+        if not path:
+            return None
+        temp_path = path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            pickle.dump({'signature': self.signature, 'verdicts': self.verdicts}, f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)
+        logging.info(f'{len(self.verdicts)} verdicts saved to {path}')
+        return path
+
+    def log_stats(self):
+        total = self.hits + self.misses
+        if total:
+            logging.info(f'Verdict cache: {self.hits} of {total} value pairs cached '
+                         f'({self.hits / total:.0%}), {len(self.verdicts)} distinct pairs')